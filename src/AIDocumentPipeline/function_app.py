@@ -1,15 +1,22 @@
 import azure.functions as func
 import azure.durable_functions as df
 from invoices import process_invoice_batch_workflow, extract_invoice_data_workflow
-from invoices.activities import extract_invoice_data, get_invoice_folders, validate_invoice_data
-from shared.storage import write_bytes_to_blob
+from invoices.activities import export_invoice_batch, extract_invoice_data, get_invoice_batch_status, get_invoice_folder_page, get_invoice_folders, get_invoices_to_process, merge_invoice_batch_export, process_invoice, store_invoice_batch_results, store_workflow_result, submit_invoice_batch, validate_invoice_data
 
 app = df.DFApp(http_auth_level=func.AuthLevel.ANONYMOUS)
 
 # Register the modular orchestration and activity functions
-app.register_functions(write_bytes_to_blob.bp)
 app.register_functions(extract_invoice_data.bp)
+app.register_functions(get_invoice_folder_page.bp)
 app.register_functions(get_invoice_folders.bp)
+app.register_functions(get_invoices_to_process.bp)
 app.register_functions(validate_invoice_data.bp)
+app.register_functions(process_invoice.bp)
+app.register_functions(submit_invoice_batch.bp)
+app.register_functions(get_invoice_batch_status.bp)
+app.register_functions(store_invoice_batch_results.bp)
+app.register_functions(export_invoice_batch.bp)
+app.register_functions(merge_invoice_batch_export.bp)
+app.register_functions(store_workflow_result.bp)
 app.register_functions(process_invoice_batch_workflow.bp)
 app.register_functions(extract_invoice_data_workflow.bp)
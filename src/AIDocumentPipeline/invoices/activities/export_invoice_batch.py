@@ -0,0 +1,324 @@
+"""Exports the extracted data of a set of invoices to a columnar file.
+
+This module provides the blueprint for an Azure Function activity that flattens the stored `.Data.json` and `.Validation.json` outputs of the invoices processed by a generation of the batch workflow into line item rows, and writes them to a JSON Lines or Parquet part file, which are merged into a single file for the batch by the `MergeInvoiceBatchExport` activity.
+"""
+
+from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor
+import itertools
+import json
+import mmap
+import re
+import tempfile
+from azure.core.exceptions import ResourceNotFoundError
+from invoices.activities import validate_invoice_data
+from invoices.activities.validate_invoice_data import ResultStatus
+from invoices.invoice_data import InvoiceData, InvoiceProduct
+from shared.base_request import BaseRequest
+from shared.row_group_writer import RowGroupFormat, RowGroupWriter
+from shared.validation_result import ValidationResult
+from shared.storage.azure_storage_client_factory import AzureStorageClientFactory
+import shared.identity as identity
+from shared import config as app_config
+import azure.durable_functions as df
+import logging
+
+name = "ExportInvoiceBatch"
+bp = df.Blueprint()
+storage_factory = AzureStorageClientFactory(
+    identity.default_credential, identity.default_async_credential, app_config.storage_max_connections)
+
+data_suffix = ".Data.json"
+validation_suffix = ".Validation.json"
+# Invoices are downloaded in chunks so that only a bounded number are held in memory at once
+download_chunk_size = 100
+
+status_columns = {re.sub(r"(?<!^)(?=[A-Z])", "_", status.name).lower(): status
+                  for status in ResultStatus if status != ResultStatus.Fail}
+
+columns = {
+    "invoice": "string",
+    "invoice_number": "string",
+    "purchase_order_number": "string",
+    "customer_name": "string",
+    "customer_address": "string",
+    "delivery_date": "string",
+    "payable_by": "string",
+    "total_quantity": "float",
+    "total_price": "float",
+    "line_type": "string",
+    "line_index": "int",
+    "product_id": "string",
+    "description": "string",
+    "unit_price": "float",
+    "quantity": "float",
+    "total": "float",
+    "reason": "string",
+    "status": "string",
+    **{column: "bool" for column in status_columns}
+}
+
+
+@bp.function_name(name)
+@bp.activity_trigger(input_name="input", activity=name)
+def run(input: Request) -> Result:
+    """Exports the extracted data and validation status of the requested invoices to a file in the export container.
+
+    Each product and return of an invoice is a row, with the invoice fields and validation status flags repeated on each row. Invoices without line items are a single row. Rows are written in row groups to a temporary file, which is then uploaded.
+
+    :param input: The request containing the container name, the invoices to export, and the name and format of the export blob.
+    :return: The name of the export blob and the number of invoices and rows exported.
+    """
+
+    validation_result = input.validate()
+    if not validation_result.is_valid:
+        logging.error(f"Invalid input: {validation_result.to_str()}")
+        return Result(None)
+
+    try:
+        return __export__(input)
+    except Exception:
+        logging.exception(f"Failed to export {input.container_name} to {input.blob_name}")
+        return Result(None)
+
+
+def __export__(input: Request) -> Result:
+    invoices = iter(input.invoices)
+
+    result = Result(input.blob_name)
+    with tempfile.TemporaryFile() as export_file:
+        writer = RowGroupWriter.create(RowGroupFormat(input.format), export_file, columns, app_config.invoices_batch_export_row_group_size)
+
+        with ThreadPoolExecutor(max_workers=max(app_config.storage_max_connections, 1)) as executor:
+            while chunk := list(itertools.islice(invoices, download_chunk_size)):
+                for invoice, (data, status) in zip(chunk, executor.map(lambda i: __get_invoice_outputs__(input.container_name, i), chunk)):
+                    if data is None:
+                        continue
+
+                    for row in __get_rows__(invoice, data, status):
+                        writer.write(row)
+                    result.invoice_count += 1
+
+        writer.close()
+        result.row_count = writer.row_count
+
+        export_file.seek(0)
+        storage_factory.ensure_container(
+            app_config.invoices_storage_account_name, app_config.invoices_batch_export_container_name)
+        storage_factory.get_blob_service_client(app_config.invoices_storage_account_name).get_blob_client(
+            app_config.invoices_batch_export_container_name, input.blob_name).upload_blob(export_file, overwrite=True)
+
+    logging.info(
+        f"Exported {result.invoice_count} invoices as {result.row_count} rows to {input.blob_name}")
+
+    return result
+
+
+def __get_invoice_outputs__(container_name: str, invoice: str) -> tuple[InvoiceData | None, ResultStatus | None]:
+    data_json = __get_blob_json__(container_name, f"{invoice}{data_suffix}")
+    if data_json is None:
+        return None, None
+
+    validation_json = __get_blob_json__(
+        container_name, f"{invoice}{validation_suffix}")
+
+    status = None
+    if validation_json is not None:
+        status = validate_invoice_data.Result.from_dict(
+            json.loads(validation_json)).status
+
+    return InvoiceData.from_json(data_json), status
+
+
+def __get_blob_json__(container_name: str, blob_name: str) -> bytes | None:
+    try:
+        content = storage_factory.get_blob_content(
+            app_config.invoices_storage_account_name, container_name, blob_name)
+    except ResourceNotFoundError:
+        return None
+
+    # Large blobs are returned as a memory map over a temporary file
+    if isinstance(content, mmap.mmap):
+        try:
+            return content[:]
+        finally:
+            content.close()
+
+    return content
+
+
+def __get_rows__(invoice: str, data: InvoiceData, status: ResultStatus | None):
+    invoice_row = {
+        "invoice": invoice,
+        "invoice_number": data.invoice_number,
+        "purchase_order_number": data.purchase_order_number,
+        "customer_name": data.customer_name,
+        "customer_address": data.customer_address,
+        "delivery_date": data.delivery_date,
+        "payable_by": data.payable_by,
+        "total_quantity": data.total_quantity,
+        "total_price": data.total_price
+    }
+
+    if status is not None:
+        invoice_row["status"] = status.name
+        for column, column_status in status_columns.items():
+            invoice_row[column] = column_status in status
+
+    line_items: list[tuple[str, int, InvoiceProduct]] = [("product", i, p) for i, p in enumerate(data.products or [])] + \
+        [("return", i, r) for i, r in enumerate(data.returns or [])]
+
+    if not line_items:
+        yield invoice_row
+        return
+
+    for line_type, line_index, line_item in line_items:
+        yield {
+            **invoice_row,
+            "line_type": line_type,
+            "line_index": line_index,
+            "product_id": line_item.id,
+            "description": line_item.description,
+            "unit_price": line_item.unit_price,
+            "quantity": line_item.quantity,
+            "total": line_item.total,
+            "reason": line_item.reason
+        }
+
+
+class Request(BaseRequest):
+    """Defines the request payload for the `ExportInvoiceBatch` activity."""
+
+    def __init__(self, container_name: str, blob_name: str, format: str, invoices: list[str]):
+        """Initializes a new instance of the Request class.
+
+        :param container_name: The name of the container containing the invoices and their stored outputs.
+        :param blob_name: The name of the export blob to write in the export container.
+        :param format: The file format of the export, `jsonl` or `parquet`.
+        :param invoices: The blob names of the invoices to export.
+        """
+
+        super().__init__()
+        self.container_name = container_name
+        self.blob_name = blob_name
+        self.format = format
+        self.invoices = invoices
+
+    def validate(self) -> ValidationResult:
+        result = ValidationResult()
+
+        if not self.container_name:
+            result.add_error("container_name is required")
+
+        if not self.blob_name:
+            result.add_error("blob_name is required")
+
+        if self.format not in [f.value for f in RowGroupFormat]:
+            result.add_error(
+                f"format must be one of {', '.join(f.value for f in RowGroupFormat)}")
+
+        return result
+
+    def to_dict(self) -> dict:
+        """Returns a dictionary representation of the object."""
+
+        return {
+            "container_name": self.container_name,
+            "blob_name": self.blob_name,
+            "format": self.format,
+            "invoices": self.invoices
+        }
+
+    @staticmethod
+    def to_json(obj: Request) -> str:
+        """Converts the object instance to a JSON string. Required for serialization in Azure Functions when passing the result between functions.
+
+        :param obj: The object instance to convert.
+        :return: A JSON string representing the object instance.
+        """
+
+        return json.dumps(obj.to_dict())
+
+    @staticmethod
+    def from_json(json_str: str) -> Request:
+        """Converts a JSON string to the object instance. Required for deserialization in Azure Functions when receiving the result from another function.
+
+        :param json_str: The JSON string to convert.
+        :return: A object instance created from the JSON string.
+        """
+
+        return Request.from_dict(json.loads(json_str))
+
+    @staticmethod
+    def from_dict(obj: dict) -> Request:
+        """Converts a dictionary to an object instance.
+
+        :param obj: The dictionary to convert.
+        :return: A object instance created from the dictionary.
+        """
+
+        return Request(
+            obj["container_name"],
+            obj["blob_name"],
+            obj["format"],
+            obj.get("invoices", [])
+        )
+
+
+class Result:
+    """Defines the result payload for the `ExportInvoiceBatch` activity."""
+
+    def __init__(self, blob_name: str | None, invoice_count: int = 0, row_count: int = 0):
+        """Initializes a new instance of the Result class.
+
+        :param blob_name: The name of the export blob in the export container, or `None` if the export failed.
+        :param invoice_count: The number of invoices exported. Default is 0.
+        :param row_count: The number of rows exported. Default is 0.
+        """
+
+        self.blob_name = blob_name
+        self.invoice_count = invoice_count
+        self.row_count = row_count
+
+    def to_dict(self) -> dict:
+        """Returns a dictionary representation of the object."""
+
+        return {
+            "blob_name": self.blob_name,
+            "invoice_count": self.invoice_count,
+            "row_count": self.row_count
+        }
+
+    @staticmethod
+    def to_json(obj: Result) -> str:
+        """Converts the object instance to a JSON string. Required for serialization in Azure Functions when passing the result between functions.
+
+        :param obj: The object instance to convert.
+        :return: A JSON string representing the object instance.
+        """
+
+        return json.dumps(obj.to_dict())
+
+    @staticmethod
+    def from_json(json_str: str) -> Result:
+        """Converts a JSON string to the object instance. Required for deserialization in Azure Functions when receiving the result from another function.
+
+        :param json_str: The JSON string to convert.
+        :return: A object instance created from the JSON string.
+        """
+
+        return Result.from_dict(json.loads(json_str))
+
+    @staticmethod
+    def from_dict(obj: dict) -> Result:
+        """Converts a dictionary to the object instance.
+
+        :param obj: The dictionary to convert.
+        :return: A object instance created from the dictionary.
+        """
+
+        return Result(
+            obj["blob_name"],
+            obj.get("invoice_count", 0),
+            obj.get("row_count", 0)
+        )
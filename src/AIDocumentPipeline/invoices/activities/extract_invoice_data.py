@@ -5,29 +5,112 @@ This module provides the blueprint for an Azure Function activity that extracts
 
 from __future__ import annotations
 import json
-from shared.documents.document_data_extractor import DocumentDataExtractor, DocumentDataExtractorOptions
+from shared.documents.document_data_extractor import DocumentDataExtractorOptions, TextLayerPolicy
+from shared.documents.async_document_data_extractor import AsyncDocumentDataExtractor
+from shared.documents.batch_document_data_extractor import BatchDocumentDataExtractor
+from shared.documents.document_image_profile import DocumentImageProfile
+from shared.documents.extraction_schema import ExtractionSchema
+from shared.documents.extraction_cache import ExtractionCache, MemoryExtractionCache, DiskExtractionCache, BlobExtractionCache
+from shared.documents.openai_client_pool import AsyncAzureOpenAIClientPool, AzureOpenAIClientPool
+from shared.documents.openai_rate_limiter import AzureOpenAIRateLimiter, BlobRateLimitState, FileRateLimitState
 from invoices.invoice_data import InvoiceData
 from shared.base_request import BaseRequest
 from shared.validation_result import ValidationResult
 from shared.storage.azure_storage_client_factory import AzureStorageClientFactory
+from shared.storage.blob_reference import BlobReference
 import shared.identity as identity
 from shared import config as app_config
 import azure.durable_functions as df
+import atexit
 import logging
+import mmap
+import os
+import tempfile
 
 name = "ExtractInvoiceData"
 bp = df.Blueprint()
-storage_factory = AzureStorageClientFactory(identity.default_credential)
-document_extractor = DocumentDataExtractor(identity.default_credential)
+storage_factory = AzureStorageClientFactory(
+    identity.default_credential, identity.default_async_credential, app_config.storage_max_connections,
+    download_max_concurrency=app_config.storage_download_max_concurrency,
+    download_chunk_size=app_config.storage_download_chunk_size,
+    download_spill_threshold=app_config.storage_download_spill_threshold)
+
+
+def __get_extraction_cache__() -> ExtractionCache | None:
+    cache_type = (app_config.extraction_cache_type or "").lower()
+    if cache_type == "memory":
+        return MemoryExtractionCache(app_config.extraction_cache_max_bytes)
+    if cache_type == "disk":
+        return DiskExtractionCache(app_config.extraction_cache_path or os.path.join(tempfile.gettempdir(), "extraction-cache"))
+    if cache_type == "blob":
+        return BlobExtractionCache(storage_factory, app_config.invoices_storage_account_name, app_config.extraction_cache_container_name)
+    return None
+
+
+def __get_rate_limiter__() -> AzureOpenAIRateLimiter | None:
+    if app_config.openai_requests_per_minute <= 0 and app_config.openai_tokens_per_minute <= 0:
+        return None
+
+    state_type = (app_config.openai_rate_limit_state_type or "").lower()
+    state = None
+    if state_type == "file":
+        state = FileRateLimitState(app_config.openai_rate_limit_state_path or os.path.join(
+            tempfile.gettempdir(), "openai-rate-limit.json"))
+    elif state_type == "blob":
+        state = BlobRateLimitState(storage_factory, app_config.invoices_storage_account_name,
+                                   app_config.openai_rate_limit_container_name)
+
+    return AzureOpenAIRateLimiter(app_config.openai_requests_per_minute, app_config.openai_tokens_per_minute, state)
+
+
+def __close_extractors__():
+    # The async clients are bound to the worker's event loop, which is no longer running at process exit, so their connections are released with the process rather than closed here. New threads cannot be started at exit, so the rasterization process pool is shut down directly rather than from a worker thread.
+    document_extractor.__close_rasterization_pool__()
+    batch_extractor.close()
+
+
+document_extractor = AsyncDocumentDataExtractor(identity.default_async_credential, AsyncAzureOpenAIClientPool(
+    identity.default_async_credential,
+    max_connections=app_config.openai_max_connections,
+    max_keepalive_connections=app_config.openai_max_connections,
+    keepalive_expiry=app_config.openai_keepalive_expiry),
+    max_concurrent_requests=app_config.openai_max_concurrent_requests,
+    rasterization_workers=app_config.document_rasterization_workers,
+    cache=__get_extraction_cache__(),
+    rate_limiter=__get_rate_limiter__())
+# Shared by the batch job activities, so that a worker process holds a single pool of connections for batch jobs
+batch_extractor = BatchDocumentDataExtractor(identity.default_credential, AzureOpenAIClientPool(
+    identity.default_credential,
+    max_connections=app_config.openai_max_connections,
+    max_keepalive_connections=app_config.openai_max_connections,
+    keepalive_expiry=app_config.openai_keepalive_expiry),
+    rasterization_workers=app_config.document_rasterization_workers,
+    batch_api_version=app_config.openai_batch_api_version)
+atexit.register(__close_extractors__)
+image_profile = DocumentImageProfile.from_name(
+    app_config.document_image_profile)
+text_layer_policy = TextLayerPolicy(app_config.document_text_layer_policy)
+# Compiled once per process into a stable prompt, so that the prompt cache and extraction cache keys are the same between invoices and processes
+extraction_schema = ExtractionSchema(
+    "invoice_data", InvoiceData.json_schema(), "Extract the data from this invoice. If a value is not present, provide null.")
+# With structured outputs, the schema is provided as the response format rather than repeated in the prompt
+extraction_prompt = extraction_schema.get_prompt(
+    include_schema=not app_config.openai_structured_outputs)
+extraction_response_format = extraction_schema.get_response_format(
+) if app_config.openai_structured_outputs else None
 
 
 @bp.function_name(name)
 @bp.activity_trigger(input_name="input", activity=name)
-def run(input: Request) -> InvoiceData | None:
-    """Extracts invoice data from a document using Azure OpenAI.
+async def run(input: Request) -> BlobReference | None:
+    """Extracts invoice data from a document using Azure OpenAI, and stores it as `{blob_name}.Data.json` alongside the document.
+
+    The activity is asynchronous so that a single worker process can keep many extractions in flight, bounded by the `OPENAI_MAX_CONCURRENT_REQUESTS` setting.
+
+    Only a reference to the stored data is returned, so that the extracted data is not persisted in the orchestration history.
 
     :param input: The request containing the container name and blob name of the document.
-    :return: The extracted invoice data if successful; otherwise, None.
+    :return: A reference to the stored invoice data if successful; otherwise, None.
     """
 
     validation_result = input.validate()
@@ -35,36 +118,101 @@ def run(input: Request) -> InvoiceData | None:
         logging.error(f"Invalid input: {validation_result.to_str()}")
         return None
 
-    blob_content = storage_factory.get_blob_content(
-        app_config.invoices_storage_account_name, input.container_name, input.blob_name)
+    # Failures are returned as None rather than raised, so that the workflow counts the invoice as failed as it does for the ProcessInvoice activity
+    try:
+        invoice_data = await extract(input.container_name, input.blob_name)
+    except Exception:
+        logging.exception(
+            f"Failed to extract data for {input.blob_name}")
+        return None
+
+    try:
+        return await storage_factory.upload_blob_async(
+            app_config.invoices_storage_account_name, input.container_name, f"{input.blob_name}.Data.json",
+            InvoiceData.to_json(invoice_data).encode("utf-8"), overwrite=True, metadata=input.metadata)
+    except Exception:
+        logging.exception(
+            f"Failed to store extracted data for {input.blob_name}")
+        return None
 
-    data = document_extractor.from_bytes(
-        blob_content, DocumentDataExtractorOptions(
-            system_prompt="You are an AI assistant that extracts data from documents and returns them as structured JSON objects. Do not return as a code block.",
-            extraction_prompt=f"Extract the data from this invoice. If a value is not present, provide null. Use the following structure: {InvoiceData.empty().to_dict()}",
-            endpoint=app_config.openai_endpoint,
-            deployment_name=app_config.openai_completion_deployment,
-            max_tokens=4096,
-            temperature=0.1,
-            top_p=0.1
-        ))
 
-    return InvoiceData.from_dict(data)
+async def extract(container_name: str, blob_name: str) -> InvoiceData:
+    """Downloads an invoice document from Azure Blob Storage and extracts its data using Azure OpenAI.
+
+    :param container_name: The name of the container within the storage account.
+    :param blob_name: The name of the document blob to extract data from.
+    :return: The extracted invoice data.
+    """
+
+    blob_content = await storage_factory.get_blob_content_async(
+        app_config.invoices_storage_account_name, container_name, blob_name)
+
+    try:
+        extraction = await document_extractor.extract(
+            blob_content, get_extraction_options())
+    finally:
+        # Large blobs are returned as a memory map over a temporary file
+        if isinstance(blob_content, mmap.mmap):
+            blob_content.close()
+
+    logging.info(
+        f"Extracted {blob_name}: {extraction.to_dict()}")
+
+    logging.info(
+        f"Azure OpenAI client pool metrics: {document_extractor.client_pool.get_metrics()}")
+
+    logging.info(
+        f"Azure Storage client factory metrics: {AzureStorageClientFactory.get_metrics()}")
+
+    if document_extractor.cache:
+        logging.info(
+            f"Extraction cache metrics: {document_extractor.cache.get_metrics()}")
+
+    if document_extractor.rate_limiter:
+        logging.info(
+            f"Azure OpenAI rate limiter metrics: {document_extractor.rate_limiter.get_metrics()}")
+
+    return InvoiceData.from_dict(extraction.data)
+
+
+def get_extraction_options(deployment_name: str | None = None) -> DocumentDataExtractorOptions:
+    """Returns the options for extracting invoice data with Azure OpenAI.
+
+    :param deployment_name: The name of the Azure OpenAI deployment to use. Default is the `OPENAI_COMPLETION_DEPLOYMENT` setting.
+    :return: The extraction options.
+    """
+
+    return DocumentDataExtractorOptions(
+        system_prompt="You are an AI assistant that extracts data from documents and returns them as structured JSON objects. Do not return as a code block.",
+        extraction_prompt=extraction_prompt,
+        endpoint=app_config.openai_endpoint,
+        deployment_name=deployment_name or app_config.openai_completion_deployment,
+        max_tokens=4096,
+        temperature=0.1,
+        top_p=0.1,
+        # Structured outputs require a newer API version than the default
+        api_version="2024-10-21" if extraction_response_format else "2024-05-01-preview",
+        image_profile=image_profile,
+        text_layer_policy=text_layer_policy,
+        response_format=extraction_response_format
+    )
 
 
 class Request(BaseRequest):
     """Defines the request payload for the `ExtractInvoiceData` activity."""
 
-    def __init__(self, container_name: str, blob_name: str):
+    def __init__(self, container_name: str, blob_name: str, metadata: dict[str, str] | None = None):
         """Initializes a new instance of the Request class.
 
         :param container_name: The name of the container within the storage account.
         :param blob_name: The name of the document blob to extract data from.
+        :param metadata: Optional metadata to set on the stored invoice data. Default is `None`.
         """
 
         super().__init__()
         self.container_name = container_name
         self.blob_name = blob_name
+        self.metadata = metadata
 
     def validate(self) -> ValidationResult:
         result = ValidationResult()
@@ -82,7 +230,8 @@ class Request(BaseRequest):
 
         return {
             "container_name": self.container_name,
-            "blob_name": self.blob_name
+            "blob_name": self.blob_name,
+            "metadata": self.metadata
         }
 
     @staticmethod
@@ -115,5 +264,6 @@ class Request(BaseRequest):
 
         return Request(
             obj["container_name"],
-            obj["blob_name"]
+            obj["blob_name"],
+            obj.get("metadata")
         )
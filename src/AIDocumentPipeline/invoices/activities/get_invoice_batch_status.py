@@ -0,0 +1,30 @@
+"""Gets the status of an invoice batch job.
+
+This module provides the blueprint for an Azure Function activity that retrieves the status of an Azure OpenAI batch job submitted by the `SubmitInvoiceBatch` activity.
+"""
+
+from __future__ import annotations
+from invoices.activities import extract_invoice_data
+from shared import config as app_config
+import azure.durable_functions as df
+import logging
+
+name = "GetInvoiceBatchStatus"
+bp = df.Blueprint()
+
+
+@bp.function_name(name)
+@bp.activity_trigger(input_name="input", activity=name)
+def run(input: str) -> str:
+    """Retrieves the status of an Azure OpenAI batch job.
+
+    :param input: The ID of the batch job.
+    :return: The value of the `BatchJobStatus` of the batch job.
+    """
+
+    status = extract_invoice_data.batch_extractor.get_status(
+        input, extract_invoice_data.get_extraction_options(app_config.openai_batch_deployment))
+
+    logging.info(f"Batch job {input} is {status.value}")
+
+    return status.value
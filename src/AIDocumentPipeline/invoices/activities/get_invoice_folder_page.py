@@ -0,0 +1,174 @@
+"""Get a page of invoice folders from a blob container.
+
+This module provides the blueprint for an Azure Function activity that retrieves a single page of the invoice folders in a container in Azure Blob Storage, so that very large containers can be processed incrementally.
+"""
+
+from __future__ import annotations
+import json
+from invoices.invoice_folder import InvoiceFolder
+from shared.base_request import BaseRequest
+from shared.validation_result import ValidationResult
+from shared.storage.azure_storage_client_factory import AzureStorageClientFactory
+import shared.identity as identity
+from shared import config as app_config
+import azure.durable_functions as df
+import logging
+
+name = "GetInvoiceFolderPage"
+bp = df.Blueprint()
+storage_factory = AzureStorageClientFactory(
+    identity.default_credential, identity.default_async_credential, app_config.storage_max_connections)
+
+
+@bp.function_name(name)
+@bp.activity_trigger(input_name="input", activity=name)
+def run(input: Request) -> Result:
+    """Retrieves a page of the invoice folders from a container in Azure Blob Storage.
+
+    :param input: The request containing the container name, page size, and the continuation token of the previous page.
+    :return: The invoice folders in the page, and the continuation token for the next page.
+    """
+
+    page = next(storage_factory.iter_blob_folders_at_root(
+        app_config.invoices_storage_account_name, input.container_name, ".*\\.(pdf)$", input.continuation_token, input.page_size), None)
+
+    if not page:
+        return Result([], None)
+
+    logging.info(
+        f"Found {len(page.folders)} folders in a page of {input.container_name}")
+
+    folders = [InvoiceFolder(input.container_name, folder_name, invoice_file_names, input.force)
+               for folder_name, invoice_file_names in page.folders.items()]
+
+    return Result(folders, page.continuation_token)
+
+
+class Request(BaseRequest):
+    """Defines the request payload for the `GetInvoiceFolderPage` activity."""
+
+    def __init__(self, container_name: str, page_size: int, continuation_token: str | None = None, force: bool = False):
+        """Initializes a new instance of the Request class.
+
+        :param container_name: The name of the Azure Blob Storage container containing the invoice folders.
+        :param page_size: The maximum number of root level folders and blobs to list in the page.
+        :param continuation_token: The continuation token returned with the previous page. Default is `None` (the first page).
+        :param force: A flag indicating whether to reprocess invoices whose extracted data is already up to date with the invoice file. Default is `False`.
+        """
+
+        super().__init__()
+        self.container_name = container_name
+        self.page_size = page_size
+        self.continuation_token = continuation_token
+        self.force = force
+
+    def validate(self) -> ValidationResult:
+        result = ValidationResult()
+
+        if not self.container_name:
+            result.add_error("container_name is required")
+
+        if not self.page_size or self.page_size < 1:
+            result.add_error("page_size must be greater than 0")
+
+        return result
+
+    def to_dict(self) -> dict:
+        """Returns a dictionary representation of the object."""
+
+        return {
+            "container_name": self.container_name,
+            "page_size": self.page_size,
+            "continuation_token": self.continuation_token,
+            "force": self.force
+        }
+
+    @staticmethod
+    def to_json(obj: Request) -> str:
+        """Converts the object instance to a JSON string. Required for serialization in Azure Functions when passing the result between functions.
+
+        :param obj: The object instance to convert.
+        :return: A JSON string representing the object instance.
+        """
+
+        return json.dumps(obj.to_dict())
+
+    @staticmethod
+    def from_json(json_str: str) -> Request:
+        """Converts a JSON string to the object instance. Required for deserialization in Azure Functions when receiving the result from another function.
+
+        :param json_str: The JSON string to convert.
+        :return: A object instance created from the JSON string.
+        """
+
+        return Request.from_dict(json.loads(json_str))
+
+    @staticmethod
+    def from_dict(obj: dict) -> Request:
+        """Converts a dictionary to an object instance.
+
+        :param obj: The dictionary to convert.
+        :return: A object instance created from the dictionary.
+        """
+
+        return Request(
+            obj["container_name"],
+            obj["page_size"],
+            obj.get("continuation_token"),
+            obj.get("force", False)
+        )
+
+
+class Result:
+    """Defines the result payload for the `GetInvoiceFolderPage` activity."""
+
+    def __init__(self, folders: list[InvoiceFolder], continuation_token: str | None = None):
+        """Initializes a new instance of the Result class.
+
+        :param folders: The invoice folders in the page.
+        :param continuation_token: The continuation token to retrieve the next page, or `None` if this is the last page.
+        """
+
+        self.folders = folders
+        self.continuation_token = continuation_token
+
+    def to_dict(self) -> dict:
+        """Returns a dictionary representation of the object."""
+
+        return {
+            "folders": [f.to_dict() for f in self.folders],
+            "continuation_token": self.continuation_token
+        }
+
+    @staticmethod
+    def to_json(obj: Result) -> str:
+        """Converts the object instance to a JSON string. Required for serialization in Azure Functions when passing the result between functions.
+
+        :param obj: The object instance to convert.
+        :return: A JSON string representing the object instance.
+        """
+
+        return json.dumps(obj.to_dict())
+
+    @staticmethod
+    def from_json(json_str: str) -> Result:
+        """Converts a JSON string to the object instance. Required for deserialization in Azure Functions when receiving the result from another function.
+
+        :param json_str: The JSON string to convert.
+        :return: A object instance created from the JSON string.
+        """
+
+        return Result.from_dict(json.loads(json_str))
+
+    @staticmethod
+    def from_dict(obj: dict) -> Result:
+        """Converts a dictionary to the object instance.
+
+        :param obj: The dictionary to convert.
+        :return: A object instance created from the dictionary.
+        """
+
+        return Result(
+            [InvoiceFolder.from_dict(f) for f in obj["folders"]],
+            obj["continuation_token"]
+        )
@@ -1,9 +1,10 @@
 """Get the invoice folders from a blob container.
 
-This module provides the blueprint for an Azure Function activity that retrieves the invoice folders from a container in Azure Blob Storage.
+This module provides the blueprint for an Azure Function activity that retrieves the invoice folders from a container in Azure Blob Storage, a generation of folders at a time, resuming the listing at the position after the folders of the previous generation.
 """
 
 from __future__ import annotations
+import json
 from invoices.invoice_batch_request import InvoiceBatchRequest
 from invoices.invoice_folder import InvoiceFolder
 from shared.storage.azure_storage_client_factory import AzureStorageClientFactory
@@ -14,27 +15,111 @@ import logging
 
 name = "GetInvoiceFolders"
 bp = df.Blueprint()
-storage_factory = AzureStorageClientFactory(identity.default_credential)
+storage_factory = AzureStorageClientFactory(
+    identity.default_credential, identity.default_async_credential, app_config.storage_max_connections)
 
 
 @bp.function_name(name)
 @bp.activity_trigger(input_name="input", activity=name)
-def run(input: InvoiceBatchRequest) -> list[InvoiceFolder]:
-    """Retrieves the invoice folders from a container in Azure Blob Storage.
+def run(input: InvoiceBatchRequest) -> Result:
+    """Retrieves up to `INVOICES_FOLDERS_PER_GENERATION` invoice folders after those of the previous generation from a container in Azure Blob Storage.
 
-    :param input: The invoice batch request containing the container name.
-    :return: A list of `InvoiceFolder` objects representing the invoice folders in the container.
+    The listing is resumed from the continuation token of the page the previous generation stopped in, skipping the folders of that page it already returned. Folders are resumed by their position in the page rather than by name, as blobs at the root of the container are grouped under the container name, which is not in listing order. Pages are listed at the same size, so that at most two pages are listed per generation.
+
+    :param input: The invoice batch request containing the container name, and the continuation token and page offset of the previous generation.
+    :return: The invoice folders of the generation, and the continuation token and page offset to resume the listing from.
     """
 
-    grouped_invoices = storage_factory.get_blobs_by_folder_at_root(
-        app_config.invoices_storage_account_name, input.container_name, ".*\\.(pdf)$")
+    max_folders = max(app_config.invoices_folders_per_generation, 1)
+
+    folders: list[InvoiceFolder] = []
+    page_continuation_token = input.continuation_token
+    page_offset = input.page_offset
+    for page in storage_factory.iter_blob_folders_at_root(
+            app_config.invoices_storage_account_name, input.container_name, ".*\\.(pdf)$", input.continuation_token, max_folders):
+        pending_folders = [InvoiceFolder(input.container_name, folder_name, invoice_file_names, input.force)
+                           for folder_name, invoice_file_names in list(page.folders.items())[page_offset:]]
+
+        remaining_count = max_folders - len(folders)
+        folders.extend(pending_folders[:remaining_count])
+
+        # The next generation resumes from the start of this page, skipping the folders returned so far
+        if len(pending_folders) > remaining_count:
+            return __get_result__(input, folders, page_continuation_token, True, page_offset + remaining_count)
+
+        page_continuation_token = page.continuation_token
+        page_offset = 0
+        if len(folders) >= max_folders:
+            return __get_result__(input, folders, page_continuation_token, page_continuation_token is not None)
+
+    return __get_result__(input, folders, None, False)
 
+
+def __get_result__(input: InvoiceBatchRequest, folders: list[InvoiceFolder], continuation_token: str | None, has_more: bool, page_offset: int = 0) -> Result:
     logging.info(
-        f"Found {len(grouped_invoices)} folders in {input.container_name}")
+        f"Found {len(folders)} folders in {input.container_name} from generation {input.generation}")
+
+    return Result(folders, continuation_token, has_more, page_offset)
+
+
+class Result:
+    """Defines the result payload for the `GetInvoiceFolders` activity."""
+
+    def __init__(self, folders: list[InvoiceFolder], continuation_token: str | None = None, has_more: bool = False, page_offset: int = 0):
+        """Initializes a new instance of the Result class.
+
+        :param folders: The invoice folders of the generation, in listing order.
+        :param continuation_token: The continuation token of the page to resume the listing from in the next generation, or `None` to resume from the start of the container.
+        :param has_more: A flag indicating whether there are more folders after the folders of the generation. Default is `False`.
+        :param page_offset: The number of folders of the page at the continuation token to skip in the next generation. Default is 0.
+        """
+
+        self.folders = folders
+        self.continuation_token = continuation_token
+        self.has_more = has_more
+        self.page_offset = page_offset
+
+    def to_dict(self) -> dict:
+        """Returns a dictionary representation of the object."""
+
+        return {
+            "folders": [f.to_dict() for f in self.folders],
+            "continuation_token": self.continuation_token,
+            "has_more": self.has_more,
+            "page_offset": self.page_offset
+        }
+
+    @staticmethod
+    def to_json(obj: Result) -> str:
+        """Converts the object instance to a JSON string. Required for serialization in Azure Functions when passing the result between functions.
+
+        :param obj: The object instance to convert.
+        :return: A JSON string representing the object instance.
+        """
+
+        return json.dumps(obj.to_dict())
+
+    @staticmethod
+    def from_json(json_str: str) -> Result:
+        """Converts a JSON string to the object instance. Required for deserialization in Azure Functions when receiving the result from another function.
+
+        :param json_str: The JSON string to convert.
+        :return: A object instance created from the JSON string.
+        """
+
+        return Result.from_dict(json.loads(json_str))
+
+    @staticmethod
+    def from_dict(obj: dict) -> Result:
+        """Converts a dictionary to the object instance.
 
-    result = []
-    for folder_name, invoice_file_names in grouped_invoices.items():
-        result.append(InvoiceFolder(input.container_name,
-                      folder_name, invoice_file_names))
+        :param obj: The dictionary to convert.
+        :return: A object instance created from the dictionary.
+        """
 
-    return result
+        return Result(
+            [InvoiceFolder.from_dict(f) for f in obj["folders"]],
+            obj.get("continuation_token"),
+            obj.get("has_more", False),
+            obj.get("page_offset", 0)
+        )
@@ -0,0 +1,140 @@
+"""Get the invoices in a folder that require processing.
+
+This module provides the blueprint for an Azure Function activity that compares the invoice files in a folder with the metadata recorded on their extracted data, to determine which invoices have changed since they were last processed.
+"""
+
+from __future__ import annotations
+import base64
+import json
+import os
+from azure.storage.blob import BlobProperties
+from invoices.invoice_folder import InvoiceFolder
+from shared.storage.azure_storage_client_factory import AzureStorageClientFactory
+import shared.identity as identity
+from shared import config as app_config
+import azure.durable_functions as df
+import logging
+
+name = "GetInvoicesToProcess"
+bp = df.Blueprint()
+storage_factory = AzureStorageClientFactory(
+    identity.default_credential, identity.default_async_credential, app_config.storage_max_connections)
+
+source_etag_metadata_key = "source_etag"
+source_content_md5_metadata_key = "source_content_md5"
+output_blob_suffixes = [".Data.json", ".Validation.json"]
+
+
+@bp.function_name(name)
+@bp.activity_trigger(input_name="input", activity=name)
+def run(input: InvoiceFolder) -> Result:
+    """Retrieves the invoices in a folder that require processing.
+
+    An invoice is up to date when each of its outputs records the ETag or content MD5 of the current invoice file in its metadata. The blobs in the folder are listed once with their metadata, rather than requesting the properties of each blob.
+
+    :param input: The invoice folder containing the invoice file names.
+    :return: The invoices to process with the metadata to record on their outputs, and the invoices that were skipped.
+    """
+
+    result = Result()
+
+    container_client = storage_factory.get_blob_service_client(
+        app_config.invoices_storage_account_name).get_container_client(input.container_name)
+
+    blobs: dict[str, BlobProperties] = {}
+    for blob in container_client.list_blobs(name_starts_with=os.path.commonprefix(input.invoice_file_names), include=["metadata"]):
+        blobs[blob.name] = blob
+
+    for invoice in input.invoice_file_names:
+        source_blob = blobs.get(invoice)
+        source_metadata = __get_source_metadata__(
+            source_blob) if source_blob else {}
+
+        if not input.force and source_metadata and all(__is_output_current__(blobs.get(f"{invoice}{suffix}"), source_metadata) for suffix in output_blob_suffixes):
+            result.skipped.append(invoice)
+            continue
+
+        result.invoices[invoice] = source_metadata
+
+    logging.info(
+        f"Found {len(result.invoices)} invoices to process and {len(result.skipped)} up to date in {input.name}")
+
+    return result
+
+
+def __get_source_metadata__(blob: BlobProperties) -> dict[str, str]:
+    metadata = {source_etag_metadata_key: blob.etag.strip('"')}
+
+    content_md5 = blob.content_settings.content_md5
+    if content_md5:
+        metadata[source_content_md5_metadata_key] = base64.b64encode(
+            content_md5).decode("utf-8")
+
+    return metadata
+
+
+def __is_output_current__(output_blob: BlobProperties | None, source_metadata: dict[str, str]) -> bool:
+    if not output_blob or not output_blob.metadata:
+        return False
+
+    # The content MD5 is preferred as it is unchanged when an identical invoice file is uploaded again
+    content_md5 = source_metadata.get(source_content_md5_metadata_key)
+    if content_md5 and output_blob.metadata.get(source_content_md5_metadata_key) == content_md5:
+        return True
+
+    return output_blob.metadata.get(source_etag_metadata_key) == source_metadata[source_etag_metadata_key]
+
+
+class Result:
+    """Defines the result payload for the `GetInvoicesToProcess` activity."""
+
+    def __init__(self, invoices: dict[str, dict[str, str]] | None = None, skipped: list[str] | None = None):
+        """Initializes a new instance of the Result class.
+
+        :param invoices: The blob names of the invoices to process, mapped to the metadata of the invoice file to record on their outputs.
+        :param skipped: The blob names of the invoices whose outputs are up to date.
+        """
+
+        self.invoices = invoices or {}
+        self.skipped = skipped or []
+
+    def to_dict(self) -> dict:
+        """Returns a dictionary representation of the object."""
+
+        return {
+            "invoices": self.invoices,
+            "skipped": self.skipped
+        }
+
+    @staticmethod
+    def to_json(obj: Result) -> str:
+        """Converts the object instance to a JSON string. Required for serialization in Azure Functions when passing the result between functions.
+
+        :param obj: The object instance to convert.
+        :return: A JSON string representing the object instance.
+        """
+
+        return json.dumps(obj.to_dict())
+
+    @staticmethod
+    def from_json(json_str: str) -> Result:
+        """Converts a JSON string to the object instance. Required for deserialization in Azure Functions when receiving the result from another function.
+
+        :param json_str: The JSON string to convert.
+        :return: A object instance created from the JSON string.
+        """
+
+        return Result.from_dict(json.loads(json_str))
+
+    @staticmethod
+    def from_dict(obj: dict) -> Result:
+        """Converts a dictionary to the object instance.
+
+        :param obj: The dictionary to convert.
+        :return: A object instance created from the dictionary.
+        """
+
+        return Result(
+            obj["invoices"],
+            obj["skipped"]
+        )
@@ -0,0 +1,215 @@
+"""Merges the part files of an invoice batch export into a single file.
+
+This module provides the blueprint for an Azure Function activity that appends the JSON Lines or Parquet part files written by the `ExportInvoiceBatch` activity for each generation of the batch workflow into a single file, so that downstream jobs can load a batch with one read.
+"""
+
+from __future__ import annotations
+import json
+import tempfile
+from invoices.activities import export_invoice_batch
+from shared.base_request import BaseRequest
+from shared.row_group_writer import RowGroupFormat, RowGroupWriter
+from shared.validation_result import ValidationResult
+from shared.storage.azure_storage_client_factory import AzureStorageClientFactory
+import shared.identity as identity
+from shared import config as app_config
+import azure.durable_functions as df
+import logging
+
+name = "MergeInvoiceBatchExport"
+bp = df.Blueprint()
+storage_factory = AzureStorageClientFactory(
+    identity.default_credential, identity.default_async_credential, app_config.storage_max_connections)
+
+
+@bp.function_name(name)
+@bp.activity_trigger(input_name="input", activity=name)
+def run(input: Request) -> Result:
+    """Merges the part files with the requested prefix in the export container into a single file, in the order of their names, and deletes the parts.
+
+    Parts are downloaded and appended one at a time, and their rows are copied as written rather than converted again, so that the merge is bounded by the size of a part rather than the batch.
+
+    :param input: The request containing the prefix of the part blobs, and the name and format of the merged blob.
+    :return: The name of the merged blob and the number of parts and rows merged.
+    """
+
+    validation_result = input.validate()
+    if not validation_result.is_valid:
+        logging.error(f"Invalid input: {validation_result.to_str()}")
+        return Result(None)
+
+    try:
+        return __merge__(input)
+    except Exception:
+        logging.exception(f"Failed to merge {input.parts_prefix} to {input.blob_name}")
+        return Result(None)
+
+
+def __merge__(input: Request) -> Result:
+    storage_factory.ensure_container(
+        app_config.invoices_storage_account_name, app_config.invoices_batch_export_container_name)
+    container_client = storage_factory.get_blob_service_client(
+        app_config.invoices_storage_account_name).get_container_client(app_config.invoices_batch_export_container_name)
+
+    # Parts are named by their zero-padded generation, so that their names sort in the order they were written
+    part_names = sorted(container_client.list_blob_names(name_starts_with=input.parts_prefix))
+
+    result = Result(input.blob_name, len(part_names))
+    with tempfile.TemporaryFile() as merged_file:
+        writer = RowGroupWriter.create(RowGroupFormat(input.format), merged_file, export_invoice_batch.columns,
+                                       app_config.invoices_batch_export_row_group_size)
+
+        for part_name in part_names:
+            with tempfile.TemporaryFile() as part_file:
+                container_client.get_blob_client(part_name).download_blob().readinto(part_file)
+                part_file.seek(0)
+                writer.append(part_file)
+
+        writer.close()
+        result.row_count = writer.row_count
+
+        merged_file.seek(0)
+        container_client.get_blob_client(input.blob_name).upload_blob(merged_file, overwrite=True)
+
+    # The parts are only deleted once the merged file is stored, so that a failed merge can be retried
+    for part_name in part_names:
+        container_client.delete_blob(part_name)
+
+    logging.info(
+        f"Merged {result.part_count} parts as {result.row_count} rows to {input.blob_name}")
+
+    return result
+
+
+class Request(BaseRequest):
+    """Defines the request payload for the `MergeInvoiceBatchExport` activity."""
+
+    def __init__(self, parts_prefix: str, blob_name: str, format: str):
+        """Initializes a new instance of the Request class.
+
+        :param parts_prefix: The prefix of the names of the part blobs to merge in the export container.
+        :param blob_name: The name of the merged blob to write in the export container.
+        :param format: The file format of the parts and the merged blob, `jsonl` or `parquet`.
+        """
+
+        super().__init__()
+        self.parts_prefix = parts_prefix
+        self.blob_name = blob_name
+        self.format = format
+
+    def validate(self) -> ValidationResult:
+        result = ValidationResult()
+
+        if not self.parts_prefix:
+            result.add_error("parts_prefix is required")
+
+        if not self.blob_name:
+            result.add_error("blob_name is required")
+
+        if self.format not in [f.value for f in RowGroupFormat]:
+            result.add_error(
+                f"format must be one of {', '.join(f.value for f in RowGroupFormat)}")
+
+        return result
+
+    def to_dict(self) -> dict:
+        """Returns a dictionary representation of the object."""
+
+        return {
+            "parts_prefix": self.parts_prefix,
+            "blob_name": self.blob_name,
+            "format": self.format
+        }
+
+    @staticmethod
+    def to_json(obj: Request) -> str:
+        """Converts the object instance to a JSON string. Required for serialization in Azure Functions when passing the result between functions.
+
+        :param obj: The object instance to convert.
+        :return: A JSON string representing the object instance.
+        """
+
+        return json.dumps(obj.to_dict())
+
+    @staticmethod
+    def from_json(json_str: str) -> Request:
+        """Converts a JSON string to the object instance. Required for deserialization in Azure Functions when receiving the result from another function.
+
+        :param json_str: The JSON string to convert.
+        :return: A object instance created from the JSON string.
+        """
+
+        return Request.from_dict(json.loads(json_str))
+
+    @staticmethod
+    def from_dict(obj: dict) -> Request:
+        """Converts a dictionary to an object instance.
+
+        :param obj: The dictionary to convert.
+        :return: A object instance created from the dictionary.
+        """
+
+        return Request(
+            obj["parts_prefix"],
+            obj["blob_name"],
+            obj["format"]
+        )
+
+
+class Result:
+    """Defines the result payload for the `MergeInvoiceBatchExport` activity."""
+
+    def __init__(self, blob_name: str | None, part_count: int = 0, row_count: int = 0):
+        """Initializes a new instance of the Result class.
+
+        :param blob_name: The name of the merged blob in the export container, or `None` if the merge failed.
+        :param part_count: The number of parts merged. Default is 0.
+        :param row_count: The number of rows merged. Default is 0.
+        """
+
+        self.blob_name = blob_name
+        self.part_count = part_count
+        self.row_count = row_count
+
+    def to_dict(self) -> dict:
+        """Returns a dictionary representation of the object."""
+
+        return {
+            "blob_name": self.blob_name,
+            "part_count": self.part_count,
+            "row_count": self.row_count
+        }
+
+    @staticmethod
+    def to_json(obj: Result) -> str:
+        """Converts the object instance to a JSON string. Required for serialization in Azure Functions when passing the result between functions.
+
+        :param obj: The object instance to convert.
+        :return: A JSON string representing the object instance.
+        """
+
+        return json.dumps(obj.to_dict())
+
+    @staticmethod
+    def from_json(json_str: str) -> Result:
+        """Converts a JSON string to the object instance. Required for deserialization in Azure Functions when receiving the result from another function.
+
+        :param json_str: The JSON string to convert.
+        :return: A object instance created from the JSON string.
+        """
+
+        return Result.from_dict(json.loads(json_str))
+
+    @staticmethod
+    def from_dict(obj: dict) -> Result:
+        """Converts a dictionary to the object instance.
+
+        :param obj: The dictionary to convert.
+        :return: A object instance created from the dictionary.
+        """
+
+        return Result(
+            obj["blob_name"],
+            obj.get("part_count", 0),
+            obj.get("row_count", 0)
+        )
@@ -0,0 +1,131 @@
+"""Stores the results of the batch jobs for an invoice folder.
+
+This module provides the blueprint for an Azure Function activity that maps the results of the finished Azure OpenAI batch jobs for a folder back to the invoices it was submitted for, validating the extracted data and storing the `.Data.json` and `.Validation.json` outputs of each invoice.
+"""
+
+from __future__ import annotations
+import asyncio
+import json
+from invoices.activities import extract_invoice_data, validate_invoice_data
+from invoices.invoice_data import InvoiceData
+from shared.base_request import BaseRequest
+from shared.validation_result import ValidationResult
+from shared import config as app_config
+import azure.durable_functions as df
+import logging
+
+name = "StoreInvoiceBatchResults"
+bp = df.Blueprint()
+
+
+@bp.function_name(name)
+@bp.activity_trigger(input_name="input", activity=name)
+async def run(input: Request) -> list[validate_invoice_data.Result]:
+    """Validates and stores the extracted data of each invoice in the finished Azure OpenAI batch jobs for a folder.
+
+    :param input: The request containing the batch job IDs and the invoices they were submitted for, in submission order.
+    :return: The validation result of each invoice in submission order, with a processed or failed count of one.
+    """
+
+    validation_result = input.validate()
+    if not validation_result.is_valid:
+        logging.error(f"Invalid input: {validation_result.to_str()}")
+        return []
+
+    # The custom IDs are the indexes of the invoices across every job, so the results of the jobs do not overlap
+    options = extract_invoice_data.get_extraction_options(app_config.openai_batch_deployment)
+    extractions = {}
+    for batch_id in input.batch_ids:
+        extractions.update(await asyncio.to_thread(
+            extract_invoice_data.batch_extractor.get_results, batch_id, options))
+
+    invoice_results = []
+    for i, (invoice, metadata) in enumerate(input.invoices.items()):
+        result = validate_invoice_data.Result(invoice)
+        invoice_results.append(result)
+
+        extraction = extractions.get(str(i))
+        if not extraction:
+            result.failed_count = 1
+            result.add_error(extract_invoice_data.name,
+                             f"Failed to extract data for {invoice}.")
+            continue
+
+        await validate_invoice_data.store_and_validate_async(
+            input.container_name, invoice, InvoiceData.from_dict(extraction.data), result, metadata)
+
+    return invoice_results
+
+
+class Request(BaseRequest):
+    """Defines the request payload for the `StoreInvoiceBatchResults` activity."""
+
+    def __init__(self, container_name: str, batch_ids: list[str], invoices: dict[str, dict[str, str]]):
+        """Initializes a new instance of the Request class.
+
+        :param container_name: The name of the container within the storage account.
+        :param batch_ids: The IDs of the finished batch jobs the invoices were submitted in.
+        :param invoices: The blob names of the invoices in the order they were submitted, mapped to the metadata to set on their outputs.
+        """
+
+        super().__init__()
+        self.container_name = container_name
+        self.batch_ids = batch_ids
+        self.invoices = invoices
+
+    def validate(self) -> ValidationResult:
+        result = ValidationResult()
+
+        if not self.container_name:
+            result.add_error("container_name is required")
+
+        if not self.batch_ids:
+            result.add_error("batch_ids is required")
+
+        if not self.invoices:
+            result.add_error("invoices is required")
+
+        return result
+
+    def to_dict(self) -> dict:
+        """Returns a dictionary representation of the object."""
+
+        return {
+            "container_name": self.container_name,
+            "batch_ids": self.batch_ids,
+            "invoices": self.invoices
+        }
+
+    @staticmethod
+    def to_json(obj: Request) -> str:
+        """Converts the object instance to a JSON string. Required for serialization in Azure Functions when passing the result between functions.
+
+        :param obj: The object instance to convert.
+        :return: A JSON string representing the object instance.
+        """
+
+        return json.dumps(obj.to_dict())
+
+    @staticmethod
+    def from_json(json_str: str) -> Request:
+        """Converts a JSON string to the object instance. Required for deserialization in Azure Functions when receiving the result from another function.
+
+        :param json_str: The JSON string to convert.
+        :return: A object instance created from the JSON string.
+        """
+
+        return Request.from_dict(json.loads(json_str))
+
+    @staticmethod
+    def from_dict(obj: dict) -> Request:
+        """Converts a dictionary to an object instance.
+
+        :param obj: The dictionary to convert.
+        :return: A object instance created from the dictionary.
+        """
+
+        return Request(
+            obj["container_name"],
+            obj["batch_ids"],
+            obj["invoices"]
+        )
@@ -0,0 +1,109 @@
+"""Stores the detailed result of a generation of a workflow.
+
+This module provides the blueprint for an Azure Function activity that stores the detailed result of a generation of a long-running workflow in the results container, so that only a reference and aggregate counts need to be carried into the next generation of the workflow.
+"""
+
+from __future__ import annotations
+import json
+from shared.base_request import BaseRequest
+from shared.validation_result import ValidationResult
+from shared.storage.azure_storage_client_factory import AzureStorageClientFactory
+from shared.storage.blob_reference import BlobReference
+import shared.identity as identity
+from shared import config as app_config
+import azure.durable_functions as df
+import logging
+
+name = "StoreWorkflowResult"
+bp = df.Blueprint()
+storage_factory = AzureStorageClientFactory(
+    identity.default_credential, identity.default_async_credential, app_config.storage_max_connections)
+
+
+@bp.function_name(name)
+@bp.activity_trigger(input_name="input", activity=name)
+def run(input: Request) -> BlobReference | None:
+    """Stores the detailed result of a generation of a workflow as a blob in the results container.
+
+    :param input: The request containing the name of the blob and the dictionary representation of the `WorkflowResult` to store.
+    :return: A reference to the stored result if successful; otherwise, None.
+    """
+
+    validation_result = input.validate()
+    if not validation_result.is_valid:
+        logging.error(f"Invalid input: {validation_result.to_str()}")
+        return None
+
+    try:
+        return storage_factory.upload_blob(app_config.invoices_storage_account_name, app_config.invoices_batch_results_container_name,
+                                           input.blob_name, json.dumps(input.result).encode("utf-8"), overwrite=True)
+    except Exception:
+        logging.exception(f"Failed to store workflow result {input.blob_name}")
+        return None
+
+
+class Request(BaseRequest):
+    """Defines the request payload for the `StoreWorkflowResult` activity."""
+
+    def __init__(self, blob_name: str, result: dict):
+        """Initializes a new instance of the Request class.
+
+        :param blob_name: The name of the blob to store the result as in the results container.
+        :param result: The dictionary representation of the `WorkflowResult` to store.
+        """
+
+        super().__init__()
+        self.blob_name = blob_name
+        self.result = result
+
+    def validate(self) -> ValidationResult:
+        result = ValidationResult()
+
+        if not self.blob_name:
+            result.add_error("blob_name is required")
+
+        if self.result is None:
+            result.add_error("result is required")
+
+        return result
+
+    def to_dict(self) -> dict:
+        """Returns a dictionary representation of the object."""
+
+        return {
+            "blob_name": self.blob_name,
+            "result": self.result
+        }
+
+    @staticmethod
+    def to_json(obj: Request) -> str:
+        """Converts the object instance to a JSON string. Required for serialization in Azure Functions when passing the result between functions.
+
+        :param obj: The object instance to convert.
+        :return: A JSON string representing the object instance.
+        """
+
+        return json.dumps(obj.to_dict())
+
+    @staticmethod
+    def from_json(json_str: str) -> Request:
+        """Converts a JSON string to the object instance. Required for deserialization in Azure Functions when receiving the result from another function.
+
+        :param json_str: The JSON string to convert.
+        :return: A object instance created from the JSON string.
+        """
+
+        return Request.from_dict(json.loads(json_str))
+
+    @staticmethod
+    def from_dict(obj: dict) -> Request:
+        """Converts a dictionary to an object instance.
+
+        :param obj: The dictionary to convert.
+        :return: A object instance created from the dictionary.
+        """
+
+        return Request(
+            obj["blob_name"],
+            obj["result"]
+        )
@@ -0,0 +1,56 @@
+"""Submits the invoices in a folder as Azure OpenAI batch jobs.
+
+This module provides the blueprint for an Azure Function activity that submits the extraction requests for the invoices in a folder as batch jobs, split to fit the limits of a single job, for offline backfills.
+"""
+
+from __future__ import annotations
+import mmap
+from invoices.activities import extract_invoice_data
+from invoices.invoice_folder import InvoiceFolder
+from shared.storage.azure_storage_client_factory import AzureStorageClientFactory
+import shared.identity as identity
+from shared import config as app_config
+import azure.durable_functions as df
+import logging
+
+name = "SubmitInvoiceBatch"
+bp = df.Blueprint()
+storage_factory = AzureStorageClientFactory(
+    identity.default_credential, identity.default_async_credential, app_config.storage_max_connections,
+    download_max_concurrency=app_config.storage_download_max_concurrency,
+    download_chunk_size=app_config.storage_download_chunk_size,
+    download_spill_threshold=app_config.storage_download_spill_threshold)
+
+
+@bp.function_name(name)
+@bp.activity_trigger(input_name="input", activity=name)
+def run(input: InvoiceFolder) -> list[str] | None:
+    """Submits the extraction requests for the invoices in a folder as Azure OpenAI batch jobs.
+
+    The requests are identified in the batch jobs by the index of the invoice in the folder.
+
+    :param input: The invoice folder containing the invoice file names to submit.
+    :return: The IDs of the batch jobs if successful; otherwise, None.
+    """
+
+    validation_result = input.validate()
+    if not validation_result.is_valid:
+        logging.error(f"Invalid input: {validation_result.to_str()}")
+        return None
+
+    def documents():
+        for i, invoice in enumerate(input.invoice_file_names):
+            blob_content = storage_factory.get_blob_content(
+                app_config.invoices_storage_account_name, input.container_name, invoice)
+            try:
+                yield str(i), blob_content
+            finally:
+                # Large blobs are returned as a memory map over a temporary file
+                if isinstance(blob_content, mmap.mmap):
+                    blob_content.close()
+
+    try:
+        return extract_invoice_data.batch_extractor.submit(documents(), extract_invoice_data.get_extraction_options(app_config.openai_batch_deployment))
+    except Exception:
+        logging.exception(f"Failed to submit the batch jobs for {input.name}")
+        return None
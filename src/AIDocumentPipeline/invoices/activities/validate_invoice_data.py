@@ -1,28 +1,38 @@
 """Validates extracted data from an invoice for expected fields.
 
-This module provides the blueprint for an Azure Function activity that validates extracted data from an invoice.
+This module provides the blueprint for an Azure Function activity that validates extracted data from an invoice against the declarative rules in `invoices/invoice_validation_rules.json`, or the file set by `INVOICES_VALIDATION_RULES_PATH`.
 """
 
 from __future__ import annotations
+from collections.abc import Sequence
 from enum import Flag, auto
 import json
+import os
 from shared.workflow_result import WorkflowResult
 from invoices.invoice_data import InvoiceData
+from invoices.invoice_validation_rules import ValidationRuleSet
 from shared.base_request import BaseRequest
 from shared.validation_result import ValidationResult
+from shared.storage.azure_storage_client_factory import AzureStorageClientFactory
+from shared.storage.blob_reference import BlobReference
+import shared.identity as identity
+from shared import config as app_config
 import azure.durable_functions as df
+import logging
 
 name = "ValidateInvoiceData"
 bp = df.Blueprint()
+storage_factory = AzureStorageClientFactory(
+    identity.default_credential, identity.default_async_credential, app_config.storage_max_connections)
 
 
 @bp.function_name(name)
 @bp.activity_trigger(input_name="input", activity=name)
 def run(input: Request) -> Result:
-    """Validates extracted data from an invoice for expected fields.
+    """Validates extracted data from an invoice for expected fields, and stores the result as `{name}.Validation.json` alongside the invoice.
 
-    :param input: The request containing the extracted invoice data.
-    :return: The validation result.
+    :param input: The request containing a reference to the extracted invoice data.
+    :return: The validation result, with a failed count of one if it could not be stored.
     """
 
     result = Result(input.name or name)
@@ -32,99 +42,105 @@ def run(input: Request) -> Result:
         result.merge(validation_result)
         return result
 
-    data = input.data
-    if not data.customer_name:
-        result.status |= ResultStatus.CustomerNameMissing
-        result.add_error(name, "customer_name is required")
+    data = InvoiceData.from_json(
+        storage_factory.get_blob_content_by_reference(input.data_reference))
 
-    __validate_products__(data, result)
-    __validate_returns__(data, result)
+    validate(data, result)
+    logging.debug(f"Validation rule metrics: {rule_set.get_metrics()}")
 
-    if result.is_valid:
-        result.status = ResultStatus.Success
+    try:
+        storage_factory.upload_blob(input.data_reference.storage_account_name, input.data_reference.container_name, f"{input.name}.Validation.json",
+                                    Result.to_json(result).encode("utf-8"), overwrite=True, metadata=input.metadata)
+    except Exception:
+        logging.exception(f"Failed to store validation result for {input.name}")
+        result.failed_count = 1
+        result.add_error(name,
+                         f"Failed to store validation result for {input.name}.")
 
     return result
 
 
-def __validate_products__(data: InvoiceData, result: Result):
-    if not data.products:
-        result.status |= ResultStatus.ProductsMissing
-        result.add_error("products is required")
-    else:
-        total_quantity = sum([p.quantity for p in data.products])
-        if total_quantity != data.total_quantity:
-            result.status |= ResultStatus.ProductsTotalQuantityInvalid
-            result.add_error(
-                name, f"products quantity total must match total_quantity. Expected: {data.total_quantity}, Actual: {total_quantity}")
-
-        total_price = sum([p.total for p in data.products])
-        if total_price != data.total_price:
-            result.status |= ResultStatus.ProductsTotalPriceInvalid
-            result.add_error(
-                name, f"products price total must match total_price. Expected: {data.total_price}, Actual: {total_price}")
-
-    if not data.products_signatures:
-        result.status |= ResultStatus.ProductsDriverSignatureMissing | ResultStatus.ProductsCustomerSignatureMissing
-        result.add_error(name, "products_signatures is required")
-    else:
-        driver_signature = next(
-            (s for s in data.products_signatures if s.type == "Driver"), None)
-        if not driver_signature:
-            result.status |= ResultStatus.ProductsDriverSignatureMissing
-            result.add_error(
-                name, "products_signatures must contain a driver signature")
-
-        customer_signature = next(
-            (s for s in data.products_signatures if s.type == "Customer"), None)
-        if not customer_signature:
-            result.status |= ResultStatus.ProductsCustomerSignatureMissing
-            result.add_error(
-                name, "products_signatures must contain a customer signature")
-
-
-def __validate_returns__(data: InvoiceData, result: Result):
-    if not data.returns:
-        # Returns are optional
+def validate(data: InvoiceData, result: Result):
+    """Validates extracted data from an invoice for expected fields, updating the status and messages of the specified result.
+
+    :param data: The extracted invoice data.
+    :param result: The validation result to update.
+    """
+
+    status, messages = rule_set.evaluate([data])[0]
+    for message in messages:
+        result.add_error(name, message)
+
+    result.status = status if status else ResultStatus.Success
+
+
+async def store_and_validate_async(container_name: str, blob_name: str, data: InvoiceData, result: Result, metadata: dict[str, str] | None = None):
+    """Stores extracted data from an invoice as `{blob_name}.Data.json`, validates it, and stores the validation result as `{blob_name}.Validation.json` alongside the invoice.
+
+    The result is updated with the validation status and messages, and a processed or failed count of one. Failures to store either output are reported against the `ValidateInvoiceData` action.
+
+    :param container_name: The name of the container within the storage account.
+    :param blob_name: The name of the invoice blob.
+    :param data: The extracted invoice data.
+    :param result: The validation result to update.
+    :param metadata: Optional metadata to set on the stored outputs. Default is `None`.
+    """
+
+    try:
+        await storage_factory.upload_blob_async(
+            app_config.invoices_storage_account_name, container_name, f"{blob_name}.Data.json",
+            InvoiceData.to_json(data).encode("utf-8"), overwrite=True, metadata=metadata)
+    except Exception:
+        logging.exception(f"Failed to store extracted data for {blob_name}")
+        result.failed_count = 1
+        result.add_error(name,
+                         f"Failed to store extracted data for {blob_name}.")
         return
 
-    for i, r in enumerate(data.returns):
-        if not r.reason:
-            result.status |= ResultStatus.ReturnReasonMissing
-            result.add_error(
-                name, f"{r.id} must contain a reason for the return")
-
-    if not data.returns_signatures:
-        result.status |= ResultStatus.ReturnsDriverSignatureMissing | ResultStatus.ReturnsCustomerSignatureMissing
-        result.add_error(name, "returns_signatures is required")
-    else:
-        driver_signature = next(
-            (s for s in data.returns_signatures if s.type == "Driver"), None)
-        if not driver_signature:
-            result.status |= ResultStatus.ReturnsDriverSignatureMissing
-            result.add_error(
-                name, "returns_signatures must contain a driver signature")
-
-        customer_signature = next(
-            (s for s in data.returns_signatures if s.type == "Customer"), None)
-        if not customer_signature:
-            result.status |= ResultStatus.ReturnsCustomerSignatureMissing
-            result.add_error(
-                name, "returns_signatures must contain a customer signature")
+    validate(data, result)
+
+    # The validation result is stored last, so an invoice is only considered up to date once both outputs are stored
+    try:
+        await storage_factory.upload_blob_async(
+            app_config.invoices_storage_account_name, container_name, f"{blob_name}.Validation.json",
+            Result.to_json(result).encode("utf-8"), overwrite=True, metadata=metadata)
+    except Exception:
+        logging.exception(f"Failed to store validation result for {blob_name}")
+        result.failed_count = 1
+        result.add_error(name,
+                         f"Failed to store validation result for {blob_name}.")
+        return
+
+    result.processed_count = 1
+
+
+def validate_many(invoices: Sequence[InvoiceData]) -> list[ResultStatus]:
+    """Validates the extracted data of many invoices at once, evaluating each rule across every invoice before the next.
+
+    No messages are recorded, which makes this suitable for re-validating large archives of extracted data when the rules change.
+
+    :param invoices: The extracted data of each invoice.
+    :return: The validation status of each invoice, in the same order as the invoices.
+    """
+
+    return [status or ResultStatus.Success for status, _ in rule_set.evaluate(invoices)]
 
 
 class Request(BaseRequest):
     """Defines the request payload for the `ValidateInvoiceData` activity."""
 
-    def __init__(self, name: str, data: InvoiceData):
+    def __init__(self, name: str, data_reference: BlobReference, metadata: dict[str, str] | None = None):
         """Initializes a new instance of the Request class.
 
         :param name: The name of the invoice blob.
-        :param data: The extracted invoice data.
+        :param data_reference: A reference to the stored extracted invoice data.
+        :param metadata: Optional metadata to set on the stored validation result. Default is `None`.
         """
 
         super().__init__()
         self.name = name
-        self.data = data
+        self.data_reference = data_reference
+        self.metadata = metadata
 
     def validate(self) -> ValidationResult:
         result = ValidationResult()
@@ -132,8 +148,8 @@ class Request(BaseRequest):
         if not self.name:
             result.add_error("name is required")
 
-        if not self.data:
-            result.add_error("data is required")
+        if not self.data_reference:
+            result.add_error("data_reference is required")
 
         return result
 
@@ -142,7 +158,8 @@ class Request(BaseRequest):
 
         return {
             "name": self.name,
-            "data": self.data.to_dict()
+            "data_reference": self.data_reference.to_dict(),
+            "metadata": self.metadata
         }
 
     @staticmethod
@@ -175,7 +192,8 @@ class Request(BaseRequest):
 
         return Request(
             obj["name"],
-            InvoiceData.from_dict(obj["data"])
+            BlobReference.from_dict(obj["data_reference"]),
+            obj.get("metadata")
         )
 
 
@@ -197,6 +215,9 @@ class Result(WorkflowResult):
             "activity_results": [r.to_dict() for r in self.activity_results],
             "is_valid": self.is_valid,
             "messages": self.messages,
+            "processed_count": self.processed_count,
+            "skipped_count": self.skipped_count,
+            "failed_count": self.failed_count,
             "status": self.status.name
         }
 
@@ -233,6 +254,9 @@ class Result(WorkflowResult):
         result.messages = obj["messages"]
         result.activity_results = [WorkflowResult.from_dict(
             r) for r in obj["activity_results"]]
+        result.processed_count = obj.get("processed_count", 0)
+        result.skipped_count = obj.get("skipped_count", 0)
+        result.failed_count = obj.get("failed_count", 0)
 
         statuses = obj["status"].split("|")
         for status in statuses:
@@ -255,3 +279,10 @@ class ResultStatus(Flag):
     ReturnsDriverSignatureMissing = auto()
     ReturnsCustomerSignatureMissing = auto()
     ReturnReasonMissing = auto()
+
+
+# The rules are compiled once per process, after the statuses they set are defined
+rule_set = ValidationRuleSet.from_file(
+    app_config.invoices_validation_rules_path or os.path.join(os.path.dirname(
+        os.path.dirname(os.path.abspath(__file__))), "invoice_validation_rules.json"),
+    ResultStatus, app_config.invoices_validation_tolerance, app_config.invoices_validation_exact)
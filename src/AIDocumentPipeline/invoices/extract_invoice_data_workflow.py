@@ -4,11 +4,13 @@ This workflow orchestrates the extraction of data from the invoice files in a sp
 """
 
 from __future__ import annotations
-from invoices.invoice_data import InvoiceData
-from shared.storage import write_bytes_to_blob
-from invoices.activities import extract_invoice_data, validate_invoice_data
+from datetime import timedelta
+from invoices.activities import extract_invoice_data, get_invoice_batch_status, get_invoices_to_process, process_invoice, store_invoice_batch_results, submit_invoice_batch, validate_invoice_data
+from invoices.invoice_folder import InvoiceFolder
+from shared.documents.batch_document_data_extractor import BatchJobStatus
 from shared.workflow_result import WorkflowResult
 import azure.durable_functions as df
+from azure.durable_functions.models.Task import TaskBase
 from shared import config as app_config
 
 name = "ExtractInvoiceDataWorkflow"
@@ -36,26 +38,114 @@ def run(context: df.DurableOrchestrationContext):
 
     result.add_message("InvoiceFolder.validate", "input is valid")
 
-    # Step 3: Process each invoice file
-    for invoice in input.invoice_file_names:
-        invoice_data = yield context.call_activity(extract_invoice_data.name, extract_invoice_data.Request(input.container_name, invoice))
+    # Step 3: Determine which invoice files have changed since they were last processed
+    invoices_to_process = yield context.call_activity(get_invoices_to_process.name, input)
+
+    result.skipped_count = len(invoices_to_process.skipped)
+    if result.skipped_count:
+        result.add_message(get_invoices_to_process.name,
+                           f"Skipped {result.skipped_count} invoices that are up to date.")
+
+    # Step 4: Process the changed invoice files, either as offline batch jobs or in windows of parallel activities, aggregating the results in the original order
+    if app_config.invoices_batch_job:
+        yield from __process_batch_job__(context, input, invoices_to_process.invoices, result)
+    else:
+        invoices = list(invoices_to_process.invoices.items())
+        window_size = max(app_config.invoices_max_parallel_invoices, 1)
+
+        for window_start in range(0, len(invoices), window_size):
+            window = invoices[window_start:window_start + window_size]
+
+            if app_config.invoices_fused_activity:
+                # Extract, store, and validate each invoice in a single activity to avoid a replay per step
+                process_invoice_tasks: list[TaskBase] = [context.call_activity(process_invoice.name, process_invoice.Request(input.container_name, invoice, source_metadata))
+                                                         for invoice, source_metadata in window]
+
+                invoice_results = yield context.task_all(process_invoice_tasks)
+
+                for (invoice, _), invoice_result in zip(window, invoice_results):
+                    __add_invoice_result__(result, invoice, invoice_result)
+                continue
+
+            # Activities store their outputs and return references, so the invoice data is never persisted in the orchestration history
+            extract_invoice_data_tasks: list[TaskBase] = [context.call_activity(extract_invoice_data.name, extract_invoice_data.Request(input.container_name, invoice, source_metadata))
+                                                          for invoice, source_metadata in window]
+
+            invoice_data_references = yield context.task_all(extract_invoice_data_tasks)
+
+            validate_invoice_data_tasks: list[TaskBase] = []
+            for (invoice, source_metadata), invoice_data_reference in zip(window, invoice_data_references):
+                if invoice_data_reference:
+                    # The validation result is stored last, so an invoice is only considered up to date once both outputs are stored
+                    validate_invoice_data_tasks.append(context.call_activity(validate_invoice_data.name, validate_invoice_data.Request(
+                        invoice, invoice_data_reference, source_metadata)))
+
+            invoice_data_validations = []
+            if validate_invoice_data_tasks:
+                invoice_data_validations = yield context.task_all(validate_invoice_data_tasks)
+
+            invoice_data_validations = iter(invoice_data_validations)
+
+            for (invoice, _), invoice_data_reference in zip(window, invoice_data_references):
+                if not invoice_data_reference:
+                    result.failed_count += 1
+                    result.add_error(extract_invoice_data.name,
+                                     f"Failed to extract and store data for {invoice}.")
+                    continue
+
+                # Invoices whose validation result could not be stored are failed, as they are by the ProcessInvoice activity
+                invoice_data_validation = next(invoice_data_validations)
+                result.merge(invoice_data_validation)
+                if invoice_data_validation.failed_count:
+                    result.failed_count += 1
+                else:
+                    result.processed_count += 1
+                    result.processed_names.append(invoice)
+
+    result.add_message(name,
+                       f"Processed {result.processed_count}, skipped {result.skipped_count}, and failed {result.failed_count} invoices.")
 
-        if not invoice_data:
-            result.add_error(extract_invoice_data.name,
-                             f"Failed to extract data for {invoice}.")
-            continue
+    return result.to_dict()
 
-        invoice_data_stored = yield context.call_activity(write_bytes_to_blob.name, write_bytes_to_blob.Request(app_config.invoices_storage_account_name, input.container_name, f"{invoice}.Data.json", InvoiceData.to_json(invoice_data).encode("utf-8"), True))
 
-        if not invoice_data_stored:
-            result.add_error(write_bytes_to_blob.name,
-                             f"Failed to store extracted data for {invoice}.")
-            continue
+def __process_batch_job__(context: df.DurableOrchestrationContext, input: InvoiceFolder, invoices: dict[str, dict[str, str]], result: WorkflowResult):
+    if not invoices:
+        return
 
-        invoice_data_validation = yield context.call_activity(validate_invoice_data.name, validate_invoice_data.Request(invoice, invoice_data))
+    batch_ids = yield context.call_activity(submit_invoice_batch.name, InvoiceFolder(input.container_name, input.name, list(invoices)))
 
-        result.merge(invoice_data_validation)
+    if not batch_ids:
+        result.failed_count += len(invoices)
+        result.add_error(submit_invoice_batch.name,
+                         f"Failed to submit the batch jobs for {input.name}.")
+        return
 
-        yield context.call_activity(write_bytes_to_blob.name, write_bytes_to_blob.Request(app_config.invoices_storage_account_name, input.container_name, f"{invoice}.Validation.json", WorkflowResult.to_json(invoice_data_validation).encode("utf-8"), True))
+    result.add_message(submit_invoice_batch.name,
+                       f"Submitted batch jobs {', '.join(batch_ids)} for {len(invoices)} invoices.")
 
-    return result.to_dict()
+    # Durable timers wait without holding a worker, so batch jobs can take up to their completion window. Only the jobs that have not finished are polled.
+    pending_batch_ids = list(batch_ids)
+    while pending_batch_ids:
+        yield context.create_timer(context.current_utc_datetime + timedelta(seconds=app_config.invoices_batch_poll_interval_seconds))
+        statuses = yield context.task_all([context.call_activity(get_invoice_batch_status.name, batch_id) for batch_id in pending_batch_ids])
+
+        for batch_id, status in zip(list(pending_batch_ids), map(BatchJobStatus, statuses)):
+            if status.is_terminal:
+                pending_batch_ids.remove(batch_id)
+                result.add_message(get_invoice_batch_status.name,
+                                   f"Batch job {batch_id} finished with status {status.value}.")
+
+    # Expired and cancelled batch jobs may still have results for some of the invoices
+    invoice_results = yield context.call_activity(store_invoice_batch_results.name, store_invoice_batch_results.Request(input.container_name, batch_ids, invoices))
+
+    for invoice, invoice_result in zip(invoices, invoice_results):
+        __add_invoice_result__(result, invoice, invoice_result)
+
+
+def __add_invoice_result__(result: WorkflowResult, invoice: str, invoice_result: WorkflowResult):
+    result.merge(invoice_result)
+    result.processed_count += invoice_result.processed_count
+    result.failed_count += invoice_result.failed_count
+    # The names of the processed invoices are kept, so that the batch workflow exports only the invoices of its own run
+    if invoice_result.processed_count:
+        result.processed_names.append(invoice)
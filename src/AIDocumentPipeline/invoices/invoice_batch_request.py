@@ -7,14 +7,28 @@ from shared.base_request import BaseRequest
 class InvoiceBatchRequest(BaseRequest):
     """Defines a request to process a batch of invoices in a Storage container."""
 
-    def __init__(self, container_name: str):
+    def __init__(self, container_name: str, force: bool = False, page_offset: int = 0, continuation_token: str | None = None, generation: int = 0, processed_count: int = 0, skipped_count: int = 0, failed_count: int = 0):
         """Initializes a new instance of the InvoiceBatchRequest class.
 
         :param container_name: The name of the Azure Blob Storage container containing the invoice folders.
+        :param force: A flag indicating whether to reprocess invoices whose extracted data is already up to date with the invoice file. Default is `False`.
+        :param page_offset: The number of invoice folders of the page at the continuation token that were processed by previous generations of the workflow. Default is 0.
+        :param continuation_token: The continuation token of the page of invoice folders to resume the listing from. Default is `None` (the first page).
+        :param generation: The number of previous generations of the workflow. Default is 0.
+        :param processed_count: The number of invoices processed by previous generations of the workflow. Default is 0.
+        :param skipped_count: The number of invoices skipped by previous generations of the workflow. Default is 0.
+        :param failed_count: The number of invoices that failed in previous generations of the workflow. Default is 0.
         """
 
         super().__init__()
         self.container_name = container_name
+        self.force = force
+        self.page_offset = page_offset
+        self.continuation_token = continuation_token
+        self.generation = generation
+        self.processed_count = processed_count
+        self.skipped_count = skipped_count
+        self.failed_count = failed_count
 
     def validate(self) -> ValidationResult:
         result = ValidationResult()
@@ -28,7 +42,14 @@ class InvoiceBatchRequest(BaseRequest):
         """Returns a dictionary representation of the object."""
 
         return {
-            "container_name": self.container_name
+            "container_name": self.container_name,
+            "force": self.force,
+            "page_offset": self.page_offset,
+            "continuation_token": self.continuation_token,
+            "generation": self.generation,
+            "processed_count": self.processed_count,
+            "skipped_count": self.skipped_count,
+            "failed_count": self.failed_count
         }
 
     @staticmethod
@@ -60,5 +81,12 @@ class InvoiceBatchRequest(BaseRequest):
         """
 
         return InvoiceBatchRequest(
-            obj["container_name"]
+            obj["container_name"],
+            obj.get("force", False),
+            obj.get("page_offset", 0),
+            obj.get("continuation_token"),
+            obj.get("generation", 0),
+            obj.get("processed_count", 0),
+            obj.get("skipped_count", 0),
+            obj.get("failed_count", 0)
         )
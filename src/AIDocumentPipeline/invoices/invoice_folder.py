@@ -7,18 +7,20 @@ from shared.base_request import BaseRequest
 class InvoiceFolder(BaseRequest):
     """Defines a model for grouping a set of invoice files by their containing folder."""
 
-    def __init__(self, container_name: str, name: str, invoice_file_names: list[str]):
+    def __init__(self, container_name: str, name: str, invoice_file_names: list[str], force: bool = False):
         """Initializes a new instance of the InvoiceFolder class.
 
         :param container_name: The name of the Azure Blob Storage container containing the invoice files.
         :param name: The name of the folder containing the invoice files.
         :param invoice_file_names: A list of the blob names of the invoice files in the container.
+        :param force: A flag indicating whether to reprocess invoices whose extracted data is already up to date with the invoice file. Default is `False`.
         """
 
         super().__init__()
         self.container_name = container_name
         self.name = name
         self.invoice_file_names = invoice_file_names
+        self.force = force
 
     def validate(self) -> ValidationResult:
         result = ValidationResult()
@@ -40,7 +42,8 @@ class InvoiceFolder(BaseRequest):
         return {
             "container_name": self.container_name,
             "name": self.name,
-            "invoice_file_names": self.invoice_file_names
+            "invoice_file_names": self.invoice_file_names,
+            "force": self.force
         }
 
     @staticmethod
@@ -74,6 +77,7 @@ class InvoiceFolder(BaseRequest):
         result = InvoiceFolder(
             obj["container_name"],
             obj["name"],
-            obj["invoice_file_names"]
+            obj["invoice_file_names"],
+            obj.get("force", False)
         )
         return result
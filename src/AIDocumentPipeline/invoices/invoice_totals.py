@@ -0,0 +1,124 @@
+"""Computes and checks the line item totals of invoices in bulk.
+
+This module provides the calculation of line item totals, such as the product quantity and price totals, of many invoices at once, laying out the line items of every invoice as flat arrays and summing them with NumPy when it is installed, and comparing them with the stated totals with a tolerance or exactly as decimals.
+"""
+
+from __future__ import annotations
+from collections.abc import Sequence
+from dataclasses import dataclass
+from decimal import Decimal, InvalidOperation
+import math
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+@dataclass(slots=True)
+class SumCheck:
+    """Defines the sum of a set of values and whether it matches the stated total."""
+
+    actual: float | Decimal
+    """The sum of the values."""
+
+    valid: bool
+    """A flag indicating whether the sum matches the stated total."""
+
+
+def compute_sums(value_lists: Sequence[Sequence], expected_totals: Sequence, tolerance: float = 0.005, exact: bool = False) -> list[SumCheck]:
+    """Computes the sums of many lists of values, e.g. the quantities of the products of many invoices, and checks each against a stated total.
+
+    Missing or non-numeric values count as zero. A missing or non-numeric stated total never matches.
+
+    :param value_lists: The lists of values to sum.
+    :param expected_totals: The stated total of each list of values, in the same order.
+    :param tolerance: The largest absolute difference between a sum and its stated total that is considered a match. Default is 0.005.
+    :param exact: A flag indicating whether to sum the values as decimals of their shortest representation and compare them exactly, ignoring the tolerance. Default is `False`.
+    :return: The sum of each list of values and whether it matches, in the same order as the lists.
+    """
+
+    if exact:
+        return [__get_exact_sum__(values, expected) for values, expected in zip(value_lists, expected_totals)]
+
+    # A single list is faster to sum without the overhead of laying out arrays
+    if numpy is None or len(value_lists) == 1:
+        return [__get_float_sum__(values, expected, tolerance) for values, expected in zip(value_lists, expected_totals)]
+
+    return __get_vectorized_sums__(value_lists, expected_totals, tolerance)
+
+
+def format_sum(actual: float | Decimal, values: Sequence) -> str:
+    """Formats a sum as the built-in `sum` of the values would be, so that the sum of whole numbers is shown without a fractional part.
+
+    :param actual: The sum of the values, as computed by `compute_sums`.
+    :param values: The values that were summed.
+    :return: The string representation of the sum.
+    """
+
+    # Sums are computed as floats, but the sum of whole numbers, or missing values that count as zero, is a whole number
+    if isinstance(actual, float) and actual.is_integer() and all(value is None or isinstance(value, int) for value in values):
+        return str(int(actual))
+
+    return str(actual)
+
+
+def __get_vectorized_sums__(value_lists: Sequence[Sequence], expected_totals: Sequence, tolerance: float) -> list[SumCheck]:
+    list_count = len(value_lists)
+    if not list_count:
+        return []
+
+    value_counts = numpy.fromiter(
+        (len(values) for values in value_lists), dtype=numpy.int64, count=list_count)
+
+    # Every value of every list is laid out in one array, with the index of its list in another
+    list_indexes = numpy.repeat(numpy.arange(list_count), value_counts)
+    values = numpy.nan_to_num(__to_float_array__(
+        [value for values in value_lists for value in values]))
+
+    sums = numpy.bincount(list_indexes, weights=values, minlength=list_count)
+
+    # Missing stated totals are NaN, which never compare as within the tolerance
+    expected = __to_float_array__(list(expected_totals))
+    valid = numpy.abs(sums - expected) <= tolerance
+
+    return [SumCheck(actual, is_valid) for actual, is_valid in zip(sums.tolist(), valid.tolist())]
+
+
+def __to_float_array__(values: list):
+    try:
+        # Missing values are converted to NaN, and numeric strings to their value
+        return numpy.array(values, dtype=numpy.float64)
+    except (TypeError, ValueError):
+        return numpy.array([__to_float__(v, math.nan) for v in values], dtype=numpy.float64)
+
+
+def __get_float_sum__(values: Sequence, expected, tolerance: float) -> SumCheck:
+    actual = math.fsum(__to_float__(value) for value in values)
+    return SumCheck(actual, abs(actual - __to_float__(expected, math.nan)) <= tolerance)
+
+
+def __get_exact_sum__(values: Sequence, expected) -> SumCheck:
+    actual = sum((__to_decimal__(value) or Decimal(0) for value in values), Decimal(0))
+    return SumCheck(actual, actual == __to_decimal__(expected))
+
+
+def __to_float__(value, default: float = 0.0) -> float:
+    if value is None:
+        return default
+
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def __to_decimal__(value) -> Decimal | None:
+    if value is None or isinstance(value, bool):
+        return None
+
+    try:
+        # The string representation of a float is the shortest that round-trips, e.g. 0.1 rather than 0.1000000000000000055511151231257827
+        return Decimal(str(value))
+    except (InvalidOperation, ValueError):
+        return None
@@ -0,0 +1,281 @@
+"""Declarative validation rules for extracted invoice data.
+
+This module provides rules that are declared as data, e.g. in a JSON file, and compiled once into a rule set that evaluates them one rule at a time across many invoices, short-circuiting the rules that no longer apply to an invoice and recording the evaluation time of each rule.
+
+Each rule definition is a dictionary with a `type`, a `status` to set when the rule fails (one or more `ResultStatus` names separated by `|`), a `message`, and the options of its type:
+
+- `required`: the `field` must have a value.
+- `sum_equals`: the sum of the `field` of each of the `items` must match the `total` field, within the `tolerance`, or exactly if `exact` is set.
+- `item_required`: the `field` of each of the `items` must have a value. The message can reference the `id` of the failing item.
+- `required_signature`: the `signatures` must contain a signature with the `signature_type`.
+
+Any rule can also declare `when`, a field that must have a value for the rule to apply; `skip_if`, statuses that skip the rule if an earlier rule has already set them; and `fatal`, which stops evaluating the remaining rules for an invoice once the rule fails.
+"""
+
+from __future__ import annotations
+from abc import ABC, abstractmethod
+from collections.abc import Sequence
+from enum import Flag
+from functools import reduce
+from operator import attrgetter, or_
+import json
+import threading
+import time
+from invoices.invoice_totals import compute_sums, format_sum
+
+
+class ValidationRule(ABC):
+    """Defines the base class for a compiled validation rule."""
+
+    def __init__(self, name: str, status: Flag, message: str, when: str | None = None, skip_if: Flag | None = None, fatal: bool = False):
+        """Initializes a new instance of the ValidationRule class.
+
+        :param name: The name of the rule, used to report its metrics.
+        :param status: The status flags to set when the rule fails.
+        :param message: The message to record when the rule fails.
+        :param when: The field that must have a value for the rule to apply. Default is `None` (always applies).
+        :param skip_if: The status flags that skip the rule if an earlier rule has set any of them. Default is `None`.
+        :param fatal: A flag indicating whether to stop evaluating the remaining rules for an invoice when this rule fails. Default is `False`.
+        """
+
+        self.name = name
+        self.status = status
+        self.message = message
+        self.when = attrgetter(when) if when else None
+        self.skip_if = skip_if
+        self.fatal = fatal
+
+    def applies(self, data, status: Flag) -> bool:
+        """Determines whether the rule applies to an invoice given the status set by earlier rules.
+
+        :param data: The extracted invoice data.
+        :param status: The status flags set by earlier rules.
+        :return: `True` if the rule should be evaluated for the invoice; otherwise, `False`.
+        """
+
+        if self.skip_if and status & self.skip_if:
+            return False
+
+        return not self.when or bool(self.when(data))
+
+    @abstractmethod
+    def check(self, invoices: Sequence) -> list[list[str] | None]:
+        """Evaluates the rule for many invoices.
+
+        :param invoices: The extracted data of each invoice the rule applies to.
+        :return: For each invoice, `None` if the rule passed; otherwise, the failure messages.
+        """
+
+
+class RequiredRule(ValidationRule):
+    """Defines a rule that a field must have a value."""
+
+    def __init__(self, field: str, **kwargs):
+        """Initializes a new instance of the RequiredRule class.
+
+        :param field: The field that must have a value.
+        :param kwargs: The options of the `ValidationRule` base class.
+        """
+
+        super().__init__(**kwargs)
+        self.field = attrgetter(field)
+
+    def check(self, invoices: Sequence) -> list[list[str] | None]:
+        return [None if self.field(data) else [self.message] for data in invoices]
+
+
+class SumEqualsRule(ValidationRule):
+    """Defines a rule that the sum of a field of a list of items must match a total field."""
+
+    def __init__(self, items: str, field: str, total: str, tolerance: float, exact: bool, **kwargs):
+        """Initializes a new instance of the SumEqualsRule class.
+
+        :param items: The field containing the list of items.
+        :param field: The field of each item to sum.
+        :param total: The field containing the stated total.
+        :param tolerance: The largest absolute difference between the sum and the total that is considered a match.
+        :param exact: A flag indicating whether to compare the sum and the total exactly as decimals, ignoring the tolerance.
+        :param kwargs: The options of the `ValidationRule` base class.
+        """
+
+        super().__init__(**kwargs)
+        self.items = attrgetter(items)
+        self.field = field
+        self.total = attrgetter(total)
+        self.tolerance = tolerance
+        self.exact = exact
+
+    def check(self, invoices: Sequence) -> list[list[str] | None]:
+        value_lists = [[getattr(item, self.field) for item in self.items(data) or ()]
+                       for data in invoices]
+        expected_totals = [self.total(data) for data in invoices]
+
+        sums = compute_sums(value_lists, expected_totals,
+                            self.tolerance, self.exact)
+
+        return [None if sum_check.valid else [self.message.format(expected=expected, actual=format_sum(sum_check.actual, values))]
+                for sum_check, expected, values in zip(sums, expected_totals, value_lists)]
+
+
+class ItemRequiredRule(ValidationRule):
+    """Defines a rule that a field of each item in a list must have a value."""
+
+    def __init__(self, items: str, field: str, **kwargs):
+        """Initializes a new instance of the ItemRequiredRule class.
+
+        :param items: The field containing the list of items.
+        :param field: The field of each item that must have a value.
+        :param kwargs: The options of the `ValidationRule` base class.
+        """
+
+        super().__init__(**kwargs)
+        self.items = attrgetter(items)
+        self.field = attrgetter(field)
+
+    def check(self, invoices: Sequence) -> list[list[str] | None]:
+        failures = []
+        for data in invoices:
+            messages = [self.message.format(id=getattr(item, "id", None))
+                        for item in self.items(data) or () if not self.field(item)]
+            failures.append(messages or None)
+        return failures
+
+
+class RequiredSignatureRule(ValidationRule):
+    """Defines a rule that a list of signatures must contain a signature of a type."""
+
+    def __init__(self, signatures: str, signature_type: str, **kwargs):
+        """Initializes a new instance of the RequiredSignatureRule class.
+
+        :param signatures: The field containing the list of signatures.
+        :param signature_type: The type of signature that must be present.
+        :param kwargs: The options of the `ValidationRule` base class.
+        """
+
+        super().__init__(**kwargs)
+        self.signatures = attrgetter(signatures)
+        self.signature_type = signature_type
+
+    def check(self, invoices: Sequence) -> list[list[str] | None]:
+        return [None if any(s.type == self.signature_type for s in self.signatures(data) or ()) else [self.message]
+                for data in invoices]
+
+
+rule_types: dict[str, type[ValidationRule]] = {
+    "required": RequiredRule,
+    "sum_equals": SumEqualsRule,
+    "item_required": ItemRequiredRule,
+    "required_signature": RequiredSignatureRule
+}
+
+
+class ValidationRuleSet:
+    """Defines a compiled set of validation rules, evaluated in order."""
+
+    def __init__(self, rules: list[ValidationRule], status_type: type[Flag]):
+        """Initializes a new instance of the ValidationRuleSet class.
+
+        :param rules: The compiled rules, in evaluation order.
+        :param status_type: The status flags type set by the rules, whose zero value means that no rule failed.
+        """
+
+        self.rules = rules
+        self.status_type = status_type
+        self._metrics = {rule.name: {"evaluations": 0, "failures": 0, "seconds": 0.0}
+                         for rule in rules}
+        self._metrics_lock = threading.Lock()
+
+    @staticmethod
+    def compile(definitions: list[dict], status_type: type[Flag], tolerance: float = 0.005, exact: bool = False) -> ValidationRuleSet:
+        """Compiles rule definitions into a rule set.
+
+        :param definitions: The rule definitions, in evaluation order.
+        :param status_type: The status flags type whose member names are used in the `status` and `skip_if` of the definitions.
+        :param tolerance: The default tolerance of `sum_equals` rules. Default is 0.005.
+        :param exact: The default of the `exact` option of `sum_equals` rules. Default is `False`.
+        :return: The compiled rule set.
+        """
+
+        def get_status(names: str | None) -> Flag | None:
+            if not names:
+                return None
+            return reduce(or_, (status_type[n.strip()] for n in names.split("|")), status_type(0))
+
+        rules = []
+        for i, definition in enumerate(definitions):
+            options = dict(definition)
+            rule_type = options.pop("type")
+            if rule_type not in rule_types:
+                raise ValueError(
+                    f"Unknown validation rule type '{rule_type}' in rule {i}")
+
+            if rule_type == "sum_equals":
+                options.setdefault("tolerance", tolerance)
+                options.setdefault("exact", exact)
+
+            options["name"] = options.get("name") or f"{i}:{rule_type}:{options['status']}"
+            options["status"] = get_status(options["status"])
+            options["skip_if"] = get_status(options.get("skip_if"))
+
+            rules.append(rule_types[rule_type](**options))
+
+        return ValidationRuleSet(rules, status_type)
+
+    @staticmethod
+    def from_file(path: str, status_type: type[Flag], tolerance: float = 0.005, exact: bool = False) -> ValidationRuleSet:
+        """Compiles the rule definitions in a JSON file into a rule set.
+
+        :param path: The path to a JSON file containing a list of rule definitions.
+        :param status_type: The status flags type whose member names are used in the `status` and `skip_if` of the definitions.
+        :param tolerance: The default tolerance of `sum_equals` rules. Default is 0.005.
+        :param exact: The default of the `exact` option of `sum_equals` rules. Default is `False`.
+        :return: The compiled rule set.
+        """
+
+        with open(path, "r", encoding="utf-8") as file:
+            return ValidationRuleSet.compile(json.load(file), status_type, tolerance, exact)
+
+    def evaluate(self, invoices: Sequence) -> list[tuple[Flag, list[str]]]:
+        """Evaluates the rules for many invoices, one rule at a time across every invoice it applies to.
+
+        :param invoices: The extracted data of each invoice.
+        :return: For each invoice, the combined status flags of the failed rules and their messages.
+        """
+
+        statuses = [self.status_type(0)] * len(invoices)
+        messages: list[list[str]] = [[] for _ in invoices]
+        stopped = [False] * len(invoices)
+
+        for rule in self.rules:
+            start_time = time.perf_counter()
+
+            applicable = [i for i, data in enumerate(invoices)
+                          if not stopped[i] and rule.applies(data, statuses[i])]
+
+            failure_count = 0
+            if applicable:
+                failures = rule.check([invoices[i] for i in applicable])
+                for i, failure in zip(applicable, failures):
+                    if failure is None:
+                        continue
+
+                    failure_count += 1
+                    statuses[i] |= rule.status
+                    messages[i].extend(failure)
+                    if rule.fatal:
+                        stopped[i] = True
+
+            duration_seconds = time.perf_counter() - start_time
+            with self._metrics_lock:
+                metrics = self._metrics[rule.name]
+                metrics["evaluations"] += len(applicable)
+                metrics["failures"] += failure_count
+                metrics["seconds"] += duration_seconds
+
+        return list(zip(statuses, messages))
+
+    def get_metrics(self) -> dict:
+        """Returns the number of evaluations and failures, and the total evaluation time in seconds, of each rule since the rule set was compiled."""
+
+        with self._metrics_lock:
+            return {name: dict(metrics) for name, metrics in self._metrics.items()}
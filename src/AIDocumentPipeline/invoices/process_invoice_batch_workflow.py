@@ -11,7 +11,9 @@ import azure.durable_functions as df
 from azure.durable_functions.models.Task import TaskBase
 import azure.functions as func
 import logging
-from invoices.activities import get_invoice_folders
+from invoices.activities import export_invoice_batch, get_invoice_folder_page, get_invoice_folders, merge_invoice_batch_export, store_workflow_result
+from invoices.invoice_folder import InvoiceFolder
+from shared import config as app_config
 
 name = "ProcessInvoiceBatchWorkflow"
 http_trigger_name = "ProcessInvoiceBatchHttp"
@@ -73,9 +75,12 @@ def run(context: df.DurableOrchestrationContext):
     :return: The `WorkflowResult` of the workflow operation containing the validation messages and activity results.
     """
 
-    # Step 1: Extract the input from the context
+    # Step 1: Extract the input from the context, including the aggregate counts of any previous generations of the workflow
     input = context.get_input()
     result = WorkflowResult(name)
+    result.processed_count = input.processed_count
+    result.skipped_count = input.skipped_count
+    result.failed_count = input.failed_count
 
     # Step 2: Validate the input
     validation_result = input.validate()
@@ -83,27 +88,149 @@ def run(context: df.DurableOrchestrationContext):
         result.merge(validation_result)
         return result
 
-    result.add_message("InvoiceBatchRequest.validate", "input is valid")
+    if not input.generation:
+        result.add_message("InvoiceBatchRequest.validate", "input is valid")
 
-    # Step 3: Get the invoice folders from the blob container
+    # Step 3: Process the invoice folders a page at a time, or a generation of folders at a time after those of the previous generation
+    if app_config.invoices_folder_page_size > 0:
+        yield from __process_folder_page__(context, input, result)
+    else:
+        yield from __process_folder_generation__(context, input, result)
+
+    if context.will_continue_as_new:
+        return None
+
+    # Step 4: Optionally merge the exports of each generation into a single file for downstream jobs
+    if app_config.invoices_batch_export_format:
+        yield from __merge_batch_export__(context, input, result)
+
+    result.add_message(name,
+                       f"Processed {result.processed_count}, skipped {result.skipped_count}, and failed {result.failed_count} invoices.")
+
+    return result.to_dict()
+
+
+def __process_folder_page__(context: df.DurableOrchestrationContext, input: InvoiceBatchRequest, result: WorkflowResult):
+    folder_page = yield context.call_activity(get_invoice_folder_page.name, get_invoice_folder_page.Request(input.container_name, app_config.invoices_folder_page_size, input.continuation_token, input.force))
+
+    result.add_message(get_invoice_folder_page.name,
+                       f"Retrieved a page of {len(folder_page.folders)} invoice folders.")
+
+    yield from __process_folders__(context, folder_page.folders, result)
+
+    if app_config.invoices_batch_export_format:
+        yield from __export_generation__(context, input, result)
+
+    yield from __store_generation_result__(context, input, result)
+
+    # Restart the workflow from the next page with only the aggregate counts, to keep the orchestration history bounded
+    if folder_page.continuation_token:
+        context.continue_as_new(InvoiceBatchRequest(
+            input.container_name, input.force, continuation_token=folder_page.continuation_token,
+            generation=input.generation + 1, processed_count=result.processed_count, skipped_count=result.skipped_count, failed_count=result.failed_count))
+
+
+def __process_folder_generation__(context: df.DurableOrchestrationContext, input: InvoiceBatchRequest, result: WorkflowResult):
+    # The listing resumes from the continuation token of the page the previous generation stopped in, after the folders it processed
     invoice_folders = yield context.call_activity(get_invoice_folders.name, input)
 
     result.add_message(get_invoice_folders.name,
-                       f"Retrieved {len(invoice_folders)} invoice folders.")
+                       f"Retrieved {len(invoice_folders.folders)} invoice folders to process.")
 
-    # Step 4: Process the invoices in each folder.
-    extract_invoice_data_tasks: list[TaskBase] = []
-    for folder in invoice_folders:
-        extract_invoice_data_task = context.call_sub_orchestrator(
-            extract_invoice_data_workflow.name, folder)
-        extract_invoice_data_tasks.append(extract_invoice_data_task)
+    yield from __process_folders__(context, invoice_folders.folders, result)
+
+    if app_config.invoices_batch_export_format:
+        yield from __export_generation__(context, input, result)
+
+    yield from __store_generation_result__(context, input, result)
+
+    # Restart the workflow at the position after the processed folders with only the aggregate counts, to keep the orchestration history bounded
+    if invoice_folders.has_more:
+        context.continue_as_new(InvoiceBatchRequest(
+            input.container_name, input.force, invoice_folders.page_offset, invoice_folders.continuation_token,
+            generation=input.generation + 1, processed_count=result.processed_count, skipped_count=result.skipped_count, failed_count=result.failed_count))
+
+
+def __store_generation_result__(context: df.DurableOrchestrationContext, input: InvoiceBatchRequest, result: WorkflowResult):
+    # The detailed results of each generation are stored outside of the orchestration, as they grow with the number of invoices
+    blob_name = f"{input.container_name}/{context.instance_id}/{input.generation:05d}.json"
+
+    result_reference = yield context.call_activity(store_workflow_result.name, store_workflow_result.Request(blob_name, result.to_dict()))
 
-    yield context.task_all(extract_invoice_data_tasks)
+    if not result_reference:
+        result.add_error(store_workflow_result.name,
+                         f"Failed to store the result of generation {input.generation} as {blob_name}.")
+        return
+
+    result.add_message(store_workflow_result.name,
+                       f"Stored the result of generation {input.generation} as {app_config.invoices_batch_results_container_name}/{blob_name}.")
+
+
+def __get_export_parts_prefix__(context: df.DurableOrchestrationContext, input: InvoiceBatchRequest) -> str:
+    return f"{input.container_name}/{context.instance_id}/parts/"
+
+
+def __export_generation__(context: df.DurableOrchestrationContext, input: InvoiceBatchRequest, result: WorkflowResult):
+    # Only the invoices processed by this run are exported, rather than every output in the container, and each generation exports its own part so that no single activity exports the whole batch
+    invoices = [invoice for folder_result in result.activity_results for invoice in folder_result.processed_names]
+    if not invoices:
+        return
+
+    export_format = app_config.invoices_batch_export_format.lower()
+    blob_name = f"{__get_export_parts_prefix__(context, input)}{input.generation:05d}.{export_format}"
+
+    export_result = yield context.call_activity(export_invoice_batch.name, export_invoice_batch.Request(input.container_name, blob_name, export_format, invoices))
+
+    if not export_result.blob_name:
+        result.add_error(export_invoice_batch.name,
+                         f"Failed to export the invoices of generation {input.generation} to {blob_name}.")
+        return
+
+    result.add_message(export_invoice_batch.name,
+                       f"Exported {export_result.invoice_count} invoices as {export_result.row_count} rows to {export_result.blob_name}.")
+
+
+def __merge_batch_export__(context: df.DurableOrchestrationContext, input: InvoiceBatchRequest, result: WorkflowResult):
+    export_format = app_config.invoices_batch_export_format.lower()
+    blob_name = f"{input.container_name}/{context.current_utc_datetime:%Y-%m-%d}/{context.instance_id}.{export_format}"
+
+    merge_result = yield context.call_activity(merge_invoice_batch_export.name, merge_invoice_batch_export.Request(__get_export_parts_prefix__(context, input), blob_name, export_format))
+
+    if not merge_result.blob_name:
+        result.add_error(merge_invoice_batch_export.name,
+                         f"Failed to merge the export of the batch to {blob_name}.")
+        return
+
+    result.add_message(merge_invoice_batch_export.name,
+                       f"Merged {merge_result.part_count} exported parts as {merge_result.row_count} rows to {merge_result.blob_name}.")
+
+
+def __process_folders__(context: df.DurableOrchestrationContext, folders: list[InvoiceFolder], result: WorkflowResult):
+    # Keep at most a fixed number of sub-orchestrations in flight, starting the next folder as each one completes
+    max_parallel_folders = max(app_config.invoices_max_parallel_folders, 1)
+
+    extract_invoice_data_tasks: list[TaskBase] = []
+    in_flight_tasks: list[TaskBase] = []
+    while len(extract_invoice_data_tasks) < len(folders) or in_flight_tasks:
+        while len(extract_invoice_data_tasks) < len(folders) and len(in_flight_tasks) < max_parallel_folders:
+            extract_invoice_data_task = context.call_sub_orchestrator(
+                extract_invoice_data_workflow.name, folders[len(extract_invoice_data_tasks)])
+            extract_invoice_data_tasks.append(extract_invoice_data_task)
+            in_flight_tasks.append(extract_invoice_data_task)
+
+        completed_task = yield context.task_any(in_flight_tasks)
+        in_flight_tasks.remove(completed_task)
+
+    # Results are added in folder order, rather than completion order, so that the batch result is deterministic
+    for folder, task in zip(folders, extract_invoice_data_tasks):
+        # A sub-orchestration that failed completes the task with its exception rather than raising it
+        if isinstance(task.result, Exception):
+            result.failed_count += len(folder.invoice_file_names)
+            result.add_error(extract_invoice_data_workflow.name,
+                             f"Failed to process invoice folder {folder.name}: {task.result}")
+            continue
 
-    for task in extract_invoice_data_tasks:
         task_result = WorkflowResult.from_dict(task.result)
         result.add_activity_result(extract_invoice_data_workflow.name,
                                    "Processed invoice folder.",
                                    task_result)
-
-    return result.to_dict()
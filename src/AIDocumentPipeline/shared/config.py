@@ -13,3 +13,69 @@ managed_identity_client_id = os.environ.get("MANAGED_IDENTITY_CLIENT_ID", None)
 invoices_storage_account_name = os.environ.get(
     "INVOICES_STORAGE_ACCOUNT_NAME", None)
 invoices_queue_connection = os.environ.get("INVOICES_QUEUE_CONNECTION", None)
+openai_max_connections = int(os.environ.get("OPENAI_MAX_CONNECTIONS", 20))
+openai_keepalive_expiry = float(
+    os.environ.get("OPENAI_KEEPALIVE_EXPIRY", 60.0))
+openai_max_concurrent_requests = int(
+    os.environ.get("OPENAI_MAX_CONCURRENT_REQUESTS", 16))
+document_image_profile = os.environ.get("DOCUMENT_IMAGE_PROFILE", "lossless")
+document_rasterization_workers = int(
+    os.environ.get("DOCUMENT_RASTERIZATION_WORKERS", 1))
+extraction_cache_type = os.environ.get("EXTRACTION_CACHE_TYPE", None)
+extraction_cache_max_bytes = int(
+    os.environ.get("EXTRACTION_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+extraction_cache_path = os.environ.get("EXTRACTION_CACHE_PATH", None)
+extraction_cache_container_name = os.environ.get(
+    "EXTRACTION_CACHE_CONTAINER_NAME", "extraction-cache")
+document_text_layer_policy = os.environ.get(
+    "DOCUMENT_TEXT_LAYER_POLICY", "images_only")
+storage_max_connections = int(os.environ.get("STORAGE_MAX_CONNECTIONS", 20))
+storage_download_max_concurrency = int(
+    os.environ.get("STORAGE_DOWNLOAD_MAX_CONCURRENCY", 4))
+storage_download_chunk_size = int(
+    os.environ.get("STORAGE_DOWNLOAD_CHUNK_SIZE", 4 * 1024 * 1024))
+storage_download_spill_threshold = int(
+    os.environ.get("STORAGE_DOWNLOAD_SPILL_THRESHOLD", 32 * 1024 * 1024))
+invoices_fused_activity = os.environ.get(
+    "INVOICES_FUSED_ACTIVITY", "false").lower() == "true"
+invoices_max_parallel_invoices = int(
+    os.environ.get("INVOICES_MAX_PARALLEL_INVOICES", 10))
+invoices_max_parallel_folders = int(
+    os.environ.get("INVOICES_MAX_PARALLEL_FOLDERS", 10))
+invoices_folders_per_generation = int(
+    os.environ.get("INVOICES_FOLDERS_PER_GENERATION", 100))
+invoices_folder_page_size = int(
+    os.environ.get("INVOICES_FOLDER_PAGE_SIZE", 0))
+openai_requests_per_minute = int(
+    os.environ.get("OPENAI_REQUESTS_PER_MINUTE", 0))
+openai_tokens_per_minute = int(os.environ.get("OPENAI_TOKENS_PER_MINUTE", 0))
+openai_rate_limit_state_type = os.environ.get(
+    "OPENAI_RATE_LIMIT_STATE_TYPE", "memory")
+openai_rate_limit_state_path = os.environ.get(
+    "OPENAI_RATE_LIMIT_STATE_PATH", None)
+openai_rate_limit_container_name = os.environ.get(
+    "OPENAI_RATE_LIMIT_CONTAINER_NAME", "openai-rate-limit")
+invoices_batch_job = os.environ.get(
+    "INVOICES_BATCH_JOB", "false").lower() == "true"
+invoices_batch_poll_interval_seconds = int(
+    os.environ.get("INVOICES_BATCH_POLL_INTERVAL_SECONDS", 300))
+openai_batch_deployment = os.environ.get(
+    "OPENAI_BATCH_DEPLOYMENT", openai_completion_deployment)
+openai_batch_api_version = os.environ.get(
+    "OPENAI_BATCH_API_VERSION", "2024-10-21")
+openai_structured_outputs = os.environ.get(
+    "OPENAI_STRUCTURED_OUTPUTS", "false").lower() == "true"
+invoices_batch_export_format = os.environ.get(
+    "INVOICES_BATCH_EXPORT_FORMAT", None)
+invoices_batch_export_container_name = os.environ.get(
+    "INVOICES_BATCH_EXPORT_CONTAINER_NAME", "invoice-exports")
+invoices_batch_export_row_group_size = int(
+    os.environ.get("INVOICES_BATCH_EXPORT_ROW_GROUP_SIZE", 10000))
+invoices_validation_tolerance = float(
+    os.environ.get("INVOICES_VALIDATION_TOLERANCE", 0.005))
+invoices_validation_exact = os.environ.get(
+    "INVOICES_VALIDATION_EXACT", "false").lower() == "true"
+invoices_validation_rules_path = os.environ.get(
+    "INVOICES_VALIDATION_RULES_PATH", None)
+invoices_batch_results_container_name = os.environ.get(
+    "INVOICES_BATCH_RESULTS_CONTAINER_NAME", "invoice-batch-results")
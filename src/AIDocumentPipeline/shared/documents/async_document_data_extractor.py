@@ -0,0 +1,110 @@
+from __future__ import annotations
+import asyncio
+import time
+from azure.identity.aio import DefaultAzureCredential
+from openai import AsyncAzureOpenAI
+from shared.documents.document_data_extractor import BaseDocumentDataExtractor, DocumentDataExtractorOptions
+from shared.documents.document_extraction_result import DocumentExtractionResult
+from shared.documents.extraction_cache import ExtractionCache, get_extraction_cache_key
+from shared.documents.openai_client_pool import AsyncAzureOpenAIClientPool
+from shared.documents.openai_rate_limiter import AzureOpenAIRateLimiter, estimate_request_tokens
+
+
+class AsyncDocumentDataExtractor(BaseDocumentDataExtractor):
+    """Defines a class for asynchronously extracting structured data from a document using Azure OpenAI GPT models that support image inputs.
+
+    The number of Azure OpenAI requests in flight at any one time is bounded per instance, allowing many extractions to be awaited concurrently while staying within the deployment's quota.
+    """
+
+    def __init__(self, credential: DefaultAzureCredential, client_pool: AsyncAzureOpenAIClientPool | None = None, max_concurrent_requests: int = 16, rasterization_workers: int = 1, cache: ExtractionCache | None = None, rate_limiter: AzureOpenAIRateLimiter | None = None):
+        """Initializes a new instance of the AsyncDocumentDataExtractor class.
+
+        :param credential: The async Azure credential to use for authenticating with the Azure OpenAI service.
+        :param client_pool: The pool of async Azure OpenAI clients to reuse across requests. If not provided, a pool is created for this instance.
+        :param max_concurrent_requests: The maximum number of Azure OpenAI requests in flight at any one time. Default is 16.
+        :param rasterization_workers: The number of CPU cores to use for rendering and encoding the pages of multi-page documents. Default is 1.
+        :param cache: The cache of previously extracted data, keyed by the document content and extraction options. If not provided, every document is extracted.
+        :param rate_limiter: The rate limiter for the requests and tokens per minute quotas of the deployment. If not provided, requests are only bounded by the in-flight request limit.
+        """
+
+        super().__init__(credential, rasterization_workers, cache, rate_limiter)
+        self.client_pool = client_pool or AsyncAzureOpenAIClientPool(credential)
+        self.max_concurrent_requests = max_concurrent_requests
+        self.request_semaphore = asyncio.Semaphore(max_concurrent_requests)
+        self.requests_in_flight = 0
+
+    async def from_bytes(self, document_bytes: bytes, options: DocumentDataExtractorOptions) -> dict:
+        """Extracts structured data from the specified document bytes by converting the document to images and using an Azure OpenAI model to extract the data.
+
+        :param document_bytes: The byte array content of the document to extract data from.
+        :param options: The options for configuring the Azure OpenAI request for extracting data.
+        :return: The structured data extracted from the document as a dictionary.
+        """
+
+        result = await self.extract(document_bytes, options)
+        return result.data
+
+    async def extract(self, document_bytes: bytes, options: DocumentDataExtractorOptions) -> DocumentExtractionResult:
+        """Extracts structured data from the specified document bytes, using its text layer or page images as permitted by the options.
+
+        The document content is prepared on a worker thread so that the event loop is not blocked, and the Azure OpenAI request waits for rate limit capacity and a free slot if the in-flight request limit has been reached.
+
+        :param document_bytes: The byte array content of the document to extract data from.
+        :param options: The options for configuring the Azure OpenAI request for extracting data.
+        :return: The extracted data, with a record of the path taken, token usage, and duration.
+        """
+
+        start_time = time.perf_counter()
+
+        cache_key = None
+        if self.cache:
+            cache_key = get_extraction_cache_key(document_bytes, options)
+            cached_result = self.__get_cached_result__(
+                await asyncio.to_thread(self.cache.get, cache_key), start_time)
+            if cached_result:
+                return cached_result
+
+        client = self.__get_openai_client__(options)
+
+        result = DocumentExtractionResult()
+        user_content = await asyncio.to_thread(self.__get_user_content__, document_bytes, options, result)
+
+        request = self.__get_completion_request__(user_content, options)
+
+        if self.rate_limiter:
+            # Throttled and transiently failed requests are retried by the rate limiter, so that the retry-after is shared with other callers
+            client = client.with_options(max_retries=0)
+
+        async def send():
+            async with self.request_semaphore:
+                self.requests_in_flight += 1
+                try:
+                    return await client.chat.completions.create(**request)
+                finally:
+                    self.requests_in_flight -= 1
+
+        if self.rate_limiter:
+            # Capacity is reserved before a request slot is taken, so that waiting requests do not hold a slot
+            estimated_tokens = await asyncio.to_thread(estimate_request_tokens, request)
+            response = await self.rate_limiter.call_async(send, estimated_tokens)
+        else:
+            response = await send()
+
+        self.__set_response_data__(result, response)
+
+        if cache_key:
+            await asyncio.to_thread(self.cache.set, cache_key, result.data)
+
+        result.duration_seconds = time.perf_counter() - start_time
+        return result
+
+    async def close(self):
+        """Closes the pooled Azure OpenAI clients, their shared HTTP connections, and the rasterization process pool."""
+
+        try:
+            await self.client_pool.close()
+        finally:
+            await asyncio.to_thread(self.__close_rasterization_pool__)
+
+    def __get_openai_client__(self, options: DocumentDataExtractorOptions) -> AsyncAzureOpenAI:
+        return self.client_pool.get_client(options.endpoint, options.api_version)
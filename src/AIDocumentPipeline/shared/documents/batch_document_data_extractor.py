@@ -0,0 +1,193 @@
+"""Offline extraction of structured data from documents using Azure OpenAI batch jobs.
+
+This module provides an extractor that submits the chat completions requests for many documents as batch jobs, for backfills where cost and throughput matter more than the latency of each document.
+"""
+
+from __future__ import annotations
+from collections.abc import Iterable
+from enum import Enum
+import json
+import logging
+import tempfile
+from azure.identity import DefaultAzureCredential
+from openai import AzureOpenAI
+from openai.types.chat import ChatCompletion
+from shared.documents.document_data_extractor import BaseDocumentDataExtractor, DocumentDataExtractorOptions
+from shared.documents.document_extraction_result import DocumentExtractionResult
+from shared.documents.openai_client_pool import AzureOpenAIClientPool
+
+batch_endpoint = "/chat/completions"
+# The limits of a single Azure OpenAI batch input file
+max_batch_requests = 100000
+max_batch_file_bytes = 200 * 1024 * 1024
+
+
+class BatchJobStatus(Enum):
+    """Defines the statuses of an Azure OpenAI batch job."""
+
+    Validating = "validating"
+    Failed = "failed"
+    InProgress = "in_progress"
+    Finalizing = "finalizing"
+    Completed = "completed"
+    Expired = "expired"
+    Cancelling = "cancelling"
+    Cancelled = "cancelled"
+
+    @property
+    def is_terminal(self) -> bool:
+        """A flag indicating whether the batch job has finished, successfully or otherwise. Expired and cancelled jobs may have partial results."""
+
+        return self in [BatchJobStatus.Failed, BatchJobStatus.Completed, BatchJobStatus.Expired, BatchJobStatus.Cancelled]
+
+
+class BatchDocumentDataExtractor(BaseDocumentDataExtractor):
+    """Defines a class for extracting structured data from many documents with Azure OpenAI batch jobs, split to fit the limits of a single job.
+
+    The batch job must be submitted to a deployment with the `GlobalBatch` deployment type.
+    """
+
+    def __init__(self, credential: DefaultAzureCredential, client_pool: AzureOpenAIClientPool | None = None, rasterization_workers: int = 1, batch_api_version: str = "2024-10-21", completion_window: str = "24h", max_requests_per_job: int = max_batch_requests, max_bytes_per_job: int = max_batch_file_bytes):
+        """Initializes a new instance of the BatchDocumentDataExtractor class.
+
+        :param credential: The Azure credential to use for authenticating with the Azure OpenAI service.
+        :param client_pool: The pool of Azure OpenAI clients to reuse across requests. If not provided, a pool is created for this instance.
+        :param rasterization_workers: The number of CPU cores to use for rendering and encoding the pages of multi-page documents. Default is 1.
+        :param batch_api_version: The Azure OpenAI API version to use for the files and batches APIs, which are not available in earlier versions. Default is `2024-10-21`.
+        :param completion_window: The time frame within which the batch job should be processed. Default is `24h`.
+        :param max_requests_per_job: The maximum number of requests in the input file of a single batch job. Default is 100,000, the Azure OpenAI limit.
+        :param max_bytes_per_job: The maximum size in bytes of the input file of a single batch job. Default is 200 MB, the Azure OpenAI limit.
+        """
+
+        super().__init__(credential, rasterization_workers)
+        self.client_pool = client_pool or AzureOpenAIClientPool(credential)
+        self.batch_api_version = batch_api_version
+        self.completion_window = completion_window
+        self.max_requests_per_job = max(max_requests_per_job, 1)
+        self.max_bytes_per_job = max_bytes_per_job
+
+    def submit(self, documents: Iterable[tuple[str, bytes]], options: DocumentDataExtractorOptions) -> list[str]:
+        """Submits batch jobs to extract structured data from the specified documents.
+
+        The requests are written to a temporary JSONL file one document at a time, so only a single document is held in memory while the batch is prepared. When the file would exceed the request count or size limits of a batch job, it is submitted and the remaining requests are written to the next job. If a job cannot be submitted, the jobs already submitted are cancelled.
+
+        :param documents: The documents to extract data from, as pairs of a custom ID that identifies the document in the results and the byte array content of the document.
+        :param options: The options for configuring the Azure OpenAI requests for extracting data.
+        :return: The IDs of the submitted batch jobs, in the order of their documents.
+        """
+
+        client = self.__get_openai_client__(options)
+        batch_ids: list[str] = []
+        batch_file = tempfile.TemporaryFile()
+        request_count = 0
+
+        try:
+            for custom_id, document_bytes in documents:
+                user_content = self.__get_user_content__(
+                    document_bytes, options, DocumentExtractionResult())
+
+                line = json.dumps({
+                    "custom_id": custom_id,
+                    "method": "POST",
+                    "url": batch_endpoint,
+                    "body": self.__get_completion_request__(user_content, options)
+                }).encode("utf-8") + b"\n"
+
+                if request_count and (request_count >= self.max_requests_per_job or batch_file.tell() + len(line) > self.max_bytes_per_job):
+                    batch_ids.append(self.__submit_file__(client, batch_file, request_count))
+                    batch_file.close()
+                    batch_file = tempfile.TemporaryFile()
+                    request_count = 0
+
+                batch_file.write(line)
+                request_count += 1
+
+            if request_count:
+                batch_ids.append(self.__submit_file__(client, batch_file, request_count))
+        except Exception:
+            self.__cancel__(client, batch_ids)
+            raise
+        finally:
+            batch_file.close()
+
+        return batch_ids
+
+    def get_status(self, batch_id: str, options: DocumentDataExtractorOptions) -> BatchJobStatus:
+        """Retrieves the status of a batch job.
+
+        :param batch_id: The ID of the batch job.
+        :param options: The options the batch job was submitted with.
+        :return: The status of the batch job.
+        """
+
+        batch = self.__get_openai_client__(
+            options).batches.retrieve(batch_id)
+        return BatchJobStatus(batch.status)
+
+    def get_results(self, batch_id: str, options: DocumentDataExtractorOptions) -> dict[str, DocumentExtractionResult]:
+        """Retrieves the extracted data of the documents in a finished batch job.
+
+        :param batch_id: The ID of the batch job.
+        :param options: The options the batch job was submitted with.
+        :return: The extraction results keyed by the custom ID of each document. Documents whose requests failed, or whose response could not be parsed, are omitted.
+        """
+
+        client = self.__get_openai_client__(options)
+        batch = client.batches.retrieve(batch_id)
+
+        results: dict[str, DocumentExtractionResult] = {}
+        if not batch.output_file_id:
+            return results
+
+        for line in client.files.content(batch.output_file_id).text.splitlines():
+            if not line.strip():
+                continue
+
+            output = json.loads(line)
+            response = output.get("response") or {}
+            if output.get("error") or response.get("status_code") != 200:
+                logging.warning(
+                    f"Batch job {batch_id} request {output.get('custom_id')} failed: {output.get('error') or response.get('status_code')}")
+                continue
+
+            result = DocumentExtractionResult()
+            try:
+                self.__set_response_data__(
+                    result, ChatCompletion.model_validate(response["body"]))
+            except (KeyError, ValueError) as e:
+                logging.warning(
+                    f"Batch job {batch_id} request {output.get('custom_id')} returned invalid data: {e}")
+                continue
+
+            results[output["custom_id"]] = result
+
+        return results
+
+    def close(self):
+        """Closes the pooled Azure OpenAI clients, their shared HTTP connections, and the rasterization process pool."""
+
+        self.client_pool.close()
+        self.__close_rasterization_pool__()
+
+    def __submit_file__(self, client: AzureOpenAI, batch_file, request_count: int) -> str:
+        batch_file.seek(0)
+        input_file = client.files.create(
+            file=("batch.jsonl", batch_file), purpose="batch")
+
+        batch = client.batches.create(
+            input_file_id=input_file.id, endpoint=batch_endpoint, completion_window=self.completion_window)
+
+        logging.info(
+            f"Submitted batch job {batch.id} with {request_count} requests")
+
+        return batch.id
+
+    def __cancel__(self, client: AzureOpenAI, batch_ids: list[str]):
+        for batch_id in batch_ids:
+            try:
+                client.batches.cancel(batch_id)
+            except Exception:
+                logging.exception(f"Failed to cancel batch job {batch_id}")
+
+    def __get_openai_client__(self, options: DocumentDataExtractorOptions) -> AzureOpenAI:
+        return self.client_pool.get_client(options.endpoint, self.batch_api_version)
@@ -1,15 +1,46 @@
-from azure.identity import DefaultAzureCredential, get_bearer_token_provider
-from pdf2image import convert_from_bytes
+from __future__ import annotations
+from azure.identity import DefaultAzureCredential
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor
+from enum import Enum
+from pdf2image import convert_from_bytes, convert_from_path
+from PIL import Image
 import base64
 from openai import AzureOpenAI
-import json
+from shared.documents.document_extraction_result import DocumentExtractionPath, DocumentExtractionResult
+from shared.documents.document_image_profile import DocumentImageProfile
+from shared.documents.extraction_cache import ExtractionCache, get_extraction_cache_key
+from shared.documents.openai_client_pool import AzureOpenAIClientPool
+from shared.documents.openai_rate_limiter import AzureOpenAIRateLimiter, estimate_request_tokens
+from shared.storage.spilled_blob_content import SpilledBlobContent
 import io
+import json
+import logging
+import multiprocessing
+import os
+import subprocess
+import tempfile
+import threading
+import time
+
+
+class TextLayerPolicy(Enum):
+    """Defines how the embedded text layer of a born-digital document is used for extraction."""
+
+    ImagesOnly = "images_only"
+    """The text layer is ignored and the document is always rendered as images."""
+
+    Text = "text"
+    """If the document has a usable text layer, only the text is sent to the model. Otherwise, the document is rendered as images."""
+
+    TextWithThumbnails = "text_with_thumbnails"
+    """If the document has a usable text layer, the text is sent with low detail thumbnails of each page. Otherwise, the document is rendered as images."""
 
 
 class DocumentDataExtractorOptions:
     """Defines the configuration options for extracting data from a document using Azure OpenAI."""
 
-    def __init__(self, system_prompt: str, extraction_prompt: str, endpoint: str, deployment_name: str, max_tokens: int = 4096, temperature: float = 0.1, top_p: float = 0.1):
+    def __init__(self, system_prompt: str, extraction_prompt: str, endpoint: str, deployment_name: str, max_tokens: int = 4096, temperature: float = 0.1, top_p: float = 0.1, api_version: str = "2024-05-01-preview", image_profile: DocumentImageProfile | None = None, text_layer_policy: TextLayerPolicy = TextLayerPolicy.ImagesOnly, min_text_length_per_page: int = 100, response_format: dict | None = None):
         """Initializes a new instance of the DocumentDataExtractorOptions class.
 
         :param system_prompt: The system prompt to provide context to the model on its function.
@@ -19,6 +50,11 @@ class DocumentDataExtractorOptions:
         :param max_tokens: The maximum number of tokens to generate in the response. Default is 4096.
         :param temperature: The sampling temperature for the model. Default is 0.1.
         :param top_p: The nucleus sampling parameter for the model. Default is 0.1.
+        :param api_version: The Azure OpenAI API version to use for the request. Default is 2024-05-01-preview.
+        :param image_profile: The profile for rendering and encoding the document pages as images. Default is the `lossless` profile.
+        :param text_layer_policy: The policy for using the embedded text layer of the document instead of images. Default is `ImagesOnly`.
+        :param min_text_length_per_page: The minimum number of non-whitespace characters every page must contain for the text layer to be considered usable. Default is 100.
+        :param response_format: The `response_format` of the chat completions request, e.g. a structured outputs JSON schema from `ExtractionSchema.get_response_format`. Default is `None` (unconstrained).
         """
 
         self.system_prompt = system_prompt
@@ -28,30 +64,34 @@ class DocumentDataExtractorOptions:
         self.max_tokens = max_tokens
         self.temperature = temperature
         self.top_p = top_p
+        self.api_version = api_version
+        self.image_profile = image_profile or DocumentImageProfile.lossless()
+        self.text_layer_policy = text_layer_policy
+        self.min_text_length_per_page = min_text_length_per_page
+        self.response_format = response_format
 
 
-class DocumentDataExtractor:
-    """Defines a class for extracting structured data from a document using Azure OpenAI GPT models that support image inputs."""
+class BaseDocumentDataExtractor:
+    """Defines the base class for extracting structured data from a document using Azure OpenAI GPT models that support image inputs."""
 
-    def __init__(self, credential: DefaultAzureCredential):
-        """Initializes a new instance of the DocumentDataExtractor class.
+    def __init__(self, credential: DefaultAzureCredential, rasterization_workers: int = 1, cache: ExtractionCache | None = None, rate_limiter: AzureOpenAIRateLimiter | None = None):
+        """Initializes a new instance of the BaseDocumentDataExtractor class.
 
         :param credential: The Azure credential to use for authenticating with the Azure OpenAI service.
+        :param rasterization_workers: The number of CPU cores to use for rendering and encoding the pages of multi-page documents. Default is 1.
+        :param cache: The cache of previously extracted data, keyed by the document content and extraction options. If not provided, every document is extracted.
+        :param rate_limiter: The rate limiter for the requests and tokens per minute quotas of the deployment. If provided, throttled and transiently failed requests are retried by the rate limiter rather than the Azure OpenAI client. If not provided, requests are not limited.
         """
 
         self.credential = credential
+        self.cache = cache
+        self.rate_limiter = rate_limiter
+        self.rasterization_workers = max(rasterization_workers, 1)
+        self._rasterization_lock = threading.Lock()
+        self._rasterization_pool: ProcessPoolExecutor | None = None
 
-    def from_bytes(self, document_bytes: bytes, options: DocumentDataExtractorOptions) -> dict:
-        """Extracts structured data from the specified document bytes by converting the document to images and using an Azure OpenAI model to extract the data.
-
-        :param document_bytes: The byte array content of the document to extract data from.
-        :param options: The options for configuring the Azure OpenAI request for extracting data.
-        :return: The structured data extracted from the document as a dictionary.
-        """
-
-        client = self.__get_openai_client__(options)
-
-        image_uris = self.__get_document_image_uris__(document_bytes)
+    def __get_user_content__(self, document_bytes: bytes, options: DocumentDataExtractorOptions, result: DocumentExtractionResult) -> list:
+        """Builds the user message content for the document, using its text layer or page images as permitted by the options, and records the path taken on the result."""
 
         user_content = []
         user_content.append({
@@ -59,17 +99,58 @@ class DocumentDataExtractor:
             "text": options.extraction_prompt
         })
 
-        for image_uri in image_uris:
+        image_profile = options.image_profile
+        result.path = DocumentExtractionPath.Images
+
+        if options.text_layer_policy != TextLayerPolicy.ImagesOnly:
+            page_texts = self.__get_document_text__(document_bytes)
+            if self.__is_text_layer_usable__(page_texts, options):
+                document_text = "\n\n".join(
+                    f"--- Page {i + 1} ---\n{page_text.strip()}" for i, page_text in enumerate(page_texts))
+
+                user_content.append({
+                    "type": "text",
+                    "text": document_text
+                })
+
+                result.page_count = len(page_texts)
+                result.text_length = len(document_text)
+
+                if options.text_layer_policy == TextLayerPolicy.Text:
+                    result.path = DocumentExtractionPath.Text
+                    return user_content
+
+                result.path = DocumentExtractionPath.TextWithThumbnails
+                image_profile = DocumentImageProfile.thumbnail()
+
+        for image_uri in self.__iter_document_image_uris__(document_bytes, image_profile):
+            image_url = {
+                "url": image_uri
+            }
+
+            if image_profile.detail != "auto":
+                image_url["detail"] = image_profile.detail
+
             user_content.append({
                 "type": "image_url",
-                "image_url": {
-                    "url": image_uri
-                }
+                "image_url": image_url
             })
+            result.image_count += 1
+
+        if result.path == DocumentExtractionPath.Images:
+            result.page_count = result.image_count
+
+        return user_content
+
+    def __get_completion_request__(self, user_content: list, options: DocumentDataExtractorOptions) -> dict:
+        """Builds the keyword arguments for the chat completions request from the user message content and extraction options.
+
+        The system prompt and extraction prompt are static and come first, followed by the document content, so the prefix of every request is eligible for prompt caching.
+        """
 
-        response = client.chat.completions.create(
-            model=options.deployment_name,
-            messages=[
+        request = {
+            "model": options.deployment_name,
+            "messages": [
                 {
                     "role": "system",
                     "content": options.system_prompt
@@ -79,38 +160,246 @@ class DocumentDataExtractor:
                     "content": user_content
                 }
             ],
-            max_tokens=options.max_tokens,
-            temperature=options.temperature,
-            top_p=options.top_p
-        )
+            "max_tokens": options.max_tokens,
+            "temperature": options.temperature,
+            "top_p": options.top_p
+        }
 
+        if options.response_format:
+            request["response_format"] = options.response_format
+
+        return request
+
+    def __set_response_data__(self, result: DocumentExtractionResult, response):
         response_content = response.choices[0].message.content
-        return json.loads(response_content)
+        result.data = json.loads(response_content)
 
-    def __get_openai_client__(self, options: DocumentDataExtractorOptions) -> AzureOpenAI:
-        token_provider = get_bearer_token_provider(
-            self.credential, "https://cognitiveservices.azure.com/.default")
+        if response.usage:
+            result.prompt_tokens = response.usage.prompt_tokens
+            result.completion_tokens = response.usage.completion_tokens
+
+            # Reported by API versions that support prompt caching, which are newer than the typed usage of the client
+            prompt_tokens_details = getattr(
+                response.usage, "prompt_tokens_details", None)
+            if isinstance(prompt_tokens_details, dict):
+                result.cached_prompt_tokens = prompt_tokens_details.get(
+                    "cached_tokens") or 0
+            elif prompt_tokens_details:
+                result.cached_prompt_tokens = getattr(
+                    prompt_tokens_details, "cached_tokens", None) or 0
+
+    def __get_cached_result__(self, cached_data: dict | None, start_time: float) -> DocumentExtractionResult | None:
+        if cached_data is None:
+            return None
+
+        result = DocumentExtractionResult()
+        result.data = cached_data
+        result.path = DocumentExtractionPath.Cache
+        result.duration_seconds = time.perf_counter() - start_time
+        return result
 
-        client = AzureOpenAI(
-            api_version="2024-05-01-preview",
-            azure_endpoint=options.endpoint,
-            azure_ad_token_provider=token_provider)
+    def __get_document_text__(self, document_bytes: bytes) -> list[str] | None:
+        """Extracts the embedded text layer of the specified document bytes per page using poppler's pdftotext.
 
-        return client
+        :return: The text of each page; or None if the text could not be extracted.
+        """
+
+        with tempfile.TemporaryDirectory() as folder:
+            # Content spilled to disk by the storage client factory is read from its file rather than written again
+            if isinstance(document_bytes, SpilledBlobContent):
+                document_path = document_bytes.path
+            else:
+                document_path = os.path.join(folder, "document.pdf")
+                with open(document_path, "wb") as document_file:
+                    document_file.write(document_bytes)
+
+            try:
+                completed = subprocess.run(
+                    ["pdftotext", "-layout", "-enc", "UTF-8", document_path, "-"],
+                    capture_output=True, timeout=60)
+            except (FileNotFoundError, subprocess.TimeoutExpired) as e:
+                logging.warning(f"Unable to extract the document text layer: {e}")
+                return None
+
+        if completed.returncode != 0:
+            return None
+
+        # pdftotext terminates every page with a form feed
+        page_texts = completed.stdout.decode("utf-8", "replace").split("\f")
+        if page_texts and not page_texts[-1].strip():
+            page_texts.pop()
+
+        return page_texts
+
+    def __is_text_layer_usable__(self, page_texts: list[str] | None, options: DocumentDataExtractorOptions) -> bool:
+        if not page_texts:
+            return False
 
-    def __get_document_image_uris__(self, document_bytes: bytes) -> list:
+        for page_text in page_texts:
+            characters = "".join(page_text.split())
+            if len(characters) < options.min_text_length_per_page:
+                return False
+
+            # Text from fonts without a Unicode mapping is extracted as replacement characters
+            if characters.count("\ufffd") > len(characters) * 0.1:
+                return False
+
+        return True
+
+    def __get_document_image_uris__(self, document_bytes: bytes, image_profile: DocumentImageProfile) -> list:
         """Converts the specified document bytes to images using the pdf2image library and returns the image URIs.
 
         To call this method, poppler-utils must be installed on the system.
         """
 
-        pages = convert_from_bytes(document_bytes)
+        return list(self.__iter_document_image_uris__(document_bytes, image_profile))
+
+    def __iter_document_image_uris__(self, document_bytes: bytes, image_profile: DocumentImageProfile) -> Iterator[str]:
+        """Converts the specified document bytes to images page by page, yielding each image URI in page order as it is encoded, so that only one decoded page is held in memory at a time.
+
+        To call this method, poppler-utils must be installed on the system.
+        """
+
+        with tempfile.TemporaryDirectory() as output_folder:
+            convert_options = dict(
+                dpi=image_profile.dpi,
+                output_folder=output_folder,
+                fmt="ppm" if image_profile.requires_encoding else "png",
+                thread_count=self.rasterization_workers,
+                grayscale=image_profile.grayscale,
+                paths_only=True)
+
+            # Content spilled to disk by the storage client factory is rendered from its file, as pdf2image would otherwise copy it to another
+            if isinstance(document_bytes, SpilledBlobContent):
+                page_paths = convert_from_path(document_bytes.path, **convert_options)
+            else:
+                page_paths = convert_from_bytes(document_bytes, **convert_options)
+
+            if self.rasterization_workers > 1 and image_profile.requires_encoding and len(page_paths) > 1:
+                pages_bytes = self.__get_rasterization_pool__().map(
+                    __get_page_image_bytes__, page_paths, [image_profile] * len(page_paths))
+            else:
+                pages_bytes = (__get_page_image_bytes__(page_path, image_profile)
+                               for page_path in page_paths)
+
+            for page_path, image_bytes in zip(page_paths, pages_bytes):
+                os.remove(page_path)
+
+                base64_data = base64.b64encode(image_bytes).decode('utf-8')
+                yield f"data:{image_profile.mime_type};base64,{base64_data}"
+
+    def __get_rasterization_pool__(self) -> ProcessPoolExecutor:
+        with self._rasterization_lock:
+            if not self._rasterization_pool:
+                # Workers are not forked from the host process, as its threads and event loop may hold locks that the children would inherit
+                start_method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+                self._rasterization_pool = ProcessPoolExecutor(
+                    max_workers=self.rasterization_workers, mp_context=multiprocessing.get_context(start_method))
+
+            return self._rasterization_pool
+
+    def __close_rasterization_pool__(self):
+        with self._rasterization_lock:
+            if self._rasterization_pool:
+                self._rasterization_pool.shutdown()
+
+            self._rasterization_pool = None
+
+
+class DocumentDataExtractor(BaseDocumentDataExtractor):
+    """Defines a class for extracting structured data from a document using Azure OpenAI GPT models that support image inputs."""
+
+    def __init__(self, credential: DefaultAzureCredential, client_pool: AzureOpenAIClientPool | None = None, rasterization_workers: int = 1, cache: ExtractionCache | None = None, rate_limiter: AzureOpenAIRateLimiter | None = None):
+        """Initializes a new instance of the DocumentDataExtractor class.
+
+        :param credential: The Azure credential to use for authenticating with the Azure OpenAI service.
+        :param client_pool: The pool of Azure OpenAI clients to reuse across requests. If not provided, a pool is created for this instance.
+        :param rasterization_workers: The number of CPU cores to use for rendering and encoding the pages of multi-page documents. Default is 1.
+        :param cache: The cache of previously extracted data, keyed by the document content and extraction options. If not provided, every document is extracted.
+        :param rate_limiter: The rate limiter for the requests and tokens per minute quotas of the deployment. If not provided, requests are not limited.
+        """
+
+        super().__init__(credential, rasterization_workers, cache, rate_limiter)
+        self.client_pool = client_pool or AzureOpenAIClientPool(credential)
+
+    def from_bytes(self, document_bytes: bytes, options: DocumentDataExtractorOptions) -> dict:
+        """Extracts structured data from the specified document bytes by converting the document to images and using an Azure OpenAI model to extract the data.
+
+        :param document_bytes: The byte array content of the document to extract data from.
+        :param options: The options for configuring the Azure OpenAI request for extracting data.
+        :return: The structured data extracted from the document as a dictionary.
+        """
+
+        return self.extract(document_bytes, options).data
+
+    def extract(self, document_bytes: bytes, options: DocumentDataExtractorOptions) -> DocumentExtractionResult:
+        """Extracts structured data from the specified document bytes, using its text layer or page images as permitted by the options.
+
+        :param document_bytes: The byte array content of the document to extract data from.
+        :param options: The options for configuring the Azure OpenAI request for extracting data.
+        :return: The extracted data, with a record of the path taken, token usage, and duration.
+        """
+
+        start_time = time.perf_counter()
+
+        cache_key = None
+        if self.cache:
+            cache_key = get_extraction_cache_key(document_bytes, options)
+            cached_result = self.__get_cached_result__(
+                self.cache.get(cache_key), start_time)
+            if cached_result:
+                return cached_result
+
+        client = self.__get_openai_client__(options)
+
+        result = DocumentExtractionResult()
+        user_content = self.__get_user_content__(
+            document_bytes, options, result)
+
+        request = self.__get_completion_request__(user_content, options)
+
+        if self.rate_limiter:
+            # Throttled and transiently failed requests are retried by the rate limiter, so that the retry-after is shared with other callers
+            client = client.with_options(max_retries=0)
+            response = self.rate_limiter.call(
+                lambda: client.chat.completions.create(**request), estimate_request_tokens(request))
+        else:
+            response = client.chat.completions.create(**request)
+
+        self.__set_response_data__(result, response)
+
+        if cache_key:
+            self.cache.set(cache_key, result.data)
+
+        result.duration_seconds = time.perf_counter() - start_time
+        return result
+
+    def close(self):
+        """Closes the pooled Azure OpenAI clients, their shared HTTP connections, and the rasterization process pool."""
+
+        self.client_pool.close()
+        self.__close_rasterization_pool__()
+
+    def __get_openai_client__(self, options: DocumentDataExtractorOptions) -> AzureOpenAI:
+        return self.client_pool.get_client(options.endpoint, options.api_version)
+
+
+def __get_page_image_bytes__(page_path: str, image_profile: DocumentImageProfile) -> bytes:
+    """Reads a rendered page image file, re-encoding it if required by the image profile.
+
+    Defined at the module level so that it can be run by a process pool.
+    """
+
+    if not image_profile.requires_encoding:
+        with open(page_path, "rb") as page_file:
+            return page_file.read()
 
-        image_uris = []
-        for page in pages:
-            byteIO = io.BytesIO()
-            page.save(byteIO, format='PNG')
-            base64_data = base64.b64encode(byteIO.getvalue()).decode('utf-8')
-            image_uris.append(f"data:image/png;base64,{base64_data}")
+    with Image.open(page_path) as page:
+        size = image_profile.get_scaled_size(page.width, page.height)
+        if size != page.size:
+            page = page.resize(size, Image.Resampling.LANCZOS)
 
-        return image_uris
+        byteIO = io.BytesIO()
+        page.save(byteIO, format=image_profile.format.upper(),
+                  quality=image_profile.quality)
+        return byteIO.getvalue()
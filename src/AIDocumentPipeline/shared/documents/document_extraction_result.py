@@ -0,0 +1,42 @@
+from __future__ import annotations
+from enum import Enum
+
+
+class DocumentExtractionPath(Enum):
+    """Defines the ways the content of a document can be provided to the model for extraction."""
+
+    Cache = "cache"
+    Images = "images"
+    Text = "text"
+    TextWithThumbnails = "text_with_thumbnails"
+
+
+class DocumentExtractionResult:
+    """Defines the result of extracting structured data from a document, including a record of how the extraction was performed."""
+
+    def __init__(self):
+        """Initializes a new instance of the DocumentExtractionResult class."""
+
+        self.data: dict | None = None
+        self.path = DocumentExtractionPath.Images
+        self.page_count = 0
+        self.text_length = 0
+        self.image_count = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cached_prompt_tokens = 0
+        self.duration_seconds = 0.0
+
+    def to_dict(self) -> dict:
+        """Returns a dictionary representation of the extraction record, excluding the extracted data."""
+
+        return {
+            "path": self.path.value,
+            "page_count": self.page_count,
+            "text_length": self.text_length,
+            "image_count": self.image_count,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "cached_prompt_tokens": self.cached_prompt_tokens,
+            "duration_seconds": self.duration_seconds
+        }
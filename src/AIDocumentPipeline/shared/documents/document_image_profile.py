@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+
+class DocumentImageProfile:
+    """Defines how document pages are rendered and encoded as images before they are sent to an Azure OpenAI vision model.
+
+    GPT-4o scales high detail images to fit within 2048x2048 and then so that the shortest side is 768 pixels, before splitting them into 512 pixel tiles. Any resolution beyond those limits increases the payload size without improving the extraction.
+    """
+
+    model_max_long_edge = 2048
+    model_max_short_edge = 768
+
+    mime_types = {
+        "png": "image/png",
+        "jpeg": "image/jpeg",
+        "webp": "image/webp"
+    }
+
+    def __init__(self, name: str, dpi: int = 200, format: str = "png", quality: int = 100, grayscale: bool = False, max_long_edge: int | None = None, max_short_edge: int | None = None, detail: str = "auto"):
+        """Initializes a new instance of the DocumentImageProfile class.
+
+        :param name: The name of the profile.
+        :param dpi: The resolution to render the document pages at. Default is 200.
+        :param format: The image format to encode the pages as. One of `png`, `jpeg`, or `webp`. Default is `png`.
+        :param quality: The encoding quality for lossy formats, between 1 and 100. Default is 100.
+        :param grayscale: A flag indicating whether to render the pages in grayscale. Default is `False`.
+        :param max_long_edge: The maximum size in pixels of the longest side of a page image. Larger pages are downscaled. Default is `None` (no limit).
+        :param max_short_edge: The maximum size in pixels of the shortest side of a page image. Larger pages are downscaled. Default is `None` (no limit).
+        :param detail: The detail level the model should process the page images at. One of `auto`, `low`, or `high`. Default is `auto`.
+        """
+
+        if format not in DocumentImageProfile.mime_types:
+            raise ValueError(f"Unsupported image format: {format}")
+
+        self.name = name
+        self.dpi = dpi
+        self.format = format
+        self.quality = quality
+        self.grayscale = grayscale
+        self.max_long_edge = max_long_edge
+        self.max_short_edge = max_short_edge
+        self.detail = detail
+
+    @property
+    def mime_type(self) -> str:
+        """The MIME type of the encoded page images."""
+
+        return DocumentImageProfile.mime_types[self.format]
+
+    @property
+    def requires_encoding(self) -> bool:
+        """A flag indicating whether rendered pages must be re-encoded, rather than sent as the PNG files produced by poppler."""
+
+        return self.format != "png" or self.max_long_edge is not None or self.max_short_edge is not None
+
+    def get_scaled_size(self, width: int, height: int) -> tuple[int, int]:
+        """Returns the size a page image of the specified dimensions should be downscaled to, preserving the aspect ratio.
+
+        :param width: The width of the rendered page image.
+        :param height: The height of the rendered page image.
+        :return: The target width and height. If no downscaling is required, the original dimensions are returned.
+        """
+
+        scale = 1.0
+        if self.max_long_edge:
+            scale = min(scale, self.max_long_edge / max(width, height))
+
+        if self.max_short_edge:
+            scale = min(scale, self.max_short_edge / min(width, height))
+
+        if scale >= 1.0:
+            return width, height
+
+        return max(int(width * scale), 1), max(int(height * scale), 1)
+
+    @staticmethod
+    def lossless() -> DocumentImageProfile:
+        """Full colour PNG at 200 DPI with no downscaling. This is the default profile."""
+
+        return DocumentImageProfile("lossless")
+
+    @staticmethod
+    def high_detail() -> DocumentImageProfile:
+        """Full colour JPEG at 200 DPI, downscaled to the model's maximum image size."""
+
+        return DocumentImageProfile("high_detail", dpi=200, format="jpeg", quality=90,
+                                    max_long_edge=DocumentImageProfile.model_max_long_edge)
+
+    @staticmethod
+    def balanced() -> DocumentImageProfile:
+        """Full colour JPEG at 150 DPI, downscaled to the size the model processes high detail images at."""
+
+        return DocumentImageProfile("balanced", dpi=150, format="jpeg", quality=85,
+                                    max_long_edge=DocumentImageProfile.model_max_long_edge,
+                                    max_short_edge=DocumentImageProfile.model_max_short_edge)
+
+    @staticmethod
+    def compact() -> DocumentImageProfile:
+        """Grayscale WebP at 150 DPI, downscaled to the size the model processes high detail images at."""
+
+        return DocumentImageProfile("compact", dpi=150, format="webp", quality=75, grayscale=True,
+                                    max_long_edge=DocumentImageProfile.model_max_long_edge,
+                                    max_short_edge=DocumentImageProfile.model_max_short_edge)
+
+    @staticmethod
+    def thumbnail() -> DocumentImageProfile:
+        """Grayscale JPEG at 72 DPI, downscaled to a single 512 pixel tile and processed by the model at low detail.
+
+        Used to provide the layout of a document alongside its text layer.
+        """
+
+        return DocumentImageProfile("thumbnail", dpi=72, format="jpeg", quality=60, grayscale=True,
+                                    max_long_edge=512, detail="low")
+
+    @staticmethod
+    def builtin() -> list[DocumentImageProfile]:
+        """Returns the built-in image profiles."""
+
+        return [
+            DocumentImageProfile.lossless(),
+            DocumentImageProfile.high_detail(),
+            DocumentImageProfile.balanced(),
+            DocumentImageProfile.compact(),
+            DocumentImageProfile.thumbnail()
+        ]
+
+    @staticmethod
+    def from_name(name: str | None) -> DocumentImageProfile:
+        """Returns the built-in image profile with the specified name.
+
+        :param name: The name of the built-in profile. If not provided, the `lossless` profile is returned.
+        :return: The built-in image profile.
+        """
+
+        if not name:
+            return DocumentImageProfile.lossless()
+
+        for profile in DocumentImageProfile.builtin():
+            if profile.name == name.lower():
+                return profile
+
+        raise ValueError(f"Unknown image profile: {name}")
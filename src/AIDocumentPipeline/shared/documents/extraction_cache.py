@@ -0,0 +1,233 @@
+"""Content-addressed caches for structured data extracted from documents.
+
+Cache keys combine a SHA-256 hash of the document bytes with a hash of every option that affects the model's output, so a cache hit can safely skip both rasterization and the Azure OpenAI request.
+"""
+
+from __future__ import annotations
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from typing import TYPE_CHECKING
+from azure.core.exceptions import ResourceNotFoundError
+from shared.storage.azure_storage_client_factory import AzureStorageClientFactory
+
+if TYPE_CHECKING:
+    from shared.documents.document_data_extractor import DocumentDataExtractorOptions
+
+
+def get_extraction_cache_key(document_bytes: bytes, options: DocumentDataExtractorOptions) -> str:
+    """Computes the cache key for extracting data from the specified document with the specified options.
+
+    :param document_bytes: The byte array content of the document.
+    :param options: The options used for the extraction.
+    :return: The cache key as a hex string in the form `{document_hash}-{options_hash}`.
+    """
+
+    document_hash = hashlib.sha256(document_bytes).hexdigest()
+
+    options_hash = hashlib.sha256(json.dumps([
+        options.system_prompt,
+        options.extraction_prompt,
+        options.deployment_name,
+        options.max_tokens,
+        options.temperature,
+        options.top_p,
+        vars(options.image_profile),
+        options.text_layer_policy.value,
+        options.min_text_length_per_page,
+        options.response_format
+    ], sort_keys=True).encode("utf-8")).hexdigest()
+
+    return f"{document_hash}-{options_hash}"
+
+
+class ExtractionCache(ABC):
+    """Defines the base class for caches of extracted document data, keyed by `get_extraction_cache_key`."""
+
+    def __init__(self):
+        """Initializes a new instance of the ExtractionCache class."""
+
+        self._metrics_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self.errors = 0
+
+    def get(self, key: str) -> dict | None:
+        """Retrieves the cached extracted data for the specified key.
+
+        A value that cannot be read, such as a corrupt entry, is logged, counted as an error, and treated as a miss, so that it never fails the extraction.
+
+        :param key: The cache key.
+        :return: The cached extracted data if found; otherwise, None.
+        """
+
+        try:
+            value = self.__read__(key)
+        except Exception:
+            logging.exception(f"Failed to read the extraction cache entry {key}")
+            value = None
+            with self._metrics_lock:
+                self.errors += 1
+
+        with self._metrics_lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+
+        return value
+
+    def set(self, key: str, value: dict):
+        """Stores the extracted data for the specified key.
+
+        A value that cannot be written is logged, counted as an error, and skipped, so that it never discards the extracted data.
+
+        :param key: The cache key.
+        :param value: The extracted data to store.
+        """
+
+        try:
+            self.__write__(key, json.dumps(value).encode("utf-8"))
+        except Exception:
+            logging.exception(f"Failed to write the extraction cache entry {key}")
+            with self._metrics_lock:
+                self.errors += 1
+            return
+
+        with self._metrics_lock:
+            self.writes += 1
+
+    def get_metrics(self) -> dict:
+        """Returns the hit, miss, write, eviction, and error counters for the cache."""
+
+        with self._metrics_lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "writes": self.writes,
+                "evictions": self.evictions,
+                "errors": self.errors,
+                "hit_ratio": self.hits / lookups if lookups else 0.0
+            }
+
+    @abstractmethod
+    def __read__(self, key: str) -> dict | None:
+        ...
+
+    @abstractmethod
+    def __write__(self, key: str, value: bytes):
+        ...
+
+
+class MemoryExtractionCache(ExtractionCache):
+    """Defines an in-memory least recently used cache of extracted document data, bounded by the total size of the cached values."""
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        """Initializes a new instance of the MemoryExtractionCache class.
+
+        :param max_bytes: The maximum total size in bytes of the serialized values held in the cache. Default is 64 MiB.
+        """
+
+        super().__init__()
+        self.max_bytes = max_bytes
+        self.size_bytes = 0
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, bytes] = OrderedDict()
+
+    def __read__(self, key: str) -> dict | None:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                return None
+
+            self._entries.move_to_end(key)
+
+        return json.loads(value)
+
+    def __write__(self, key: str, value: bytes):
+        if len(value) > self.max_bytes:
+            return
+
+        with self._lock:
+            existing = self._entries.pop(key, None)
+            if existing is not None:
+                self.size_bytes -= len(existing)
+
+            self._entries[key] = value
+            self.size_bytes += len(value)
+
+            while self.size_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size_bytes -= len(evicted)
+                with self._metrics_lock:
+                    self.evictions += 1
+
+
+class DiskExtractionCache(ExtractionCache):
+    """Defines a cache of extracted document data stored as JSON files in a local folder."""
+
+    def __init__(self, folder_path: str):
+        """Initializes a new instance of the DiskExtractionCache class.
+
+        :param folder_path: The path to the folder to store the cached values in. The folder is created if it does not exist.
+        """
+
+        super().__init__()
+        self.folder_path = folder_path
+        os.makedirs(folder_path, exist_ok=True)
+
+    def __read__(self, key: str) -> dict | None:
+        try:
+            with open(self.__get_path__(key), "rb") as file:
+                return json.loads(file.read())
+        except FileNotFoundError:
+            return None
+
+    def __write__(self, key: str, value: bytes):
+        # Write to a temporary file first so that concurrent readers never see a partially written value
+        file_descriptor, temp_path = tempfile.mkstemp(dir=self.folder_path)
+        with os.fdopen(file_descriptor, "wb") as file:
+            file.write(value)
+
+        os.replace(temp_path, self.__get_path__(key))
+
+    def __get_path__(self, key: str) -> str:
+        return os.path.join(self.folder_path, f"{key}.json")
+
+
+class BlobExtractionCache(ExtractionCache):
+    """Defines a cache of extracted document data stored as JSON blobs in an Azure Storage container."""
+
+    def __init__(self, storage_factory: AzureStorageClientFactory, storage_account_name: str, container_name: str):
+        """Initializes a new instance of the BlobExtractionCache class.
+
+        :param storage_factory: The factory used to create the Azure Storage clients.
+        :param storage_account_name: The name of the Azure Storage account.
+        :param container_name: The name of the container to store the cached values in. The container is created if it does not exist.
+        """
+
+        super().__init__()
+        self.storage_factory = storage_factory
+        self.storage_account_name = storage_account_name
+        self.container_name = container_name
+
+    def __read__(self, key: str) -> dict | None:
+        try:
+            return json.loads(self.__get_container_client__().get_blob_client(f"{key}.json").download_blob().readall())
+        except ResourceNotFoundError:
+            return None
+
+    def __write__(self, key: str, value: bytes):
+        self.storage_factory.upload_blob(
+            self.storage_account_name, self.container_name, f"{key}.json", value, overwrite=True)
+
+    def __get_container_client__(self):
+        return self.storage_factory.get_blob_service_client(self.storage_account_name).get_container_client(self.container_name)
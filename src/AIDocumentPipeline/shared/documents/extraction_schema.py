@@ -0,0 +1,97 @@
+"""Compiled JSON schemas for structured data extraction.
+
+This module provides a schema type that compiles the expected structure of extracted data into a stable, compact prompt and an optional structured outputs `response_format`, once per process.
+"""
+
+from __future__ import annotations
+import json
+
+
+class ExtractionSchema:
+    """Defines the JSON schema of the structured data to extract from a document.
+
+    The prompt describes the schema as a compact template in which each value is the description or JSON type of the field, which uses far fewer tokens than the schema itself. It is serialized once, without whitespace and in the insertion order of the schema, so it is byte-for-byte identical between requests and processes. This keeps the static prefix of every request eligible for Azure OpenAI prompt caching and keeps the extraction cache key stable.
+    """
+
+    def __init__(self, name: str, schema: dict, instructions: str):
+        """Initializes a new instance of the ExtractionSchema class.
+
+        :param name: The name of the schema, used to identify it in the structured outputs `response_format`.
+        :param schema: The JSON schema of the data to extract. To be used with structured outputs, every object must list all of its properties as required and disallow additional properties.
+        :param instructions: The instructions that precede the schema in the prompt.
+        """
+
+        self.name = name
+        self.schema = schema
+        self.instructions = instructions
+        self.template_json = json.dumps(
+            self.__get_template__(schema), separators=(",", ":"))
+        self._prompt = f"{instructions} Use the following JSON structure, where each value describes the field: {self.template_json}"
+
+    def get_prompt(self, include_schema: bool = True) -> str:
+        """Returns the extraction prompt.
+
+        :param include_schema: A flag indicating whether to include the schema in the prompt. The schema can be omitted when it is provided to the model as the `response_format`. Default is `True`.
+        :return: The extraction prompt.
+        """
+
+        return self._prompt if include_schema else self.instructions
+
+    def get_response_format(self) -> dict:
+        """Returns the structured outputs `response_format` that constrains the model to respond with JSON matching the schema.
+
+        Requires Azure OpenAI API version `2024-08-01-preview` or later.
+
+        :return: The `response_format` parameter for the chat completions request.
+        """
+
+        return {
+            "type": "json_schema",
+            "json_schema": {
+                "name": self.name,
+                "schema": self.schema,
+                "strict": True
+            }
+        }
+
+    def __get_template__(self, schema: dict):
+        schema_type = schema.get("type")
+        if schema_type == "object":
+            return {key: self.__get_template__(value) for key, value in schema["properties"].items()}
+        if schema_type == "array":
+            return [self.__get_template__(schema["items"])]
+        if "description" in schema:
+            return schema["description"]
+        if isinstance(schema_type, list):
+            # The instructions cover missing values, so nullability is left out of the template
+            return "|".join(t for t in schema_type if t != "null")
+        return schema_type
+
+
+def nullable(schema_type: str, description: str | None = None) -> dict:
+    """Returns the JSON schema of a nullable value of the specified type.
+
+    :param schema_type: The JSON schema type of the value, e.g. `string`.
+    :param description: The description of the value, used in place of its type in the prompt. Default is `None`.
+    :return: The JSON schema of the value.
+    """
+
+    schema = {"type": [schema_type, "null"]}
+    if description:
+        schema["description"] = description
+    return schema
+
+
+def object_schema(properties: dict[str, dict]) -> dict:
+    """Returns the JSON schema of an object with the specified properties, all required and with no additional properties, as required by structured outputs.
+
+    :param properties: The JSON schemas of the properties of the object, in the order they should appear in the response.
+    :return: The JSON schema of the object.
+    """
+
+    return {
+        "type": "object",
+        "properties": properties,
+        "required": list(properties),
+        "additionalProperties": False
+    }
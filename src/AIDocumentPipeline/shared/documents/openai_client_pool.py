@@ -0,0 +1,195 @@
+"""Pooled Azure OpenAI clients.
+
+This module provides process-wide caches of Azure OpenAI clients, keyed by endpoint and API version, that share a single keep-alive HTTP connection pool and bearer token provider.
+"""
+
+from __future__ import annotations
+from abc import ABC, abstractmethod
+import threading
+import httpx
+from azure.core.credentials import TokenCredential
+from azure.core.credentials_async import AsyncTokenCredential
+from azure.identity import get_bearer_token_provider
+from azure.identity.aio import get_bearer_token_provider as get_async_bearer_token_provider
+from openai import AzureOpenAI, AsyncAzureOpenAI
+
+cognitive_services_scope = "https://cognitiveservices.azure.com/.default"
+
+
+class BaseAzureOpenAIClientPool(ABC):
+    """Defines the base class for caches of Azure OpenAI clients that reuse a shared keep-alive HTTP connection pool."""
+
+    def __init__(self, credential: TokenCredential | AsyncTokenCredential, max_connections: int = 20, max_keepalive_connections: int = 20, keepalive_expiry: float = 60.0):
+        """Initializes a new instance of the BaseAzureOpenAIClientPool class.
+
+        :param credential: The Azure credential to use for authenticating with the Azure OpenAI service. Async pools require an async credential, such as `azure.identity.aio.DefaultAzureCredential`.
+        :param max_connections: The maximum number of concurrent connections in the shared HTTP connection pool. Default is 20.
+        :param max_keepalive_connections: The maximum number of idle connections kept alive in the shared HTTP connection pool. Default is 20.
+        :param keepalive_expiry: The number of seconds an idle connection is kept alive before it is closed. Default is 60.
+        """
+
+        self.credential = credential
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry)
+
+        self._lock = threading.Lock()
+        self._clients: dict[tuple[str, str], AzureOpenAI | AsyncAzureOpenAI] = {}
+        self._http_client: httpx.Client | httpx.AsyncClient | None = None
+        self._token_provider = None
+
+        self.clients_created = 0
+        self.client_cache_hits = 0
+        self.requests_sent = 0
+        self.connections_opened = 0
+
+    def get_metrics(self) -> dict:
+        """Returns the client cache and connection reuse counters for the pool.
+
+        `client_cache_hits` is the number of times a cached client was handed out rather than created, which says nothing about the HTTP connections it uses. `connections_reused` is the number of requests that were sent on an existing keep-alive connection rather than a newly opened one.
+        """
+
+        with self._lock:
+            return {
+                "clients_created": self.clients_created,
+                "client_cache_hits": self.client_cache_hits,
+                "requests_sent": self.requests_sent,
+                "connections_opened": self.connections_opened,
+                "connections_reused": max(self.requests_sent - self.connections_opened, 0)
+            }
+
+    def __get_or_create_client__(self, endpoint: str, api_version: str):
+        key = (endpoint, api_version)
+        with self._lock:
+            client = self._clients.get(key)
+            if client:
+                self.client_cache_hits += 1
+                return client
+
+            if not self._http_client:
+                self._http_client = self.__create_http_client__()
+
+            if not self._token_provider:
+                self._token_provider = self.__create_token_provider__()
+
+            client = self.__create_client__(endpoint, api_version)
+
+            self._clients[key] = client
+            self.clients_created += 1
+            return client
+
+    @abstractmethod
+    def __create_http_client__(self):
+        ...
+
+    @abstractmethod
+    def __create_token_provider__(self):
+        ...
+
+    @abstractmethod
+    def __create_client__(self, endpoint: str, api_version: str):
+        ...
+
+    def __record_request__(self):
+        with self._lock:
+            self.requests_sent += 1
+
+    def __record_trace__(self, event_name: str):
+        if event_name == "connection.connect_tcp.complete":
+            with self._lock:
+                self.connections_opened += 1
+
+
+class AzureOpenAIClientPool(BaseAzureOpenAIClientPool):
+    """Defines a thread-safe cache of `AzureOpenAI` clients that reuse a shared keep-alive HTTP connection pool."""
+
+    def get_client(self, endpoint: str, api_version: str) -> AzureOpenAI:
+        """Retrieves the cached `AzureOpenAI` client for the specified endpoint and API version, creating it if it does not exist.
+
+        :param endpoint: The Azure OpenAI endpoint.
+        :param api_version: The Azure OpenAI API version.
+        :return: An `AzureOpenAI` client that uses the shared HTTP connection pool.
+        """
+
+        return self.__get_or_create_client__(endpoint, api_version)
+
+    def close(self):
+        """Closes the shared HTTP connection pool and clears the cached clients."""
+
+        with self._lock:
+            if self._http_client:
+                self._http_client.close()
+
+            self._http_client = None
+            self._clients.clear()
+
+    def __create_http_client__(self) -> httpx.Client:
+        return httpx.Client(
+            limits=self.limits,
+            event_hooks={"request": [self.__on_request__]})
+
+    def __create_token_provider__(self):
+        return get_bearer_token_provider(self.credential, cognitive_services_scope)
+
+    def __create_client__(self, endpoint: str, api_version: str) -> AzureOpenAI:
+        return AzureOpenAI(
+            api_version=api_version,
+            azure_endpoint=endpoint,
+            azure_ad_token_provider=self._token_provider,
+            http_client=self._http_client)
+
+    def __on_request__(self, request: httpx.Request):
+        request.extensions["trace"] = self.__on_trace__
+        self.__record_request__()
+
+    def __on_trace__(self, event_name: str, info: dict):
+        self.__record_trace__(event_name)
+
+
+class AsyncAzureOpenAIClientPool(BaseAzureOpenAIClientPool):
+    """Defines a cache of `AsyncAzureOpenAI` clients that reuse a shared keep-alive HTTP connection pool."""
+
+    def get_client(self, endpoint: str, api_version: str) -> AsyncAzureOpenAI:
+        """Retrieves the cached `AsyncAzureOpenAI` client for the specified endpoint and API version, creating it if it does not exist.
+
+        :param endpoint: The Azure OpenAI endpoint.
+        :param api_version: The Azure OpenAI API version.
+        :return: An `AsyncAzureOpenAI` client that uses the shared HTTP connection pool.
+        """
+
+        return self.__get_or_create_client__(endpoint, api_version)
+
+    async def close(self):
+        """Closes the shared HTTP connection pool and clears the cached clients."""
+
+        with self._lock:
+            http_client = self._http_client
+            self._http_client = None
+            self._clients.clear()
+
+        if http_client:
+            await http_client.aclose()
+
+    def __create_http_client__(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            limits=self.limits,
+            event_hooks={"request": [self.__on_request__]})
+
+    def __create_token_provider__(self):
+        # An async token provider, so that refreshing the token does not block the event loop
+        return get_async_bearer_token_provider(self.credential, cognitive_services_scope)
+
+    def __create_client__(self, endpoint: str, api_version: str) -> AsyncAzureOpenAI:
+        return AsyncAzureOpenAI(
+            api_version=api_version,
+            azure_endpoint=endpoint,
+            azure_ad_token_provider=self._token_provider,
+            http_client=self._http_client)
+
+    async def __on_request__(self, request: httpx.Request):
+        request.extensions["trace"] = self.__on_trace__
+        self.__record_request__()
+
+    async def __on_trace__(self, event_name: str, info: dict):
+        self.__record_trace__(event_name)
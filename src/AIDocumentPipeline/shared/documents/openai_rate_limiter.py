@@ -0,0 +1,408 @@
+"""Client-side rate limiting for Azure OpenAI requests.
+
+This module provides a token bucket rate limiter for the requests per minute and tokens per minute quotas of an Azure OpenAI deployment, with state that can be shared between the threads of a process, the processes of a host, or the hosts of a deployment.
+"""
+
+from __future__ import annotations
+from abc import ABC, abstractmethod
+import asyncio
+import base64
+import binascii
+import io
+import json
+import math
+import random
+import threading
+import time
+from typing import Awaitable, Callable, TypeVar
+from azure.core.exceptions import HttpResponseError, ResourceExistsError
+from openai import APIConnectionError, InternalServerError, RateLimitError
+from PIL import Image
+from shared.documents.document_image_profile import DocumentImageProfile
+from shared.storage.azure_storage_client_factory import AzureStorageClientFactory
+
+T = TypeVar("T")
+
+# GPT-4o charges a fixed number of tokens per image, plus a number per 512 pixel tile at high detail
+image_base_tokens = 85
+image_tile_tokens = 170
+image_tile_size = 512
+characters_per_token = 4
+
+# Connection errors, including timeouts, and 5xx responses are retried by the rate limiter, as they would be by the Azure OpenAI client
+transient_errors = (APIConnectionError, InternalServerError)
+
+
+def estimate_request_tokens(request: dict) -> int:
+    """Estimates the number of tokens a chat completions request counts against the tokens per minute quota.
+
+    Azure OpenAI counts the prompt tokens and the `max_tokens` of the request. Text is estimated at four characters per token, and images from their dimensions and detail level.
+
+    :param request: The keyword arguments of the chat completions request.
+    :return: The estimated number of tokens.
+    """
+
+    tokens = request.get("max_tokens") or 0
+    for message in request.get("messages", []):
+        content = message.get("content")
+        if isinstance(content, str):
+            tokens += math.ceil(len(content) / characters_per_token)
+            continue
+
+        for part in content or []:
+            if part.get("type") == "text":
+                tokens += math.ceil(len(part["text"]) / characters_per_token)
+            elif part.get("type") == "image_url":
+                tokens += estimate_image_tokens(part["image_url"])
+
+    return tokens
+
+
+def estimate_image_tokens(image_url: dict) -> int:
+    """Estimates the number of prompt tokens for an image content part.
+
+    :param image_url: The `image_url` of the content part, with a base64 data URI and an optional detail level.
+    :return: The estimated number of tokens.
+    """
+
+    if image_url.get("detail") == "low":
+        return image_base_tokens
+
+    size = __get_data_uri_image_size__(image_url["url"])
+    if not size:
+        # Assume the largest image the model processes at high detail
+        size = (DocumentImageProfile.model_max_long_edge,
+                DocumentImageProfile.model_max_short_edge)
+
+    width, height = size
+    scale = min(1.0, DocumentImageProfile.model_max_long_edge /
+                max(width, height))
+    width, height = width * scale, height * scale
+
+    scale = min(1.0, DocumentImageProfile.model_max_short_edge /
+                min(width, height))
+    width, height = width * scale, height * scale
+
+    tiles = math.ceil(width / image_tile_size) * \
+        math.ceil(height / image_tile_size)
+    return image_base_tokens + image_tile_tokens * tiles
+
+
+def __get_data_uri_image_size__(uri: str) -> tuple[int, int] | None:
+    if not uri.startswith("data:"):
+        return None
+
+    try:
+        image_bytes = base64.b64decode(uri[uri.index(",") + 1:])
+        # Only the image header is read to determine the size
+        with Image.open(io.BytesIO(image_bytes)) as image:
+            return image.size
+    except (ValueError, binascii.Error, OSError):
+        return None
+
+
+class RateLimitState(ABC):
+    """Defines the base class for the shared state of a rate limiter, updated atomically under a lock."""
+
+    @abstractmethod
+    def update(self, update: Callable[[dict], T]) -> T:
+        """Atomically reads the state, applies an update to it, and writes it back.
+
+        :param update: A function that modifies the state dictionary in place and returns a value.
+        :return: The value returned by the update function.
+        """
+
+
+class MemoryRateLimitState(RateLimitState):
+    """Defines rate limiter state shared between the threads and tasks of a single process."""
+
+    def __init__(self):
+        """Initializes a new instance of the MemoryRateLimitState class."""
+
+        self._lock = threading.Lock()
+        self._state: dict = {}
+
+    def update(self, update: Callable[[dict], T]) -> T:
+        with self._lock:
+            return update(self._state)
+
+
+class FileRateLimitState(RateLimitState):
+    """Defines rate limiter state shared between the processes of a single host, stored in a local file guarded by an exclusive file lock.
+
+    File locks are taken with `fcntl`, so this backend is only available on Unix hosts.
+    """
+
+    def __init__(self, file_path: str):
+        """Initializes a new instance of the FileRateLimitState class.
+
+        :param file_path: The path to the file to store the state in. The file is created if it does not exist.
+        """
+
+        self.file_path = file_path
+        self._lock = threading.Lock()
+
+    def update(self, update: Callable[[dict], T]) -> T:
+        # Imported here so that the module can be imported on Windows, where fcntl is not available
+        import fcntl
+
+        # File locks are held per process, so threads of the same process are serialized separately
+        with self._lock, open(self.file_path, "a+") as file:
+            fcntl.flock(file, fcntl.LOCK_EX)
+            try:
+                file.seek(0)
+                state = json.loads(file.read() or "{}")
+                value = update(state)
+
+                file.seek(0)
+                file.truncate()
+                file.write(json.dumps(state))
+                file.flush()
+                return value
+            finally:
+                fcntl.flock(file, fcntl.LOCK_UN)
+
+
+class BlobRateLimitState(RateLimitState):
+    """Defines rate limiter state shared between hosts, stored in a blob in an Azure Storage container guarded by a blob lease.
+
+    Each update takes several storage requests, so this backend suits deployments with modest request rates across many workers.
+    """
+
+    def __init__(self, storage_factory: AzureStorageClientFactory, storage_account_name: str, container_name: str, blob_name: str = "openai-rate-limit.json", lease_duration: int = 15):
+        """Initializes a new instance of the BlobRateLimitState class.
+
+        :param storage_factory: The factory used to create the Azure Storage clients.
+        :param storage_account_name: The name of the Azure Storage account.
+        :param container_name: The name of the container to store the state in. The container is created if it does not exist.
+        :param blob_name: The name of the blob to store the state in. Default is `openai-rate-limit.json`.
+        :param lease_duration: The duration in seconds of the lease held while updating the state. Default is 15, the minimum.
+        """
+
+        self.storage_factory = storage_factory
+        self.storage_account_name = storage_account_name
+        self.container_name = container_name
+        self.blob_name = blob_name
+        self.lease_duration = lease_duration
+        self._blob_created = False
+
+    def update(self, update: Callable[[dict], T]) -> T:
+        blob_client = self.storage_factory.get_blob_service_client(
+            self.storage_account_name).get_blob_client(self.container_name, self.blob_name)
+
+        if not self._blob_created:
+            try:
+                self.storage_factory.upload_blob(
+                    self.storage_account_name, self.container_name, self.blob_name, b"{}", overwrite=False)
+            except ResourceExistsError:
+                pass
+            self._blob_created = True
+
+        lease = self.__acquire_lease__(blob_client)
+        try:
+            state = json.loads(blob_client.download_blob(
+                lease=lease).readall() or b"{}")
+            value = update(state)
+            blob_client.upload_blob(json.dumps(state).encode(
+                "utf-8"), overwrite=True, lease=lease)
+            return value
+        finally:
+            lease.release()
+
+    def __acquire_lease__(self, blob_client):
+        while True:
+            try:
+                return blob_client.acquire_lease(lease_duration=self.lease_duration)
+            except HttpResponseError as e:
+                if e.status_code != 409:
+                    raise
+
+                # Another worker holds the lease
+                time.sleep(random.uniform(0.05, 0.2))
+
+
+class AzureOpenAIRateLimiter:
+    """Defines a token bucket rate limiter for the requests per minute and tokens per minute quotas of an Azure OpenAI deployment.
+
+    Each request reserves capacity from both buckets before it is sent, waiting until the capacity is available, so that concurrent callers are spaced out rather than sent at once. When a request is still throttled, the `retry-after` of the response is honoured by every caller sharing the state, and the request is retried with jittered exponential backoff. Requests that fail with a connection error, timeout, or 5xx response are also retried with jittered exponential backoff, without blocking the other callers.
+    """
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int, state: RateLimitState | None = None, max_retries: int = 5, base_backoff: float = 1.0, max_backoff: float = 60.0):
+        """Initializes a new instance of the AzureOpenAIRateLimiter class.
+
+        :param requests_per_minute: The requests per minute quota of the deployment. If 0, requests are not limited.
+        :param tokens_per_minute: The tokens per minute quota of the deployment. If 0, tokens are not limited.
+        :param state: The state shared by the rate limiters of every worker using the deployment. If not provided, the state is shared within this instance only.
+        :param max_retries: The maximum number of times a throttled or transiently failed request is retried. Default is 5.
+        :param base_backoff: The base delay in seconds of the exponential backoff, when the response does not include a `retry-after` or the request failed transiently. Default is 1.
+        :param max_backoff: The maximum delay in seconds between retries. Default is 60.
+        """
+
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.state = state or MemoryRateLimitState()
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+
+        self._metrics_lock = threading.Lock()
+        self.requests = 0
+        self.throttled_requests = 0
+        self.throttle_wait_seconds = 0.0
+        self.rate_limited_responses = 0
+        self.transient_errors = 0
+        self.retries = 0
+
+    def call(self, send: Callable[[], T], estimated_tokens: int) -> T:
+        """Sends a request once capacity is available, retrying it if it is throttled or fails transiently.
+
+        :param send: A function that sends the request and returns the response.
+        :param estimated_tokens: The estimated number of tokens the request counts against the quota.
+        :return: The response of the request.
+        """
+
+        attempt = 0
+        while True:
+            time.sleep(self.__wait_for_capacity__(estimated_tokens))
+
+            try:
+                return send()
+            except RateLimitError as e:
+                attempt += 1
+                if attempt > self.max_retries:
+                    raise
+
+                self.__on_rate_limited__(e, attempt)
+            except transient_errors:
+                attempt += 1
+                if attempt > self.max_retries:
+                    raise
+
+                time.sleep(self.__on_transient_error__(attempt))
+
+    async def call_async(self, send: Callable[[], Awaitable[T]], estimated_tokens: int) -> T:
+        """Asynchronously sends a request once capacity is available, retrying it if it is throttled or fails transiently.
+
+        :param send: A function that sends the request and returns an awaitable of the response.
+        :param estimated_tokens: The estimated number of tokens the request counts against the quota.
+        :return: The response of the request.
+        """
+
+        attempt = 0
+        while True:
+            await asyncio.sleep(await asyncio.to_thread(self.__wait_for_capacity__, estimated_tokens))
+
+            try:
+                return await send()
+            except RateLimitError as e:
+                attempt += 1
+                if attempt > self.max_retries:
+                    raise
+
+                await asyncio.to_thread(self.__on_rate_limited__, e, attempt)
+            except transient_errors:
+                attempt += 1
+                if attempt > self.max_retries:
+                    raise
+
+                await asyncio.sleep(self.__on_transient_error__(attempt))
+
+    def get_metrics(self) -> dict:
+        """Returns the request, throttling, and retry counters for the rate limiter.
+
+        `throttle_wait_seconds` is the total time requests waited for capacity or a `retry-after` before they were sent.
+        """
+
+        with self._metrics_lock:
+            return {
+                "requests": self.requests,
+                "throttled_requests": self.throttled_requests,
+                "throttle_wait_seconds": self.throttle_wait_seconds,
+                "rate_limited_responses": self.rate_limited_responses,
+                "transient_errors": self.transient_errors,
+                "retries": self.retries
+            }
+
+    def __wait_for_capacity__(self, estimated_tokens: int) -> float:
+        """Reserves capacity for a request and returns the number of seconds to wait before sending it."""
+
+        now = time.time()
+        wait = self.state.update(
+            lambda state: self.__reserve__(state, now, estimated_tokens))
+
+        with self._metrics_lock:
+            self.requests += 1
+            if wait > 0:
+                self.throttled_requests += 1
+                self.throttle_wait_seconds += wait
+
+        return wait
+
+    def __reserve__(self, state: dict, now: float, estimated_tokens: int) -> float:
+        # Capacity is reserved even when it is not yet available, so later callers queue behind earlier ones
+        wait = max(state.get("blocked_until", 0.0) - now, 0.0)
+
+        if self.requests_per_minute > 0:
+            wait = max(wait, self.__take__(
+                state, "requests", now, self.requests_per_minute, 1))
+
+        if self.tokens_per_minute > 0:
+            wait = max(wait, self.__take__(state, "tokens", now,
+                       self.tokens_per_minute, min(estimated_tokens, self.tokens_per_minute)))
+
+        return wait
+
+    def __take__(self, state: dict, bucket: str, now: float, per_minute: int, amount: int) -> float:
+        rate = per_minute / 60.0
+        available = state.get(f"{bucket}_available", float(per_minute))
+        updated_at = state.get(f"{bucket}_updated_at", now)
+
+        available = min(float(per_minute), available +
+                        (now - updated_at) * rate) - amount
+
+        state[f"{bucket}_available"] = available
+        state[f"{bucket}_updated_at"] = now
+
+        return max(-available / rate, 0.0)
+
+    def __on_rate_limited__(self, error: RateLimitError, attempt: int):
+        """Records a throttled response and blocks every caller sharing the state, including the caller retrying the request, until requests may be sent again."""
+
+        delay = self.__get_retry_after__(error)
+        if delay is None:
+            delay = self.__get_backoff__(attempt)
+
+        blocked_until = time.time() + delay
+        self.state.update(lambda state: state.update(
+            blocked_until=max(state.get("blocked_until", 0.0), blocked_until)))
+
+        with self._metrics_lock:
+            self.rate_limited_responses += 1
+            self.retries += 1
+
+    def __on_transient_error__(self, attempt: int) -> float:
+        """Records a transiently failed request and returns the number of seconds to wait before retrying it. Other callers are not blocked, as the failure is not a signal that the quota is exhausted."""
+
+        with self._metrics_lock:
+            self.transient_errors += 1
+            self.retries += 1
+
+        return self.__get_backoff__(attempt)
+
+    def __get_backoff__(self, attempt: int) -> float:
+        # Full jitter spreads the retries of concurrent callers
+        return random.uniform(0, min(self.max_backoff, self.base_backoff * 2 ** (attempt - 1)))
+
+    def __get_retry_after__(self, error: RateLimitError) -> float | None:
+        headers = error.response.headers if error.response is not None else {}
+
+        try:
+            if headers.get("retry-after-ms"):
+                return min(float(headers["retry-after-ms"]) / 1000, self.max_backoff)
+
+            if headers.get("retry-after"):
+                return min(float(headers["retry-after"]), self.max_backoff)
+        except ValueError:
+            pass
+
+        return None
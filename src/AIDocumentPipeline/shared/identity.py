@@ -1,10 +1,11 @@
 """Identity helper for Azure SDK clients.
 
-This module provides a default Azure credential that can be used by Azure SDK clients to authenticate with Azure services.
+This module provides default sync and async Azure credentials that can be used by Azure SDK clients to authenticate with Azure services.
 """
 
 import os
 from azure.identity import DefaultAzureCredential
+from azure.identity.aio import DefaultAzureCredential as AsyncDefaultAzureCredential
 
 managed_identity_client_id = os.environ.get("MANAGED_IDENTITY_CLIENT_ID", None)
 
@@ -19,3 +20,15 @@ default_credential = DefaultAzureCredential(
     process_timeout=10,
     managed_identity_client_id=managed_identity_client_id
 )
+
+default_async_credential = AsyncDefaultAzureCredential(
+    exclude_environment_credential=True,
+    exclude_interactive_browser_credential=True,
+    exclude_visual_studio_code_credential=True,
+    exclude_shared_token_cache_credential=True,
+    exclude_developer_cli_credential=True,
+    exclude_powershell_credential=True,
+    exclude_workload_identity_credential=True,
+    process_timeout=10,
+    managed_identity_client_id=managed_identity_client_id
+)
@@ -0,0 +1,112 @@
+"""Generated JSON codecs for slotted data models.
+
+This module provides a class decorator that generates the `to_dict`, `from_dict`, `to_json`, and `from_json` methods of a dataclass from its fields, and a JSON backend that uses `orjson` when it is installed.
+"""
+
+from __future__ import annotations
+import dataclasses
+import json
+import typing
+import types
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(obj) -> str:
+    """Serializes an object to a compact JSON string, using `orjson` if it is installed.
+
+    :param obj: The object to serialize, made up of JSON compatible types.
+    :return: The JSON string.
+    """
+
+    if orjson:
+        return orjson.dumps(obj).decode("utf-8")
+    return json.dumps(obj, separators=(",", ":"))
+
+
+def loads(json_str: str | bytes):
+    """Deserializes a JSON string, using `orjson` if it is installed.
+
+    :param json_str: The JSON string or UTF-8 encoded bytes to deserialize.
+    :return: The deserialized object.
+    """
+
+    if orjson:
+        return orjson.loads(json_str)
+    return json.loads(json_str)
+
+
+def json_codec(cls: type) -> type:
+    """Generates the JSON codec methods of a dataclass from its fields.
+
+    Fields whose type is another codec class, or a list of one, are converted recursively. Keys that are missing from a dictionary take the default value of the field instead of raising a `KeyError`. Nested codec classes must be defined before the classes that use them.
+
+    :param cls: The dataclass to generate the codec methods for.
+    :return: The same class, with `to_dict`, `to_json`, `from_json`, and `from_dict` methods.
+    """
+
+    hints = typing.get_type_hints(cls)
+    fields = dataclasses.fields(cls)
+    namespace = {"cls": cls, "dumps": dumps, "loads": loads}
+
+    to_dict_items = []
+    from_dict_args = []
+    for i, field in enumerate(fields):
+        nested_type, is_list = __get_nested_codec__(hints[field.name])
+        value = f"self.{field.name}"
+        item = f"obj.get({field.name!r}, default_{i})"
+        namespace[f"default_{i}"] = field.default if field.default is not dataclasses.MISSING else None
+
+        if nested_type:
+            namespace[f"from_dict_{i}"] = nested_type.from_dict
+            if is_list:
+                value = f"None if {value} is None else [v.to_dict() for v in {value}]"
+                item = f"None if (v := {item}) is None else [from_dict_{i}(x) for x in v]"
+            else:
+                value = f"None if {value} is None else {value}.to_dict()"
+                item = f"None if (v := {item}) is None else from_dict_{i}(v)"
+
+        to_dict_items.append(f"{field.name!r}: {value}")
+        from_dict_args.append(item)
+
+    source = f"""
+def to_dict(self) -> dict:
+    return {{{", ".join(to_dict_items)}}}
+
+def to_json(obj) -> str:
+    return dumps(obj.to_dict())
+
+def from_json(json_str):
+    return from_dict(loads(json_str))
+
+def from_dict(obj: dict):
+    return cls({", ".join(from_dict_args)})
+"""
+    exec(source, namespace)
+
+    cls.to_dict = namespace["to_dict"]
+    cls.to_json = staticmethod(namespace["to_json"])
+    cls.from_json = staticmethod(namespace["from_json"])
+    cls.from_dict = staticmethod(namespace["from_dict"])
+    return cls
+
+
+def __get_nested_codec__(hint) -> tuple[type | None, bool]:
+    # Unwraps `X | None`, `list[X]`, and `list[X] | None` to the codec class X, if any
+    if isinstance(hint, types.UnionType) or typing.get_origin(hint) is typing.Union:
+        args = [a for a in typing.get_args(hint) if a is not type(None)]
+        if len(args) != 1:
+            return None, False
+        hint = args[0]
+
+    if typing.get_origin(hint) is list:
+        nested_type, _ = __get_nested_codec__(typing.get_args(hint)[0])
+        return nested_type, nested_type is not None
+
+    if isinstance(hint, type) and hasattr(hint, "from_dict") and dataclasses.is_dataclass(hint):
+        return hint, False
+
+    return None, False
@@ -0,0 +1,190 @@
+"""Streaming writers of tabular rows to columnar and line-delimited files.
+
+This module provides writers that buffer rows into fixed size row groups and flush each group to a file, so that exports of any size are written with bounded memory.
+"""
+
+from __future__ import annotations
+from abc import ABC, abstractmethod
+from enum import Enum
+import json
+from typing import BinaryIO
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+
+class RowGroupFormat(Enum):
+    """Defines the file formats that rows can be written to."""
+
+    JsonLines = "jsonl"
+    """One JSON object per row and line. Requires no additional dependencies."""
+
+    Parquet = "parquet"
+    """Apache Parquet, with one row group per flush. Requires the `pyarrow` package."""
+
+
+def __to_column_type__(value, column_type: str):
+    if value is None:
+        return None
+
+    try:
+        if column_type == "string":
+            return value if isinstance(value, str) else str(value)
+        if column_type == "int":
+            return int(value)
+        if column_type == "float":
+            return float(value)
+        if column_type == "bool":
+            return bool(value)
+    except (TypeError, ValueError):
+        return None
+
+    return value
+
+
+class RowGroupWriter(ABC):
+    """Defines the base class for writing rows to a file in row groups."""
+
+    def __init__(self, file: BinaryIO, columns: dict[str, str], row_group_size: int = 10000):
+        """Initializes a new instance of the RowGroupWriter class.
+
+        :param file: The binary file to write to.
+        :param columns: The names of the columns of each row, in order, mapped to their types: `string`, `int`, `float`, or `bool`.
+        :param row_group_size: The number of rows to buffer before writing them to the file as a group. Default is 10000.
+        """
+
+        self.file = file
+        self.columns = columns
+        self.row_group_size = max(row_group_size, 1)
+        self.row_count = 0
+        self.row_group_count = 0
+        self._rows: list[dict] = []
+
+    @staticmethod
+    def create(format: RowGroupFormat, file: BinaryIO, columns: dict[str, str], row_group_size: int = 10000) -> RowGroupWriter:
+        """Creates a writer for the specified file format.
+
+        :param format: The file format to write.
+        :param file: The binary file to write to.
+        :param columns: The names of the columns of each row, in order, mapped to their types: `string`, `int`, `float`, or `bool`.
+        :param row_group_size: The number of rows to buffer before writing them to the file as a group. Default is 10000.
+        :return: The writer.
+        """
+
+        if format == RowGroupFormat.Parquet:
+            return ParquetRowGroupWriter(file, columns, row_group_size)
+        return JsonLinesRowGroupWriter(file, columns, row_group_size)
+
+    def write(self, row: dict):
+        """Adds a row, writing the buffered rows to the file if a row group is full.
+
+        :param row: The row, keyed by column name. Missing columns, and values that cannot be converted to the type of their column, are written as null.
+        """
+
+        self._rows.append({column: __to_column_type__(row.get(column), column_type)
+                           for column, column_type in self.columns.items()})
+        if len(self._rows) >= self.row_group_size:
+            self.flush()
+
+    def flush(self):
+        """Writes any buffered rows to the file as a row group."""
+
+        if not self._rows:
+            return
+
+        self.__write_row_group__(self._rows)
+        self.row_count += len(self._rows)
+        self.row_group_count += 1
+        self._rows = []
+
+    def append(self, source: BinaryIO):
+        """Appends the rows of a file written by a writer of the same format and columns, without converting them again.
+
+        :param source: The binary file to append, positioned at its start.
+        """
+
+        self.flush()
+        self.row_count += self.__append_file__(source)
+
+    def close(self):
+        """Writes any buffered rows and finalizes the file. The file itself is not closed."""
+
+        self.flush()
+
+    @abstractmethod
+    def __write_row_group__(self, rows: list[dict]):
+        ...
+
+    @abstractmethod
+    def __append_file__(self, source: BinaryIO) -> int:
+        ...
+
+
+class JsonLinesRowGroupWriter(RowGroupWriter):
+    """Defines a writer of rows to a JSON Lines file."""
+
+    def __append_file__(self, source: BinaryIO) -> int:
+        # Rows are counted as the file is copied, so that the file is read once
+        row_count = 0
+        for chunk in iter(lambda: source.read(1024 * 1024), b""):
+            row_count += chunk.count(b"\n")
+            self.file.write(chunk)
+
+        self.row_group_count += 1
+        return row_count
+
+    def __write_row_group__(self, rows: list[dict]):
+        self.file.write("".join(json.dumps(row, separators=(",", ":")) + "\n"
+                                for row in rows).encode("utf-8"))
+
+
+class ParquetRowGroupWriter(RowGroupWriter):
+    """Defines a writer of rows to an Apache Parquet file."""
+
+    def __init__(self, file: BinaryIO, columns: dict[str, str], row_group_size: int = 10000):
+        """Initializes a new instance of the ParquetRowGroupWriter class.
+
+        :param file: The binary file to write to.
+        :param columns: The names of the columns of each row, in order, mapped to their types: `string`, `int`, `float`, or `bool`.
+        :param row_group_size: The number of rows to buffer before writing them to the file as a group. Default is 10000.
+        """
+
+        if pyarrow is None:
+            raise ImportError(
+                "The pyarrow package is required to write Parquet files.")
+
+        super().__init__(file, columns, row_group_size)
+
+        column_types = {
+            "string": pyarrow.string(),
+            "int": pyarrow.int64(),
+            "float": pyarrow.float64(),
+            "bool": pyarrow.bool_()
+        }
+        self._schema = pyarrow.schema(
+            [(column, column_types[column_type]) for column, column_type in columns.items()])
+        self._writer = pyarrow.parquet.ParquetWriter(file, self._schema)
+
+    def close(self):
+        """Writes any buffered rows and the Parquet footer. The file itself is not closed."""
+
+        super().close()
+        self._writer.close()
+
+    def __append_file__(self, source: BinaryIO) -> int:
+        # Row groups are copied one at a time, so that only one is held in memory
+        parquet_file = pyarrow.parquet.ParquetFile(source)
+        for row_group_index in range(parquet_file.num_row_groups):
+            table = parquet_file.read_row_group(row_group_index)
+            self._writer.write_table(table.cast(self._schema), row_group_size=max(table.num_rows, 1))
+            self.row_group_count += 1
+
+        return parquet_file.metadata.num_rows
+
+    def __write_row_group__(self, rows: list[dict]):
+        table = pyarrow.Table.from_pydict(
+            {column: [row[column] for row in rows] for column in self.columns}, schema=self._schema)
+        self._writer.write_table(table, row_group_size=len(rows))
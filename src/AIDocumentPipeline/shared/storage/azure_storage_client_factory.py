@@ -1,48 +1,358 @@
+import hashlib
+import os
 import re
+import tempfile
+import threading
+from typing import Callable, Iterator
+import aiohttp
+import requests
+from azure.core import MatchConditions
+from azure.core.exceptions import ResourceExistsError, ResourceNotFoundError
+from azure.core.pipeline.transport import AioHttpTransport, RequestsTransport
 from azure.identity import DefaultAzureCredential
-from azure.storage.blob import BlobServiceClient
+from azure.identity.aio import DefaultAzureCredential as AsyncDefaultAzureCredential
+from azure.storage.blob import BlobPrefix, BlobServiceClient, StorageErrorCode
+from azure.storage.blob.aio import BlobServiceClient as AsyncBlobServiceClient
+from shared.storage.blob_folder_page import BlobFolderPage
+from shared.storage.blob_reference import BlobReference
+from shared.storage.spilled_blob_content import SpilledBlobContent
+
+development_storage_connection_string = "AccountName=devstoreaccount1;AccountKey=Eby8vdM02xNOcqFlqUwJPLlmEtlCDXJ1OUzFT50uSRZ6IFsuFq2UVErCz4I6tq/K1SZFPTOtr/KBHBeksoGMGw==;DefaultEndpointsProtocol=http;BlobEndpoint=http://127.0.0.1:10000/devstoreaccount1;QueueEndpoint=http://127.0.0.1:10001/devstoreaccount1;TableEndpoint=http://127.0.0.1:10002/devstoreaccount1;"
+
+# Matches regular expression filters that only check the extension of a blob name, e.g. .*\.(pdf|png)$
+suffix_filter_pattern = re.compile(r"\.\*\\\.(?:\(([\w|]+)\)|(\w+))\$")
 
 
 class AzureStorageClientFactory:
-    """Defines a factory class for creating Azure Storage service client instances."""
+    """Defines a factory class for creating Azure Storage service client instances.
+
+    Service clients are cached per storage account and credential for the lifetime of the process, and share a single HTTP transport, so that connections are reused across every factory instance and activity in the same worker.
+    """
+
+    _lock = threading.Lock()
+    _clients: dict[tuple[str, int], BlobServiceClient] = {}
+    _async_clients: dict[tuple[str, int], AsyncBlobServiceClient] = {}
+    _session: requests.Session | None = None
+    _async_session: aiohttp.ClientSession | None = None
+    _known_containers: set[tuple[str, str]] = set()
 
-    def __init__(self, credential: DefaultAzureCredential):
+    clients_created = 0
+    client_cache_hits = 0
+    containers_created = 0
+
+    def __init__(self, credential: DefaultAzureCredential, async_credential: AsyncDefaultAzureCredential | None = None, max_connections: int = 20, download_max_concurrency: int = 1, download_chunk_size: int = 4 * 1024 * 1024, download_spill_threshold: int | None = None):
         """Initializes a new instance of the AzureStorageClientFactory class.
 
         :param credential: The Azure credential to use for authenticating with the Azure Storage service.
+        :param async_credential: The async Azure credential to use for authenticating async clients with the Azure Storage service. Required to create async clients for non-development storage accounts.
+        :param max_connections: The maximum number of connections per host in the shared HTTP transport. Applied when the transport is first created. Default is 20.
+        :param download_max_concurrency: The number of parallel connections used to download the ranges of a blob larger than the chunk size. Default is 1.
+        :param download_chunk_size: The size in bytes of the initial request and each subsequent ranged read when downloading a blob. Applied when the client for a storage account is first created. Default is 4 MiB.
+        :param download_spill_threshold: The blob size in bytes above which downloaded content is streamed to a temporary file and returned as a read-only memory map, rather than held in memory. Default is `None` (never spill).
         """
 
         self.credential = credential
+        self.async_credential = async_credential
+        self.max_connections = max_connections
+        self.download_max_concurrency = download_max_concurrency
+        self.download_chunk_size = download_chunk_size
+        self.download_spill_threshold = download_spill_threshold
 
     def get_blob_service_client(self, storage_account_name: str) -> BlobServiceClient:
         """Retrieves a `BlobServiceClient` instance for the specified Azure Storage account.
 
         :param storage_account_name: The name of the Azure Storage account. If the account is a development storage account (i.e., devstoreaccount1 or UseDevelopmentStorage=true), the client will be created using the development storage connection string.
-        :return: A `BlobServiceClient` instance for the specified storage account.
+        :return: A cached `BlobServiceClient` instance for the specified storage account.
+        """
+
+        key = (storage_account_name, id(self.credential))
+        with AzureStorageClientFactory._lock:
+            client = AzureStorageClientFactory._clients.get(key)
+            if client:
+                AzureStorageClientFactory.client_cache_hits += 1
+                return client
+
+            transport = RequestsTransport(
+                session=self.__get_session__(), session_owner=False)
+
+            if self.__is_development_storage_account__(storage_account_name):
+                client = BlobServiceClient.from_connection_string(
+                    development_storage_connection_string, transport=transport, **self.__get_download_options__())
+            else:
+                client = BlobServiceClient(
+                    f"https://{storage_account_name}.blob.core.windows.net",
+                    credential=self.credential,
+                    transport=transport,
+                    **self.__get_download_options__()
+                )
+
+            AzureStorageClientFactory._clients[key] = client
+            AzureStorageClientFactory.clients_created += 1
+            return client
+
+    def get_async_blob_service_client(self, storage_account_name: str) -> AsyncBlobServiceClient:
+        """Retrieves an async `BlobServiceClient` instance for the specified Azure Storage account.
+
+        Async clients share an `aiohttp` session that is bound to the event loop it is first used on, which is the single event loop of the Azure Functions worker.
+
+        :param storage_account_name: The name of the Azure Storage account. If the account is a development storage account (i.e., devstoreaccount1 or UseDevelopmentStorage=true), the client will be created using the development storage connection string.
+        :return: A cached async `BlobServiceClient` instance for the specified storage account.
         """
 
-        if self.__is_development_storage_account__(storage_account_name):
-            return BlobServiceClient.from_connection_string("AccountName=devstoreaccount1;AccountKey=Eby8vdM02xNOcqFlqUwJPLlmEtlCDXJ1OUzFT50uSRZ6IFsuFq2UVErCz4I6tq/K1SZFPTOtr/KBHBeksoGMGw==;DefaultEndpointsProtocol=http;BlobEndpoint=http://127.0.0.1:10000/devstoreaccount1;QueueEndpoint=http://127.0.0.1:10001/devstoreaccount1;TableEndpoint=http://127.0.0.1:10002/devstoreaccount1;")
-        else:
-            return BlobServiceClient(
-                f"https://{storage_account_name}.blob.core.windows.net",
-                credential=self.credential
-            )
+        key = (storage_account_name, id(self.async_credential))
+        with AzureStorageClientFactory._lock:
+            client = AzureStorageClientFactory._async_clients.get(key)
+            if client:
+                AzureStorageClientFactory.client_cache_hits += 1
+                return client
+
+            transport = AioHttpTransport(
+                session=self.__get_async_session__(), session_owner=False)
+
+            if self.__is_development_storage_account__(storage_account_name):
+                client = AsyncBlobServiceClient.from_connection_string(
+                    development_storage_connection_string, transport=transport, **self.__get_download_options__())
+            else:
+                client = AsyncBlobServiceClient(
+                    f"https://{storage_account_name}.blob.core.windows.net",
+                    credential=self.async_credential,
+                    transport=transport,
+                    **self.__get_download_options__()
+                )
+
+            AzureStorageClientFactory._async_clients[key] = client
+            AzureStorageClientFactory.clients_created += 1
+            return client
+
+    @staticmethod
+    def get_metrics() -> dict:
+        """Returns the process-wide counters for service clients created and handed out from the cache, and containers created on write.
+
+        `client_cache_hits` counts cached clients handed out rather than created, not reused HTTP connections.
+        """
+
+        with AzureStorageClientFactory._lock:
+            return {
+                "clients_created": AzureStorageClientFactory.clients_created,
+                "client_cache_hits": AzureStorageClientFactory.client_cache_hits,
+                "containers_created": AzureStorageClientFactory.containers_created
+            }
+
+    @staticmethod
+    def close():
+        """Closes the cached service clients and the shared `requests` session. Clients retrieved afterwards are created again."""
+
+        with AzureStorageClientFactory._lock:
+            clients = list(AzureStorageClientFactory._clients.values())
+            session = AzureStorageClientFactory._session
+            AzureStorageClientFactory._clients.clear()
+            AzureStorageClientFactory._session = None
+
+        for client in clients:
+            client.close()
+
+        if session:
+            session.close()
+
+    @staticmethod
+    async def close_async():
+        """Closes the cached async service clients and the shared `aiohttp` session. Must be awaited on the event loop the async clients were used on, as the session is bound to it. Clients retrieved afterwards are created again."""
+
+        with AzureStorageClientFactory._lock:
+            clients = list(AzureStorageClientFactory._async_clients.values())
+            session = AzureStorageClientFactory._async_session
+            AzureStorageClientFactory._async_clients.clear()
+            AzureStorageClientFactory._async_session = None
+
+        # The clients do not own the shared session, so it is closed separately
+        for client in clients:
+            await client.close()
 
-    def get_blob_content(self, storage_account_name: str, container_name: str, blob_name: str) -> bytes:
+        if session:
+            await session.close()
+
+    def get_blob_content(self, storage_account_name: str, container_name: str, blob_name: str) -> bytes | SpilledBlobContent:
         """Retrieves the content of a specific blob in Azure Blob Storage as a byte array.
 
+        Blobs larger than the chunk size are downloaded as parallel ranged reads. Blobs larger than the spill threshold are streamed to a temporary file and returned as a read-only `SpilledBlobContent` memory map, so that their content is paged in from disk rather than held in memory. The caller should close the memory map when it is no longer needed, which deletes the file.
+
         :param storage_account_name: The name of the Azure Storage account.
         :param container_name: The name of the container within the storage account.
         :param blob_name: The name of the blob to retrieve.
-        :return: The byte array content of the specified blob.
+        :return: The byte array content of the specified blob, or a read-only memory map of the content if it exceeds the spill threshold.
         """
 
         blob_service_client = self.get_blob_service_client(
             storage_account_name)
         blob_client = blob_service_client.get_blob_client(
             container_name, blob_name)
-        return blob_client.download_blob().readall()
+        downloader = blob_client.download_blob(
+            max_concurrency=self.download_max_concurrency)
+
+        if not self.__should_spill__(downloader.size):
+            return downloader.readall()
+
+        # Spilled to a named file, so that its path can be given to tools that read files rather than the content copied again
+        with tempfile.NamedTemporaryFile(delete=False) as temp_file:
+            try:
+                downloader.readinto(temp_file)
+            except BaseException:
+                temp_file.close()
+                os.remove(temp_file.name)
+                raise
+
+        return SpilledBlobContent(temp_file.name)
+
+    async def get_blob_content_async(self, storage_account_name: str, container_name: str, blob_name: str) -> bytes | SpilledBlobContent:
+        """Asynchronously retrieves the content of a specific blob in Azure Blob Storage as a byte array.
+
+        Blobs larger than the chunk size are downloaded as parallel ranged reads. Blobs larger than the spill threshold are streamed to a temporary file and returned as a read-only `SpilledBlobContent` memory map, so that their content is paged in from disk rather than held in memory. The caller should close the memory map when it is no longer needed, which deletes the file.
+
+        :param storage_account_name: The name of the Azure Storage account.
+        :param container_name: The name of the container within the storage account.
+        :param blob_name: The name of the blob to retrieve.
+        :return: The byte array content of the specified blob, or a read-only memory map of the content if it exceeds the spill threshold.
+        """
+
+        blob_service_client = self.get_async_blob_service_client(
+            storage_account_name)
+        blob_client = blob_service_client.get_blob_client(
+            container_name, blob_name)
+        downloader = await blob_client.download_blob(
+            max_concurrency=self.download_max_concurrency)
+
+        if not self.__should_spill__(downloader.size):
+            return await downloader.readall()
+
+        # Spilled to a named file, so that its path can be given to tools that read files rather than the content copied again
+        with tempfile.NamedTemporaryFile(delete=False) as temp_file:
+            try:
+                await downloader.readinto(temp_file)
+            except BaseException:
+                temp_file.close()
+                os.remove(temp_file.name)
+                raise
+
+        return SpilledBlobContent(temp_file.name)
+
+    def upload_blob(self, storage_account_name: str, container_name: str, blob_name: str, content: bytes, overwrite: bool = True, metadata: dict[str, str] | None = None) -> BlobReference:
+        """Uploads content to a blob in Azure Blob Storage, creating the container if it does not exist.
+
+        The upload is attempted first, and the container is only created if the upload fails because the container does not exist, so that a write to an existing container is a single request.
+
+        :param storage_account_name: The name of the Azure Storage account.
+        :param container_name: The name of the container within the storage account.
+        :param blob_name: The name of the blob to upload the content to.
+        :param content: The byte array content to upload.
+        :param overwrite: A flag indicating whether to overwrite an existing blob with the same name. Default is `True`.
+        :param metadata: Optional metadata to set on the blob. Default is `None`.
+        :return: A reference to the uploaded blob that can be passed between workflow operations in place of the content.
+        """
+
+        container_client = self.get_blob_service_client(
+            storage_account_name).get_container_client(container_name)
+        blob_client = container_client.get_blob_client(blob_name)
+
+        try:
+            response = blob_client.upload_blob(
+                content, overwrite=overwrite, metadata=metadata)
+        except ResourceNotFoundError as e:
+            if e.error_code != StorageErrorCode.container_not_found:
+                raise
+
+            # The container may have been deleted since it was last written to
+            self.__forget_container__(storage_account_name, container_name)
+            self.ensure_container(storage_account_name, container_name)
+            response = blob_client.upload_blob(
+                content, overwrite=overwrite, metadata=metadata)
+
+        self.__remember_container__(storage_account_name, container_name)
+        return self.__get_blob_reference__(storage_account_name, container_name, blob_name, blob_client.url, content, response)
+
+    async def upload_blob_async(self, storage_account_name: str, container_name: str, blob_name: str, content: bytes, overwrite: bool = True, metadata: dict[str, str] | None = None) -> BlobReference:
+        """Asynchronously uploads content to a blob in Azure Blob Storage, creating the container if it does not exist.
+
+        The upload is attempted first, and the container is only created if the upload fails because the container does not exist, so that a write to an existing container is a single request.
+
+        :param storage_account_name: The name of the Azure Storage account.
+        :param container_name: The name of the container within the storage account.
+        :param blob_name: The name of the blob to upload the content to.
+        :param content: The byte array content to upload.
+        :param overwrite: A flag indicating whether to overwrite an existing blob with the same name. Default is `True`.
+        :param metadata: Optional metadata to set on the blob. Default is `None`.
+        :return: A reference to the uploaded blob that can be passed between workflow operations in place of the content.
+        """
+
+        blob_service_client = self.get_async_blob_service_client(
+            storage_account_name)
+        blob_client = blob_service_client.get_blob_client(
+            container_name, blob_name)
+
+        try:
+            response = await blob_client.upload_blob(
+                content, overwrite=overwrite, metadata=metadata)
+        except ResourceNotFoundError as e:
+            if e.error_code != StorageErrorCode.container_not_found:
+                raise
+
+            self.__forget_container__(storage_account_name, container_name)
+            try:
+                await blob_service_client.create_container(container_name)
+                with AzureStorageClientFactory._lock:
+                    AzureStorageClientFactory.containers_created += 1
+            except ResourceExistsError:
+                pass
+
+            response = await blob_client.upload_blob(
+                content, overwrite=overwrite, metadata=metadata)
+
+        self.__remember_container__(storage_account_name, container_name)
+        return self.__get_blob_reference__(storage_account_name, container_name, blob_name, blob_client.url, content, response)
+
+    def get_blob_content_by_reference(self, reference: BlobReference) -> bytes:
+        """Retrieves the content of a blob referenced by a `BlobReference`.
+
+        The content is only returned if the blob has not been modified since the reference was created.
+
+        :param reference: The reference to the blob.
+        :return: The byte array content of the referenced blob.
+        """
+
+        blob_client = self.get_blob_service_client(reference.storage_account_name).get_blob_client(
+            reference.container_name, reference.blob_name)
+
+        content = blob_client.download_blob(
+            etag=reference.etag, match_condition=MatchConditions.IfNotModified).readall()
+
+        if hashlib.sha256(content).hexdigest() != reference.sha256:
+            raise ValueError(
+                f"The content of {reference.uri} does not match the referenced hash.")
+
+        return content
+
+    def ensure_container(self, storage_account_name: str, container_name: str):
+        """Creates a container in Azure Blob Storage if it is not already known to exist.
+
+        Containers that have been created or written to are cached for the lifetime of the process, so that the container is only checked once per worker.
+
+        :param storage_account_name: The name of the Azure Storage account.
+        :param container_name: The name of the container within the storage account.
+        """
+
+        key = (storage_account_name, container_name)
+        with AzureStorageClientFactory._lock:
+            if key in AzureStorageClientFactory._known_containers:
+                return
+
+        try:
+            self.get_blob_service_client(storage_account_name).create_container(
+                container_name)
+            with AzureStorageClientFactory._lock:
+                AzureStorageClientFactory.containers_created += 1
+        except ResourceExistsError:
+            pass
+
+        self.__remember_container__(storage_account_name, container_name)
 
     def get_blobs_by_folder_at_root(self, storage_account_name: str, container_name: str, regex_filter: str | None = None) -> dict[str, list[str]]:
         """Retrieves a list of blob names grouped by folder at the root level of the container.
@@ -55,30 +365,106 @@ class AzureStorageClientFactory:
         :return: A dictionary containing the blob names grouped by folder.
         """
 
+        grouped_folders: dict[str, list[str]] = {}
+        for page in self.iter_blob_folders_at_root(storage_account_name, container_name, regex_filter):
+            for folder_name, blob_names in page.folders.items():
+                grouped_folders.setdefault(folder_name, []).extend(blob_names)
+
+        return grouped_folders
+
+    def iter_blob_folders_at_root(self, storage_account_name: str, container_name: str, regex_filter: str | None = None, continuation_token: str | None = None, folders_per_page: int | None = None) -> Iterator[BlobFolderPage]:
+        """Lazily retrieves pages of blob names grouped by folder at the root level of the container.
+
+        The folders at the root are discovered with a delimited listing, and only the blobs within each folder are then listed, so the whole container is never held in memory. Any blobs in the root of the container are grouped by the container name.
+
+        :param storage_account_name: The name of the Azure Storage account.
+        :param container_name: The name of the container within the storage account.
+        :param regex_filter: An optional regular expression filter to apply to the blob names. Filters of the form `.*\\.(ext1|ext2)$` are applied as suffix checks.
+        :param continuation_token: The continuation token of a previous page to resume the listing from. Default is `None` (start from the beginning).
+        :param folders_per_page: The maximum number of root level folders and blobs to list per page. Default is `None` (the service default).
+        :return: An iterator of `BlobFolderPage` objects, each with the continuation token for the next page.
+        """
+
         blob_service_client = self.get_blob_service_client(
             storage_account_name)
         container_client = blob_service_client.get_container_client(
             container_name)
 
-        blob_names = []
+        is_match = self.__get_blob_name_filter__(regex_filter)
 
-        for blob in container_client.list_blobs():
-            if not regex_filter or re.match(regex_filter, blob.name):
-                blob_names.append(blob.name)
+        pages = container_client.walk_blobs(
+            delimiter="/", results_per_page=folders_per_page).by_page(continuation_token=continuation_token)
 
-        # If there are blob names that don't contain a '/', append the container name to the start of the blob name
-        # Otherwise, return the blob names as is
-        blob_names = list(
-            map(lambda x: f"{container_name}/{x}" if x.find('/') == -1 else x, blob_names))
+        for page in pages:
+            folders: dict[str, list[str]] = {}
 
-        grouped_folders = {}
-        for blob_name in blob_names:
-            folder_name = blob_name.split('/')[0]
-            if folder_name not in grouped_folders:
-                grouped_folders[folder_name] = []
-            grouped_folders[folder_name].append(blob_name)
+            for item in page:
+                if isinstance(item, BlobPrefix):
+                    blob_names = [blob_name for blob_name in container_client.list_blob_names(
+                        name_starts_with=item.name) if is_match(blob_name)]
+                    if blob_names:
+                        folders[item.name.rstrip("/")] = blob_names
+                elif is_match(item.name):
+                    folders.setdefault(container_name, []).append(
+                        f"{container_name}/{item.name}")
 
-        return grouped_folders
+            yield BlobFolderPage(folders, pages.continuation_token)
+
+    def __get_download_options__(self) -> dict:
+        return {
+            "max_single_get_size": self.download_chunk_size,
+            "max_chunk_get_size": self.download_chunk_size
+        }
+
+    def __get_blob_reference__(self, storage_account_name: str, container_name: str, blob_name: str, uri: str, content: bytes, response: dict) -> BlobReference:
+        return BlobReference(storage_account_name, container_name, blob_name, uri,
+                             response["etag"], len(content), hashlib.sha256(content).hexdigest())
+
+    def __remember_container__(self, storage_account_name: str, container_name: str):
+        with AzureStorageClientFactory._lock:
+            AzureStorageClientFactory._known_containers.add(
+                (storage_account_name, container_name))
+
+    def __forget_container__(self, storage_account_name: str, container_name: str):
+        with AzureStorageClientFactory._lock:
+            AzureStorageClientFactory._known_containers.discard(
+                (storage_account_name, container_name))
+
+    def __get_blob_name_filter__(self, regex_filter: str | None) -> Callable[[str], bool]:
+        if not regex_filter:
+            return lambda blob_name: True
+
+        # Push simple extension filters, e.g. .*\.(pdf)$, down to a suffix check
+        suffix_match = suffix_filter_pattern.fullmatch(regex_filter)
+        if suffix_match:
+            extensions = suffix_match.group(1) or suffix_match.group(2)
+            suffixes = tuple(
+                f".{extension}" for extension in extensions.split("|"))
+            return lambda blob_name: blob_name.endswith(suffixes)
+
+        pattern = re.compile(regex_filter)
+        return lambda blob_name: pattern.match(blob_name) is not None
+
+    def __should_spill__(self, size: int) -> bool:
+        return self.download_spill_threshold is not None and size > self.download_spill_threshold
+
+    def __get_session__(self) -> requests.Session:
+        if not AzureStorageClientFactory._session:
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(
+                pool_connections=self.max_connections, pool_maxsize=self.max_connections)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            AzureStorageClientFactory._session = session
+
+        return AzureStorageClientFactory._session
+
+    def __get_async_session__(self) -> aiohttp.ClientSession:
+        if not AzureStorageClientFactory._async_session:
+            AzureStorageClientFactory._async_session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit_per_host=self.max_connections))
+
+        return AzureStorageClientFactory._async_session
 
     def __is_development_storage_account__(self, storage_account_name: str) -> bool:
         return storage_account_name and (storage_account_name.lower() == "devstoreaccount1" or storage_account_name.lower().startswith("usedevelopmentstorage"))
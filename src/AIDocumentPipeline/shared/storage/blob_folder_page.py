@@ -0,0 +1,12 @@
+class BlobFolderPage:
+    """Defines a page of blob names grouped by folder at the root level of a container, returned when listing a container incrementally."""
+
+    def __init__(self, folders: dict[str, list[str]], continuation_token: str | None = None):
+        """Initializes a new instance of the BlobFolderPage class.
+
+        :param folders: The blob names in the page grouped by folder. Blobs in the root of the container are grouped by the container name.
+        :param continuation_token: The token to resume the listing from the next page, or `None` if this is the last page.
+        """
+
+        self.folders = folders
+        self.continuation_token = continuation_token
@@ -0,0 +1,80 @@
+from __future__ import annotations
+import json
+
+
+class BlobReference:
+    """Defines a reference to content stored in Azure Blob Storage, passed between workflow operations in place of the content itself.
+
+    Keeping large content out of activity inputs and outputs keeps it out of the Durable Functions orchestration history.
+    """
+
+    def __init__(self, storage_account_name: str, container_name: str, blob_name: str, uri: str, etag: str, size: int, sha256: str):
+        """Initializes a new instance of the BlobReference class.
+
+        :param storage_account_name: The name of the Azure Storage account.
+        :param container_name: The name of the container within the storage account.
+        :param blob_name: The name of the blob within the container.
+        :param uri: The URI of the blob.
+        :param etag: The ETag of the blob when the content was written.
+        :param size: The size of the content in bytes.
+        :param sha256: The SHA-256 hash of the content as a hex string.
+        """
+
+        self.storage_account_name = storage_account_name
+        self.container_name = container_name
+        self.blob_name = blob_name
+        self.uri = uri
+        self.etag = etag
+        self.size = size
+        self.sha256 = sha256
+
+    def to_dict(self) -> dict:
+        """Returns a dictionary representation of the object."""
+
+        return {
+            "storage_account_name": self.storage_account_name,
+            "container_name": self.container_name,
+            "blob_name": self.blob_name,
+            "uri": self.uri,
+            "etag": self.etag,
+            "size": self.size,
+            "sha256": self.sha256
+        }
+
+    @staticmethod
+    def to_json(obj: BlobReference) -> str:
+        """Converts the object instance to a JSON string. Required for serialization in Azure Functions when passing the result between functions.
+
+        :param obj: The object instance to convert.
+        :return: A JSON string representing the object instance.
+        """
+
+        return json.dumps(obj.to_dict())
+
+    @staticmethod
+    def from_json(json_str: str) -> BlobReference:
+        """Converts a JSON string to the object instance. Required for deserialization in Azure Functions when receiving the result from another function.
+
+        :param json_str: The JSON string to convert.
+        :return: A object instance created from the JSON string.
+        """
+
+        return BlobReference.from_dict(json.loads(json_str))
+
+    @staticmethod
+    def from_dict(obj: dict) -> BlobReference:
+        """Converts a dictionary to an object instance.
+
+        :param obj: The dictionary to convert.
+        :return: A object instance created from the dictionary.
+        """
+
+        return BlobReference(
+            obj["storage_account_name"],
+            obj["container_name"],
+            obj["blob_name"],
+            obj["uri"],
+            obj["etag"],
+            obj["size"],
+            obj["sha256"]
+        )
@@ -0,0 +1,38 @@
+import mmap
+import os
+import weakref
+
+
+def __remove_file__(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class SpilledBlobContent(mmap.mmap):
+    """Defines a read-only memory map over a temporary file holding the content of a blob too large to hold in memory.
+
+    The path of the file is kept, so that tools that read files, such as poppler, can read the content without it being copied again. The file is deleted when the memory map is closed, or when it is garbage collected if it is never closed.
+    """
+
+    path: str
+
+    def __new__(cls, path: str):
+        """Creates a new instance of the SpilledBlobContent class, taking ownership of the file.
+
+        :param path: The path to the temporary file holding the blob content. The file must not be empty.
+        """
+
+        with open(path, "rb") as file:
+            content = super().__new__(cls, file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        content.path = path
+        content._finalizer = weakref.finalize(content, __remove_file__, path)
+        return content
+
+    def close(self):
+        """Closes the memory map and deletes the temporary file."""
+
+        super().close()
+        self._finalizer()
@@ -18,6 +18,10 @@ class WorkflowResult(ValidationResult):
         super().__init__()
         self.name = name
         self.activity_results = []
+        self.processed_count = 0
+        self.skipped_count = 0
+        self.failed_count = 0
+        self.processed_names: list[str] = []
 
     def add_message(self, action: str, message: str):
         """Adds a structured message to the list of messages without changing the `is_valid` flag.
@@ -50,6 +54,9 @@ class WorkflowResult(ValidationResult):
         """
 
         self.activity_results.append(result)
+        self.processed_count += result.processed_count
+        self.skipped_count += result.skipped_count
+        self.failed_count += result.failed_count
         log = f"{self.name}::{action} - {message}"
         logging.info(log)
 
@@ -58,7 +65,11 @@ class WorkflowResult(ValidationResult):
             "name": self.name,
             "activity_results": [r.to_dict() for r in self.activity_results],
             "is_valid": self.is_valid,
-            "messages": self.messages
+            "messages": self.messages,
+            "processed_count": self.processed_count,
+            "skipped_count": self.skipped_count,
+            "failed_count": self.failed_count,
+            "processed_names": self.processed_names
         }
 
     @staticmethod
@@ -94,4 +105,8 @@ class WorkflowResult(ValidationResult):
         result.messages = obj["messages"]
         result.activity_results = [WorkflowResult.from_dict(
             r) for r in obj["activity_results"]]
+        result.processed_count = obj.get("processed_count", 0)
+        result.skipped_count = obj.get("skipped_count", 0)
+        result.failed_count = obj.get("failed_count", 0)
+        result.processed_names = obj.get("processed_names", [])
         return result
@@ -0,0 +1,64 @@
+"""Benchmarks blob download modes against a local Azurite instance.
+
+Uploads synthetic blobs of increasing size to Azurite (started with `docker compose up storage` from the root of the repository), then reports the download time and peak Python heap allocation for single-connection, parallel ranged, and spill-to-disk downloads.
+
+Run from the root of the repository:
+
+    python tests/Benchmarks/blob_download.py
+"""
+
+import mmap
+import os
+import sys
+import time
+import tracemalloc
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(os.path.dirname(root), "src", "AIDocumentPipeline"))
+
+from shared.storage.azure_storage_client_factory import AzureStorageClientFactory  # noqa: E402
+
+storage_account_name = "UseDevelopmentStorage=true"
+container_name = "benchmarks"
+blob_sizes_mb = [1, 16, 64, 256]
+chunk_size = 4 * 1024 * 1024
+
+modes = {
+    "single": AzureStorageClientFactory(None, download_max_concurrency=1, download_chunk_size=chunk_size),
+    "parallel": AzureStorageClientFactory(None, download_max_concurrency=8, download_chunk_size=chunk_size),
+    "parallel+spill": AzureStorageClientFactory(None, download_max_concurrency=8, download_chunk_size=chunk_size, download_spill_threshold=8 * 1024 * 1024)
+}
+
+
+def main():
+    setup_factory = AzureStorageClientFactory(None, download_chunk_size=chunk_size)
+    container_client = setup_factory.get_blob_service_client(
+        storage_account_name).get_container_client(container_name)
+    if not container_client.exists():
+        container_client.create_container()
+
+    print(f"{'size':>8} {'mode':<16} {'seconds':>8} {'peak heap MB':>13}")
+    for size_mb in blob_sizes_mb:
+        blob_name = f"blob-{size_mb}mb.bin"
+        container_client.get_blob_client(blob_name).upload_blob(
+            os.urandom(size_mb * 1024 * 1024), overwrite=True, max_concurrency=8)
+
+        for mode_name, factory in modes.items():
+            tracemalloc.start()
+            start = time.perf_counter()
+            content = factory.get_blob_content(
+                storage_account_name, container_name, blob_name)
+            seconds = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            if isinstance(content, mmap.mmap):
+                content.close()
+
+            print(f"{size_mb:>6}MB {mode_name:<16} {seconds:>8.2f} {peak / (1024 * 1024):>13.1f}")
+
+    container_client.delete_container()
+
+
+if __name__ == "__main__":
+    main()
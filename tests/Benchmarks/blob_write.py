@@ -0,0 +1,72 @@
+"""Counts the Azure Storage requests made per blob write against a local Azurite instance.
+
+Compares the previous write path, which checked that the container exists before every upload, with the optimistic upload of `AzureStorageClientFactory.upload_blob`, which only creates the container when the upload fails because it does not exist. Start Azurite with `docker compose up storage` from the root of the repository.
+
+Run from the root of the repository:
+
+    python tests/Benchmarks/blob_write.py
+"""
+
+import os
+import sys
+import time
+import uuid
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(os.path.dirname(root), "src", "AIDocumentPipeline"))
+
+from shared.storage.azure_storage_client_factory import AzureStorageClientFactory  # noqa: E402
+
+storage_account_name = "UseDevelopmentStorage=true"
+write_count = 100
+content = b"{}" * 512
+
+request_count = 0
+
+
+def count_request(response, *args, **kwargs):
+    global request_count
+    request_count += 1
+
+
+def write_with_exists_check(factory: AzureStorageClientFactory, container_name: str, blob_name: str):
+    container_client = factory.get_blob_service_client(
+        storage_account_name).get_container_client(container_name)
+
+    if not container_client.exists():
+        container_client.create_container()
+
+    container_client.get_blob_client(blob_name).upload_blob(
+        content, overwrite=True)
+
+
+def write_optimistic(factory: AzureStorageClientFactory, container_name: str, blob_name: str):
+    factory.upload_blob(storage_account_name, container_name,
+                        blob_name, content, overwrite=True)
+
+
+def main():
+    global request_count
+
+    factory = AzureStorageClientFactory(None)
+    service_client = factory.get_blob_service_client(storage_account_name)
+    AzureStorageClientFactory._session.hooks["response"].append(count_request)
+
+    print(f"{'mode':<20} {'requests/write':>15} {'ms/write':>10}")
+    for mode_name, write in [("exists check", write_with_exists_check), ("optimistic", write_optimistic)]:
+        container_name = f"benchmarks-{uuid.uuid4().hex[:8]}"
+
+        request_count = 0
+        start = time.perf_counter()
+        for i in range(write_count):
+            write(factory, container_name, f"invoice-{i}.pdf.Data.json")
+        seconds = time.perf_counter() - start
+
+        print(
+            f"{mode_name:<20} {request_count / write_count:>15.2f} {seconds * 1000 / write_count:>10.2f}")
+
+        service_client.delete_container(container_name)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Benchmarks validating extracted invoice data one invoice at a time compared with in bulk.
+
+Builds synthetic invoices with a range of line item counts, then reports the time per invoice to validate them one at a time with `validate`, which records messages, and in bulk with `validate_many`, which evaluates each compiled rule across every invoice before the next, summing the product totals with NumPy when it is installed. The evaluation time of each rule is reported at the end.
+
+Run from the root of the repository:
+
+    python tests/Benchmarks/bulk_validation.py
+"""
+
+import logging
+import os
+import sys
+import time
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(os.path.dirname(root), "src", "AIDocumentPipeline"))
+
+from invoices.activities import validate_invoice_data  # noqa: E402
+from invoices.invoice_data import InvoiceData, InvoiceProduct, InvoiceSignature  # noqa: E402
+from invoices import invoice_totals  # noqa: E402
+
+invoice_count = 20000
+line_item_counts = [1, 10, 50]
+
+
+def get_invoices(line_item_count: int) -> list[InvoiceData]:
+    invoices = []
+    for i in range(invoice_count):
+        products = [InvoiceProduct(f"P{j}", f"Product {j}", 0.1, 1, 0.1, None)
+                    for j in range(line_item_count)]
+        invoices.append(InvoiceData(
+            f"INV-{i}", f"PO-{i}", "Contoso", "1 Main Street", "2024-01-01", "2024-01-31",
+            products, [], line_item_count, round(0.1 * line_item_count, 2) + (0.5 if i % 10 == 0 else 0),
+            [InvoiceSignature("Driver", "John Doe", True), InvoiceSignature("Customer", "Jane Doe", True)], []))
+    return invoices
+
+
+def main():
+    # Failed checks are logged as errors when validating one invoice at a time
+    logging.disable(logging.CRITICAL)
+
+    print(f"numpy: {'yes' if invoice_totals.numpy is not None else 'no'}")
+    print(f"{'items':>6} {'single us':>10} {'bulk us':>9} {'invalid':>8}")
+    for line_item_count in line_item_counts:
+        invoices = get_invoices(line_item_count)
+
+        start = time.perf_counter()
+        for data in invoices:
+            validate_invoice_data.validate(
+                data, validate_invoice_data.Result(data.invoice_number))
+        single_us = (time.perf_counter() - start) / invoice_count * 1e6
+
+        start = time.perf_counter()
+        statuses = validate_invoice_data.validate_many(invoices)
+        bulk_us = (time.perf_counter() - start) / invoice_count * 1e6
+
+        invalid_count = sum(
+            1 for s in statuses if s != validate_invoice_data.ResultStatus.Success)
+        print(f"{line_item_count:>6} {single_us:>10.1f} {bulk_us:>9.1f} {invalid_count:>8}")
+
+    print()
+    print(f"{'rule':<80} {'evaluations':>11} {'failures':>8} {'ms':>8}")
+    for rule_name, metrics in validate_invoice_data.rule_set.get_metrics().items():
+        print(f"{rule_name:<80} {metrics['evaluations']:>11} {metrics['failures']:>8} {metrics['seconds'] * 1000:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
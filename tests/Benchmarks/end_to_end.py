@@ -0,0 +1,441 @@
+"""Benchmarks the end-to-end throughput of the invoice batch pipeline against local stand-ins for Azure Storage and Azure OpenAI.
+
+For each batch size, uploads a synthetic batch of invoices, copied from the sample invoices in `tests/InvoiceBatch`, to Azurite (started with `docker compose up storage` from the root of the repository), then runs `ProcessInvoiceBatchWorkflow`, its `ExtractInvoiceDataWorkflow` sub-orchestrations, and their activities against it, with the fake Azure OpenAI server in `tests/Fakes` answering the chat completions with a configurable latency and rate of 429 responses.
+
+The orchestrations are driven in-process by a minimal local stand-in for the Durable Functions runtime, which runs activities on a thread pool, and async activities on a single event loop, as the Python worker does. Activity inputs and outputs are round-tripped through their JSON serialization as they would be by the runtime, but the scheduling and replay overhead of the Durable Task Framework is not included.
+
+Each batch is run in a fresh process, so that its peak RSS is not affected by the previous batches. Reports the invoices per second, the p50, p95, and p99 duration of each activity and orchestration, and the peak RSS of each batch. Rendering the invoice pages requires poppler-utils, as in the Function App.
+
+Settings of the Function App, such as `INVOICES_FUSED_ACTIVITY` or `OPENAI_MAX_CONCURRENT_REQUESTS`, can be set as environment variables to compare their throughput.
+
+Run from the root of the repository:
+
+    python tests/Benchmarks/end_to_end.py --batch-sizes 10,100,1000 --latency 2 --latency-jitter 0.5 --throttle-rate 0.05
+"""
+
+import argparse
+import asyncio
+import concurrent.futures
+import glob
+import inspect
+import json
+import logging
+import math
+import os
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+import uuid
+from datetime import datetime, timezone
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(os.path.dirname(root), "src", "AIDocumentPipeline"))
+
+os.environ.setdefault("INVOICES_STORAGE_ACCOUNT_NAME", "devstoreaccount1")
+os.environ.setdefault("OPENAI_ENDPOINT", "http://127.0.0.1:8100")
+os.environ.setdefault("OPENAI_COMPLETION_DEPLOYMENT", "gpt-4o")
+
+from azure.core.credentials import AccessToken  # noqa: E402
+import shared.identity as identity  # noqa: E402
+
+
+class StaticTokenCredential:
+    """A credential that returns the same token for every scope, as the fake Azure OpenAI server does not validate it."""
+
+    def get_token(self, *scopes, **kwargs) -> AccessToken:
+        return AccessToken("benchmark", int(time.time()) + 3600)
+
+
+class AsyncStaticTokenCredential:
+    """The async equivalent of `StaticTokenCredential`, for the async Azure OpenAI clients."""
+
+    async def get_token(self, *scopes, **kwargs) -> AccessToken:
+        return AccessToken("benchmark", int(time.time()) + 3600)
+
+    async def close(self):
+        pass
+
+
+# Replaced before the activities are imported, as they create their clients with the default credentials at import
+identity.default_credential = StaticTokenCredential()
+identity.default_async_credential = AsyncStaticTokenCredential()
+
+from invoices import extract_invoice_data_workflow, process_invoice_batch_workflow  # noqa: E402
+from invoices.activities import export_invoice_batch, extract_invoice_data, get_invoice_batch_status, get_invoice_folder_page, get_invoice_folders, get_invoices_to_process, merge_invoice_batch_export, process_invoice, store_invoice_batch_results, store_workflow_result, submit_invoice_batch, validate_invoice_data  # noqa: E402
+from invoices.invoice_batch_request import InvoiceBatchRequest  # noqa: E402
+from shared.storage.azure_storage_client_factory import AzureStorageClientFactory  # noqa: E402
+from shared import config as app_config  # noqa: E402
+
+invoice_batch_path = os.path.join(root, "InvoiceBatch")
+fake_openai_server_path = os.path.join(root, "Fakes", "fake_openai_server.py")
+
+activity_modules = [export_invoice_batch, extract_invoice_data, get_invoice_batch_status, get_invoice_folder_page, get_invoice_folders,
+                    get_invoices_to_process, merge_invoice_batch_export, process_invoice, store_invoice_batch_results, store_workflow_result, submit_invoice_batch, validate_invoice_data]
+orchestrator_modules = [extract_invoice_data_workflow,
+                        process_invoice_batch_workflow]
+
+
+class LocalTask:
+    """A scheduled activity, sub-orchestration, or timer, completed by a future."""
+
+    def __init__(self, future: concurrent.futures.Future):
+        self.future = future
+
+    @property
+    def result(self):
+        # As in Durable Functions, a failed task completes with its exception, which is only raised when the task is yielded on its own or in `task_all`
+        return self.future.exception() or self.future.result()
+
+    def get_result(self):
+        return self.future.result()
+
+
+class LocalTaskSet:
+    """A set of tasks awaited together, either all of them or the first to complete."""
+
+    def __init__(self, tasks: list[LocalTask], wait_any: bool):
+        self.tasks = list(tasks)
+        self.wait_any = wait_any
+
+
+class LocalOrchestrationContext:
+    """A stand-in for `DurableOrchestrationContext` that schedules work on a `LocalOrchestrationRuntime`."""
+
+    def __init__(self, runtime, input, instance_id: str):
+        self.runtime = runtime
+        self.input = input
+        self.instance_id = instance_id
+        self.will_continue_as_new = False
+        self.continue_as_new_input = None
+
+    @property
+    def current_utc_datetime(self) -> datetime:
+        return datetime.now(timezone.utc)
+
+    def get_input(self):
+        return self.input
+
+    def call_activity(self, name: str, input=None) -> LocalTask:
+        return LocalTask(self.runtime.start_activity(name, input))
+
+    def call_sub_orchestrator(self, name: str, input=None) -> LocalTask:
+        return LocalTask(self.runtime.start_orchestration(name, input))
+
+    def task_all(self, tasks: list[LocalTask]) -> LocalTaskSet:
+        return LocalTaskSet(tasks, wait_any=False)
+
+    def task_any(self, tasks: list[LocalTask]) -> LocalTaskSet:
+        return LocalTaskSet(tasks, wait_any=True)
+
+    def create_timer(self, fire_at: datetime) -> LocalTask:
+        future = concurrent.futures.Future()
+        timer = threading.Timer(max((fire_at - self.current_utc_datetime).total_seconds(), 0),
+                                future.set_result, (None,))
+        timer.daemon = True
+        timer.start()
+        return LocalTask(future)
+
+    def continue_as_new(self, input):
+        self.will_continue_as_new = True
+        self.continue_as_new_input = input
+
+
+class LocalOrchestrationRuntime:
+    """Runs orchestrations and their activities in-process, recording the duration of each."""
+
+    def __init__(self, activity_workers: int):
+        self.activities = {module.name: module.run._function._func
+                           for module in activity_modules}
+        self.orchestrators = {module.name: __get_orchestrator_function__(module)
+                              for module in orchestrator_modules}
+        self.durations: dict[str, list[float]] = {}
+
+        self._lock = threading.Lock()
+        self._activity_executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=activity_workers)
+        # Sub-orchestrations block a thread while waiting for their activities, and at most this many are in flight
+        self._orchestration_executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max(app_config.invoices_max_parallel_folders, 1))
+        self._loop = asyncio.new_event_loop()
+        threading.Thread(target=self._loop.run_forever, daemon=True).start()
+
+    def run_orchestration(self, name: str, input):
+        """Runs an orchestration to completion, including any generations it continues as new, and returns its output."""
+
+        start_time = time.perf_counter()
+        try:
+            instance_id = uuid.uuid4().hex
+            while True:
+                context = LocalOrchestrationContext(
+                    self, __round_trip__(input), instance_id)
+                output = self.orchestrators[name](context)
+                if inspect.isgenerator(output):
+                    output = self.__drive__(output)
+
+                if not context.will_continue_as_new:
+                    return output
+
+                input = context.continue_as_new_input
+        finally:
+            self.__record__(name, time.perf_counter() - start_time)
+
+    def start_orchestration(self, name: str, input) -> concurrent.futures.Future:
+        return self._orchestration_executor.submit(self.run_orchestration, name, input)
+
+    def start_activity(self, name: str, input) -> concurrent.futures.Future:
+        function = self.activities[name]
+        input = __round_trip__(input)
+
+        if inspect.iscoroutinefunction(function):
+            async def run_async():
+                start_time = time.perf_counter()
+                try:
+                    return __round_trip__(await function(input))
+                finally:
+                    self.__record__(name, time.perf_counter() - start_time)
+
+            return asyncio.run_coroutine_threadsafe(run_async(), self._loop)
+
+        def run():
+            start_time = time.perf_counter()
+            try:
+                return __round_trip__(function(input))
+            finally:
+                self.__record__(name, time.perf_counter() - start_time)
+
+        return self._activity_executor.submit(run)
+
+    def close(self):
+        self._orchestration_executor.shutdown()
+        self._activity_executor.shutdown()
+        # The async clients are closed on the loop they were used on, before it stops
+        asyncio.run_coroutine_threadsafe(extract_invoice_data.document_extractor.client_pool.close(), self._loop).result()
+        asyncio.run_coroutine_threadsafe(AzureStorageClientFactory.close_async(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        AzureStorageClientFactory.close()
+
+    def __drive__(self, orchestration):
+        # Failed tasks are raised in the orchestration at the yield that awaits them, as in Durable Functions
+        value, error = None, None
+        while True:
+            try:
+                task = orchestration.throw(
+                    error) if error else orchestration.send(value)
+            except StopIteration as stop:
+                return stop.value
+
+            value, error = None, None
+            try:
+                value = self.__wait__(task)
+            except Exception as e:
+                error = e
+
+    def __wait__(self, task: LocalTask | LocalTaskSet):
+        if isinstance(task, LocalTask):
+            return task.get_result()
+
+        if not task.wait_any:
+            return [t.get_result() for t in task.tasks]
+
+        concurrent.futures.wait(
+            [t.future for t in task.tasks], return_when=concurrent.futures.FIRST_COMPLETED)
+        return next(t for t in task.tasks if t.future.done())
+
+    def __record__(self, name: str, duration_seconds: float):
+        with self._lock:
+            self.durations.setdefault(name, []).append(duration_seconds)
+
+
+def __get_orchestrator_function__(module):
+    # The blueprint wraps the generator function in a handle that replays it from the Durable Functions history
+    handle = module.run._function._func
+    return next(cell.cell_contents for cell in handle.__closure__ or ()
+                if inspect.isgeneratorfunction(cell.cell_contents))
+
+
+def __round_trip__(value):
+    if isinstance(value, list):
+        return [__round_trip__(v) for v in value]
+
+    value_type = type(value)
+    if hasattr(value_type, "to_json") and hasattr(value_type, "from_json"):
+        return value_type.from_json(value_type.to_json(value))
+
+    return value
+
+
+def __percentile__(sorted_values: list[float], percentile: float) -> float:
+    return sorted_values[max(math.ceil(percentile / 100 * len(sorted_values)) - 1, 0)]
+
+
+def __get_peak_rss_mb__() -> float | None:
+    if resource is None:
+        return None
+
+    # The maximum resident set size is reported in bytes on macOS, and in kilobytes elsewhere
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss / (1024 * 1024) if sys.platform == "darwin" else max_rss / 1024
+
+
+def upload_batch(container_name: str, invoice_count: int, invoices_per_folder: int):
+    """Uploads a synthetic batch of invoices to Azurite, cycling through the sample invoices, with a fixed number of invoices per folder."""
+
+    sources = []
+    for path in sorted(glob.glob(os.path.join(invoice_batch_path, "*", "*.pdf"))):
+        with open(path, "rb") as file:
+            sources.append((os.path.basename(path), file.read()))
+
+    container_client = AzureStorageClientFactory(None).get_blob_service_client(
+        app_config.invoices_storage_account_name).get_container_client(container_name)
+    container_client.create_container()
+
+    def upload(i: int):
+        file_name, content = sources[i % len(sources)]
+        container_client.get_blob_client(f"folder-{i // invoices_per_folder:05d}/{i:06d}-{file_name}").upload_blob(
+            content, overwrite=True)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=16) as executor:
+        list(executor.map(upload, range(invoice_count)))
+
+
+def run_batch(args) -> dict:
+    """Uploads and processes a single batch, and returns its throughput, stage durations, and peak RSS."""
+
+    container_name = f"benchmark-{args.run_batch}-{uuid.uuid4().hex[:8]}"
+    upload_batch(container_name, args.run_batch, args.invoices_per_folder)
+
+    runtime = LocalOrchestrationRuntime(args.activity_workers)
+    try:
+        start_time = time.perf_counter()
+        output = runtime.run_orchestration(process_invoice_batch_workflow.name, InvoiceBatchRequest(container_name, force=True))
+        seconds = time.perf_counter() - start_time
+    finally:
+        runtime.close()
+        if not args.keep_containers:
+            AzureStorageClientFactory(None).get_blob_service_client(
+                app_config.invoices_storage_account_name).delete_container(container_name)
+
+    output = output or {}
+    stages = {}
+    for stage, durations in runtime.durations.items():
+        durations = sorted(durations)
+        stages[stage] = {
+            "count": len(durations),
+            "p50_ms": __percentile__(durations, 50) * 1000,
+            "p95_ms": __percentile__(durations, 95) * 1000,
+            "p99_ms": __percentile__(durations, 99) * 1000
+        }
+
+    return {
+        "invoices": args.run_batch,
+        "processed": output.get("processed_count", 0),
+        "failed": output.get("failed_count", 0),
+        "seconds": seconds,
+        "invoices_per_second": output.get("processed_count", 0) / seconds if seconds else 0.0,
+        "peak_rss_mb": __get_peak_rss_mb__(),
+        "stages": stages
+    }
+
+
+def start_fake_openai_server(args) -> subprocess.Popen:
+    command = [sys.executable, fake_openai_server_path, "--port", str(args.port), "--latency", str(args.latency),
+               "--latency-jitter", str(args.latency_jitter), "--throttle-rate", str(args.throttle_rate), "--retry-after", str(args.retry_after)]
+    if args.responses:
+        command += ["--responses", args.responses]
+
+    server = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+
+    # Wait for the server to accept requests before starting the first batch
+    for _ in range(50):
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{args.port}/stats", timeout=1).read()
+            return server
+        except OSError:
+            time.sleep(0.1)
+
+    server.terminate()
+    raise RuntimeError(f"The fake Azure OpenAI server did not start on port {args.port}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch-sizes", default="10,100",
+                        help="Comma-separated numbers of invoices in each batch.")
+    parser.add_argument("--invoices-per-folder", type=int, default=10)
+    parser.add_argument("--activity-workers", type=int, default=(os.cpu_count() or 1) + 4,
+                        help="Threads running synchronous activities. Default is the Python worker default.")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency", type=float, default=1.0,
+                        help="Seconds before each chat completion response.")
+    parser.add_argument("--latency-jitter", type=float, default=0.25)
+    parser.add_argument("--throttle-rate", type=float, default=0.0,
+                        help="Fraction of chat completions rejected with a 429 response.")
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--responses", default=None,
+                        help="Path to a JSON file of invoices to return instead of the canned invoice.")
+    parser.add_argument("--keep-containers", action="store_true",
+                        help="Keep the batch containers and outputs in Azurite after each run.")
+    parser.add_argument("--verbose", action="store_true")
+    parser.add_argument("--run-batch", type=int, default=None,
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+
+    if args.run_batch is not None:
+        print(json.dumps(run_batch(args)))
+        return
+
+    server = start_fake_openai_server(args)
+    try:
+        env = {**os.environ, "OPENAI_ENDPOINT": f"http://127.0.0.1:{args.port}"}
+        forwarded_args = __without_batch_sizes__(sys.argv[1:])
+
+        print(f"{'invoices':>8} {'processed':>9} {'failed':>6} {'seconds':>8} {'inv/s':>7} {'peak RSS MB':>11}")
+        reports = []
+        for batch_size in [int(s) for s in args.batch_sizes.split(",")]:
+            completed = subprocess.run([sys.executable, os.path.abspath(__file__), *forwarded_args, "--run-batch", str(batch_size)],
+                                       env=env, stdout=subprocess.PIPE, text=True, check=True)
+            report = json.loads(completed.stdout.strip().splitlines()[-1])
+            reports.append(report)
+
+            peak_rss = f"{report['peak_rss_mb']:.1f}" if report["peak_rss_mb"] is not None else "n/a"
+            print(f"{report['invoices']:>8} {report['processed']:>9} {report['failed']:>6} {report['seconds']:>8.2f} {report['invoices_per_second']:>7.2f} {peak_rss:>11}")
+
+        for report in reports:
+            print()
+            print(f"{report['invoices']} invoices")
+            print(f"  {'stage':<32} {'count':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+            for stage, stats in sorted(report["stages"].items()):
+                print(f"  {stage:<32} {stats['count']:>6} {stats['p50_ms']:>9.1f} {stats['p95_ms']:>9.1f} {stats['p99_ms']:>9.1f}")
+
+        print()
+        print(f"Fake Azure OpenAI: {json.loads(urllib.request.urlopen(f'http://127.0.0.1:{args.port}/stats').read())}")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def __without_batch_sizes__(args: list[str]) -> list[str]:
+    # Each batch process is given its own batch size, so the option is dropped along with any separate value
+    result = []
+    skip_next = False
+    for arg in args:
+        if skip_next:
+            skip_next = False
+        elif arg == "--batch-sizes":
+            skip_next = True
+        elif not arg.startswith("--batch-sizes="):
+            result.append(arg)
+    return result
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Benchmarks the built-in document image profiles against the sample invoices.
+
+Reports, for each profile, the decoded image bytes per page and the characters per page of the base64 data URIs sent in the request. If the `OPENAI_ENDPOINT` and `OPENAI_COMPLETION_DEPLOYMENT` environment variables are set, the invoices are also extracted with each profile and the agreement is reported as the fraction of fields that match the extraction from the `lossless` profile. The sample invoices have no expected values, so the agreement measures the change from the `lossless` profile rather than accuracy.
+
+Run from the root of the repository with poppler-utils installed:
+
+    python tests/Benchmarks/image_profiles.py
+"""
+
+import base64
+import os
+import sys
+import time
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(os.path.dirname(root), "src", "AIDocumentPipeline"))
+
+from shared.documents.document_data_extractor import DocumentDataExtractor, DocumentDataExtractorOptions  # noqa: E402
+from shared.documents.document_image_profile import DocumentImageProfile  # noqa: E402
+from shared.documents.extraction_schema import ExtractionSchema  # noqa: E402
+from invoices.invoice_data import InvoiceData  # noqa: E402
+import shared.identity as identity  # noqa: E402
+from shared import config as app_config  # noqa: E402
+
+extraction_prompt = ExtractionSchema("invoice_data", InvoiceData.json_schema(
+), "Extract the data from this invoice. If a value is not present, provide null.").get_prompt()
+
+
+def get_sample_documents() -> dict[str, bytes]:
+    documents = {}
+    batch_folder = os.path.join(root, "InvoiceBatch")
+    for folder_name in sorted(os.listdir(batch_folder)):
+        for file_name in sorted(os.listdir(os.path.join(batch_folder, folder_name))):
+            if file_name.endswith(".pdf"):
+                with open(os.path.join(batch_folder, folder_name, file_name), "rb") as file:
+                    documents[f"{folder_name}/{file_name}"] = file.read()
+    return documents
+
+
+def flatten(value, prefix: str = "") -> dict:
+    if isinstance(value, dict):
+        return {k: v for key, item in value.items() for k, v in flatten(item, f"{prefix}{key}.").items()}
+    if isinstance(value, list):
+        return {k: v for i, item in enumerate(value) for k, v in flatten(item, f"{prefix}{i}.").items()}
+    return {prefix.rstrip("."): value}
+
+
+def get_agreement(baseline: dict, actual: dict) -> float:
+    baseline_fields = flatten(baseline)
+    actual_fields = flatten(actual)
+    matches = sum(1 for key, value in baseline_fields.items()
+                  if actual_fields.get(key) == value)
+    return matches / max(len(baseline_fields), 1)
+
+
+def main():
+    documents = get_sample_documents()
+    extractor = DocumentDataExtractor(identity.default_credential)
+    extract = app_config.openai_endpoint and app_config.openai_completion_deployment
+    baseline = {}
+
+    print(f"{'profile':<12} {'pages':>6} {'image bytes/page':>17} {'uri chars/page':>15} {'render s':>9} {'agreement':>10}")
+    for profile in DocumentImageProfile.builtin():
+        pages = 0
+        image_bytes = 0
+        uri_chars = 0
+        start = time.perf_counter()
+        for document_bytes in documents.values():
+            for image_uri in extractor.__get_document_image_uris__(document_bytes, profile):
+                pages += 1
+                image_bytes += len(base64.b64decode(image_uri.split(",", 1)[1]))
+                uri_chars += len(image_uri)
+        render_seconds = time.perf_counter() - start
+
+        agreement = "n/a"
+        if extract:
+            scores = []
+            for document_name, document_bytes in documents.items():
+                data = extractor.from_bytes(document_bytes, DocumentDataExtractorOptions(
+                    system_prompt="You are an AI assistant that extracts data from documents and returns them as structured JSON objects. Do not return as a code block.",
+                    extraction_prompt=extraction_prompt,
+                    endpoint=app_config.openai_endpoint,
+                    deployment_name=app_config.openai_completion_deployment,
+                    image_profile=profile))
+                baseline.setdefault(document_name, data)
+                scores.append(get_agreement(baseline[document_name], data))
+            agreement = f"{sum(scores) / len(scores):.1%}"
+
+        print(f"{profile.name:<12} {pages:>6} {image_bytes // max(pages, 1):>17} {uri_chars // max(pages, 1):>15} {render_seconds:>9.2f} {agreement:>10}")
+
+    extractor.close()
+
+
+if __name__ == "__main__":
+    main()
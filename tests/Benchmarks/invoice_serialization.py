@@ -0,0 +1,87 @@
+"""Benchmarks the serialization cost of the invoice data models per invoice.
+
+Builds synthetic invoices with a range of line item counts, then reports the time to serialize and deserialize each invoice with the generated codec using the standard library `json` backend and, if installed, the `orjson` backend, along with the memory used per line item by the slotted model compared with an equivalent class with a per-instance `__dict__`.
+
+Run from the root of the repository:
+
+    python tests/Benchmarks/invoice_serialization.py
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(os.path.dirname(root), "src", "AIDocumentPipeline"))
+
+from invoices.invoice_data import InvoiceData, InvoiceProduct, InvoiceSignature  # noqa: E402
+from shared import json_codec  # noqa: E402
+
+line_item_counts = [1, 10, 100, 1000]
+iterations = 2000
+
+
+class DictInvoiceProduct:
+    def __init__(self, id, description, unit_price, quantity, total, reason):
+        self.id = id
+        self.description = description
+        self.unit_price = unit_price
+        self.quantity = quantity
+        self.total = total
+        self.reason = reason
+
+
+def get_invoice(line_item_count: int) -> InvoiceData:
+    products = [InvoiceProduct(f"P{i}", f"Product {i}", 1.25, 2, 2.5, None)
+                for i in range(line_item_count)]
+
+    return InvoiceData(
+        "INV-0001", "PO-0001", "Contoso", "1 Main Street, Redmond, WA 98052", "2024-01-01", "2024-01-31",
+        products, [], sum(p.quantity for p in products), sum(p.total for p in products),
+        [InvoiceSignature("Driver", "John Doe", True), InvoiceSignature("Customer", "Jane Doe", True)], [])
+
+
+def time_per_invoice(fn, count: int) -> float:
+    start = time.perf_counter()
+    for _ in range(count):
+        fn()
+    return (time.perf_counter() - start) / count * 1e6
+
+
+def get_bytes_per_item(create) -> float:
+    count = 10000
+    tracemalloc.start()
+    items = [create(i) for i in range(count)]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del items
+    return size / count
+
+
+def main():
+    orjson = json_codec.orjson
+    backends = [("json", None)] + ([("orjson", orjson)] if orjson else [])
+
+    print(f"{'backend':<8} {'items':>6} {'to_json us':>11} {'from_json us':>13} {'bytes':>9}")
+    for backend_name, backend in backends:
+        json_codec.orjson = backend
+        for line_item_count in line_item_counts:
+            invoice = get_invoice(line_item_count)
+            json_str = InvoiceData.to_json(invoice)
+            count = max(iterations // line_item_count, 10)
+
+            to_json_us = time_per_invoice(lambda: InvoiceData.to_json(invoice), count)
+            from_json_us = time_per_invoice(lambda: InvoiceData.from_json(json_str), count)
+
+            print(f"{backend_name:<8} {line_item_count:>6} {to_json_us:>11.1f} {from_json_us:>13.1f} {len(json_str):>9}")
+
+    json_codec.orjson = orjson
+
+    slotted = get_bytes_per_item(lambda i: InvoiceProduct(f"P{i}", "Product", 1.25, 2, 2.5, None))
+    with_dict = get_bytes_per_item(lambda i: DictInvoiceProduct(f"P{i}", "Product", 1.25, 2, 2.5, None))
+    print(f"\nbytes per line item: slotted {slotted:.0f}, __dict__ {with_dict:.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Benchmarks multi-core rasterization of multi-page documents.
+
+Builds synthetic multi-page PDFs from the first page of a sample invoice in `tests/InvoiceBatch`, then reports the time to render and encode them for a range of page counts and rasterization worker counts.
+
+Run from the root of the repository with poppler-utils installed:
+
+    python tests/Benchmarks/rasterization.py
+"""
+
+import io
+import os
+import sys
+import time
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(os.path.dirname(root), "src", "AIDocumentPipeline"))
+
+from pdf2image import convert_from_path  # noqa: E402
+from shared.documents.document_data_extractor import BaseDocumentDataExtractor  # noqa: E402
+from shared.documents.document_image_profile import DocumentImageProfile  # noqa: E402
+
+page_counts = [1, 4, 16, 64]
+worker_counts = sorted({1, 2, 4, os.cpu_count() or 1})
+
+
+def get_document(page_count: int) -> bytes:
+    sample_path = os.path.join(root, "InvoiceBatch", "ANEngineers", "2024-02-02.pdf")
+    page = convert_from_path(sample_path, first_page=1, last_page=1)[0]
+
+    byteIO = io.BytesIO()
+    page.save(byteIO, format="PDF", save_all=True,
+              append_images=[page] * (page_count - 1))
+    return byteIO.getvalue()
+
+
+def main():
+    profiles = [DocumentImageProfile.lossless(), DocumentImageProfile.balanced()]
+
+    print(f"{'profile':<10} {'pages':>6} " +
+          " ".join(f"{f'{w} workers':>10}" for w in worker_counts))
+    for profile in profiles:
+        for page_count in page_counts:
+            document_bytes = get_document(page_count)
+            timings = []
+            for workers in worker_counts:
+                extractor = BaseDocumentDataExtractor(None, workers)
+                # Warm up the process pool so that its start-up cost is not measured
+                extractor.__get_document_image_uris__(document_bytes, profile)
+
+                start = time.perf_counter()
+                extractor.__get_document_image_uris__(document_bytes, profile)
+                timings.append(time.perf_counter() - start)
+                extractor.__close_rasterization_pool__()
+
+            print(f"{profile.name:<10} {page_count:>6} " +
+                  " ".join(f"{t:>9.2f}s" for t in timings))
+
+
+if __name__ == "__main__":
+    main()
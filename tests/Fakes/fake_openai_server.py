@@ -0,0 +1,262 @@
+"""A local fake of the Azure OpenAI chat completions, files, and batches APIs for exercising the pipeline without real Azure OpenAI calls.
+
+Chat completions are answered with a canned invoice extraction response after a configurable latency, and a configurable fraction of them are throttled with a 429 response and a retry-after, as a deployment at its quota would. Canned responses can be replaced with the invoices in a JSON file, which are returned in turn.
+
+Batch input files and batch jobs are accepted, and each batch job completes after a configurable delay with a canned response for every request in its input file, in no particular order, unless it is cancelled first. To exercise the invoice batch job mode, set `INVOICES_BATCH_JOB` to `true` and `INVOICES_BATCH_POLL_INTERVAL_SECONDS` to a few seconds.
+
+Point `OPENAI_ENDPOINT` at the server. Authorization headers are not validated. Request counts are returned by `GET /stats`.
+
+Run from the root of the repository:
+
+    python tests/Fakes/fake_openai_server.py --port 8100 --latency 2 --latency-jitter 0.5 --throttle-rate 0.05 --batch-delay 10
+"""
+
+import argparse
+import itertools
+import json
+import random
+import threading
+import time
+import uuid
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+canned_invoice = {
+    "invoice_number": "INV-0001",
+    "purchase_order_number": "PO-0001",
+    "customer_name": "Contoso",
+    "customer_address": "1 Main Street, Redmond, WA 98052",
+    "delivery_date": "2024-01-01T00:00:00",
+    "payable_by": "2024-01-31T00:00:00",
+    "products": [{"id": "P1", "description": "Widget", "unit_price": 10.0, "quantity": 2, "total": 20.0, "reason": None}],
+    "returns": [],
+    "total_quantity": 2,
+    "total_price": 20.0,
+    "products_signatures": [{"type": "Driver", "name": "John Doe", "is_signed": True}, {"type": "Customer", "name": "Jane Doe", "is_signed": True}],
+    "returns_signatures": []
+}
+
+
+class FakeOpenAIState:
+    """Holds the uploaded files, batch jobs, canned responses, and request counts of the fake server."""
+
+    def __init__(self, batch_delay: float, latency: float = 0.0, latency_jitter: float = 0.0, throttle_rate: float = 0.0, retry_after: float = 1.0, responses: list[dict] | None = None):
+        self.batch_delay = batch_delay
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.files: dict[str, bytes] = {}
+        self.batches: dict[str, dict] = {}
+        self.lock = threading.Lock()
+        self._responses = itertools.cycle(responses or [canned_invoice])
+        self.stats = {"chat_completions": 0, "throttled": 0, "batches": 0}
+
+    def get_response_content(self) -> dict:
+        with self.lock:
+            return next(self._responses)
+
+    def get_latency(self) -> float:
+        return max(self.latency + random.uniform(-self.latency_jitter, self.latency_jitter), 0.0)
+
+    def should_throttle(self) -> bool:
+        throttled = random.random() < self.throttle_rate
+        with self.lock:
+            self.stats["chat_completions"] += 1
+            if throttled:
+                self.stats["throttled"] += 1
+        return throttled
+
+    def get_stats(self) -> dict:
+        with self.lock:
+            return dict(self.stats)
+
+    def create_file(self, content: bytes, filename: str, purpose: str) -> dict:
+        file_id = f"file-{uuid.uuid4().hex}"
+        with self.lock:
+            self.files[file_id] = content
+
+        return {"id": file_id, "object": "file", "bytes": len(content), "created_at": int(time.time()),
+                "filename": filename, "purpose": purpose, "status": "processed"}
+
+    def create_batch(self, input_file_id: str, endpoint: str, completion_window: str) -> dict:
+        batch = {"id": f"batch_{uuid.uuid4().hex}", "object": "batch", "endpoint": endpoint, "input_file_id": input_file_id,
+                 "completion_window": completion_window, "status": "validating", "created_at": int(time.time()),
+                 "output_file_id": None, "error_file_id": None}
+        with self.lock:
+            self.batches[batch["id"]] = batch
+            self.stats["batches"] += 1
+
+        return batch
+
+    def get_batch(self, batch_id: str) -> dict | None:
+        with self.lock:
+            batch = self.batches.get(batch_id)
+            if not batch or batch["status"] in ["completed", "cancelled"]:
+                return batch
+
+            if time.time() - batch["created_at"] < self.batch_delay:
+                batch["status"] = "in_progress"
+                return batch
+
+            batch["output_file_id"] = self.__complete_batch__(batch)
+            batch["status"] = "completed"
+            return batch
+
+    def cancel_batch(self, batch_id: str) -> dict | None:
+        with self.lock:
+            batch = self.batches.get(batch_id)
+            if batch and batch["status"] != "completed":
+                batch["status"] = "cancelled"
+            return batch
+
+    def __complete_batch__(self, batch: dict) -> str:
+        output_lines = []
+        for line in self.files[batch["input_file_id"]].decode("utf-8").splitlines():
+            if not line.strip():
+                continue
+
+            request = json.loads(line)
+            output_lines.append(json.dumps({
+                "id": f"response-{uuid.uuid4().hex}",
+                "custom_id": request["custom_id"],
+                "response": {"status_code": 200, "body": get_chat_completion(request["body"].get("model"), next(self._responses))},
+                "error": None
+            }))
+
+        # As in Azure OpenAI, the output file is not in the order of the input file, so results must be matched by their custom ID
+        random.shuffle(output_lines)
+
+        output_file_id = f"file-{uuid.uuid4().hex}"
+        self.files[output_file_id] = "\n".join(output_lines).encode("utf-8")
+        return output_file_id
+
+
+def get_chat_completion(model: str | None, content: dict | None = None) -> dict:
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model or "gpt-4o",
+        "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": json.dumps(content or canned_invoice)}}],
+        "usage": {"prompt_tokens": 1000, "completion_tokens": 200, "total_tokens": 1200}
+    }
+
+
+def create_handler(state: FakeOpenAIState):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            path = self.path.split("?")[0].rstrip("/")
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+            if path.startswith("/openai/deployments/") and path.endswith("/chat/completions"):
+                self.__send_chat_completion__(json.loads(body))
+            elif path == "/openai/files":
+                message = BytesParser(policy=HTTP).parsebytes(
+                    f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode("utf-8") + body)
+                fields = {part.get_param("name", header="content-disposition"): part for part in message.iter_parts()}
+                file_part = fields["file"]
+                self.__send_json__(200, state.create_file(file_part.get_payload(decode=True), file_part.get_filename(),
+                                                          fields["purpose"].get_content().strip()))
+            elif path == "/openai/batches":
+                request = json.loads(body)
+                self.__send_json__(200, state.create_batch(request["input_file_id"], request["endpoint"],
+                                                           request["completion_window"]))
+            elif path.startswith("/openai/batches/") and path.endswith("/cancel"):
+                batch = state.cancel_batch(path.split("/")[3])
+                if batch:
+                    self.__send_json__(200, batch)
+                else:
+                    self.__send_json__(404, {"error": {"code": "NotFound", "message": path}})
+            else:
+                self.__send_json__(404, {"error": {"code": "NotFound", "message": path}})
+
+        def do_GET(self):
+            path = self.path.split("?")[0].rstrip("/")
+            parts = path.split("/")
+
+            if path == "/stats":
+                self.__send_json__(200, state.get_stats())
+                return
+            elif len(parts) == 4 and parts[2] == "batches":
+                batch = state.get_batch(parts[3])
+                if batch:
+                    self.__send_json__(200, batch)
+                    return
+            elif len(parts) == 5 and parts[2] == "files" and parts[4] == "content":
+                content = state.files.get(parts[3])
+                if content is not None:
+                    self.__send__(200, content, "application/octet-stream")
+                    return
+
+            self.__send_json__(404, {"error": {"code": "NotFound", "message": path}})
+
+        def log_message(self, format, *args):
+            pass
+
+        def __send_chat_completion__(self, request: dict):
+            # Latency is simulated for throttled requests too, as the service takes time to reject them
+            time.sleep(state.get_latency())
+
+            if state.should_throttle():
+                content = json.dumps({"error": {"code": "429", "message": "Rate limit is exceeded. Try again later."}}).encode("utf-8")
+                self.send_response(429)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(content)))
+                self.send_header("Retry-After", str(max(int(state.retry_after), 1)))
+                self.send_header("retry-after-ms", str(int(state.retry_after * 1000)))
+                self.end_headers()
+                self.wfile.write(content)
+                return
+
+            self.__send_json__(200, get_chat_completion(request.get("model"), state.get_response_content()))
+
+        def __send_json__(self, status: int, obj: dict):
+            self.__send__(status, json.dumps(obj).encode("utf-8"), "application/json")
+
+        def __send__(self, status: int, content: bytes, content_type: str):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--batch-delay", type=float, default=10.0,
+                        help="Seconds after submission before a batch job completes.")
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="Seconds before each chat completion response.")
+    parser.add_argument("--latency-jitter", type=float, default=0.0,
+                        help="Maximum seconds added to or removed from the latency of each response, uniformly at random.")
+    parser.add_argument("--throttle-rate", type=float, default=0.0,
+                        help="Fraction of chat completions rejected with a 429 response, between 0 and 1.")
+    parser.add_argument("--retry-after", type=float, default=1.0,
+                        help="Seconds to wait before retrying, returned with each 429 response.")
+    parser.add_argument("--responses", default=None,
+                        help="Path to a JSON file containing an invoice, or a list of invoices, to return in turn instead of the canned invoice.")
+    args = parser.parse_args()
+
+    responses = None
+    if args.responses:
+        with open(args.responses, "r", encoding="utf-8") as file:
+            responses = json.load(file)
+        if isinstance(responses, dict):
+            responses = [responses]
+
+    state = FakeOpenAIState(args.batch_delay, args.latency, args.latency_jitter,
+                            args.throttle_rate, args.retry_after, responses)
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), create_handler(state))
+    print(f"Fake Azure OpenAI listening on http://127.0.0.1:{args.port}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
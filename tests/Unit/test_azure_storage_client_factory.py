@@ -0,0 +1,47 @@
+"""Tests the closing of the process-wide clients and sessions of the Azure Storage client factory.
+
+Clients are created for the development storage account, which makes no requests until a blob is accessed, so the tests run without Azurite.
+
+Run from the root of the repository:
+
+    python -m pytest tests/Unit
+"""
+
+import asyncio
+import os
+import sys
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(os.path.dirname(root), "src", "AIDocumentPipeline"))
+
+from shared.storage.azure_storage_client_factory import AzureStorageClientFactory  # noqa: E402
+
+
+def test_async_session_is_closed_on_its_loop():
+    async def use_and_close():
+        factory = AzureStorageClientFactory(None)
+        client = factory.get_async_blob_service_client("devstoreaccount1")
+        session = AzureStorageClientFactory._async_session
+
+        await AzureStorageClientFactory.close_async()
+
+        # A new session is created for clients retrieved after closing
+        assert factory.get_async_blob_service_client("devstoreaccount1") is not client
+        await AzureStorageClientFactory.close_async()
+        return session
+
+    session = asyncio.run(use_and_close())
+
+    assert session.closed
+    assert AzureStorageClientFactory._async_session is None
+
+
+def test_session_is_closed():
+    factory = AzureStorageClientFactory(None)
+    client = factory.get_blob_service_client("devstoreaccount1")
+
+    AzureStorageClientFactory.close()
+
+    assert AzureStorageClientFactory._session is None
+    assert factory.get_blob_service_client("devstoreaccount1") is not client
+    AzureStorageClientFactory.close()
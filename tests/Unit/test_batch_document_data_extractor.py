@@ -0,0 +1,144 @@
+"""Tests the submission of Azure OpenAI batch jobs and the mapping of their results back to invoices.
+
+Batch jobs are submitted to the fake Azure OpenAI server in `tests/Fakes`, started on a free port for each test, which completes each job when its status is first retrieved and returns its results in no particular order. Document content is used as the text of the request, so that the tests run without poppler-utils installed.
+
+Run from the root of the repository:
+
+    python -m pytest tests/Unit
+"""
+
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from http.server import ThreadingHTTPServer
+
+import pytest
+from azure.core.credentials import AccessToken
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(os.path.dirname(root), "src", "AIDocumentPipeline"))
+sys.path.append(os.path.join(root, "Fakes"))
+
+import fake_openai_server  # noqa: E402
+from invoices.activities import extract_invoice_data, store_invoice_batch_results, validate_invoice_data  # noqa: E402
+from shared.documents.batch_document_data_extractor import BatchDocumentDataExtractor, BatchJobStatus  # noqa: E402
+from shared.documents.document_data_extractor import DocumentDataExtractorOptions  # noqa: E402
+
+invoice_count = 5
+responses = [{**fake_openai_server.canned_invoice, "invoice_number": f"INV-{i}"} for i in range(invoice_count)]
+
+
+class StaticTokenCredential:
+    def get_token(self, *scopes, **kwargs) -> AccessToken:
+        return AccessToken("test", int(time.time()) + 3600)
+
+
+@pytest.fixture
+def server():
+    state = fake_openai_server.FakeOpenAIState(batch_delay=0, responses=responses)
+    http_server = ThreadingHTTPServer(("127.0.0.1", 0), fake_openai_server.create_handler(state))
+    threading.Thread(target=http_server.serve_forever, daemon=True).start()
+
+    state.endpoint = f"http://127.0.0.1:{http_server.server_port}"
+    yield state
+
+    http_server.shutdown()
+    http_server.server_close()
+
+
+def get_extractor(**kwargs) -> BatchDocumentDataExtractor:
+    extractor = BatchDocumentDataExtractor(StaticTokenCredential(), **kwargs)
+    extractor.__get_user_content__ = lambda document_bytes, options, result: [{"type": "text", "text": document_bytes.decode("utf-8")}]
+    return extractor
+
+
+def get_options(server) -> DocumentDataExtractorOptions:
+    return DocumentDataExtractorOptions("Extract the data.", "Extract the data from this invoice.", server.endpoint, "gpt-4o-batch")
+
+
+def get_documents(count: int = invoice_count):
+    return [(str(i), f"Invoice {i}".encode("utf-8")) for i in range(count)]
+
+
+def get_input_request_counts(server, batch_ids: list[str]) -> list[int]:
+    return [len(server.files[server.batches[batch_id]["input_file_id"]].splitlines()) for batch_id in batch_ids]
+
+
+def test_requests_are_split_by_the_request_limit(server):
+    extractor = get_extractor(max_requests_per_job=2)
+    options = get_options(server)
+
+    batch_ids = extractor.submit(get_documents(), options)
+
+    assert get_input_request_counts(server, batch_ids) == [2, 2, 1]
+    assert [extractor.get_status(batch_id, options) for batch_id in batch_ids] == [BatchJobStatus.Completed] * 3
+
+    results = {}
+    for batch_id in batch_ids:
+        results.update(extractor.get_results(batch_id, options))
+
+    assert {custom_id: result.data["invoice_number"] for custom_id, result in results.items()} == {str(i): f"INV-{i}" for i in range(invoice_count)}
+    extractor.close()
+
+
+def test_requests_are_split_by_the_size_limit(server):
+    options = get_options(server)
+    line_size = len(json.dumps({
+        "custom_id": "0",
+        "method": "POST",
+        "url": "/chat/completions",
+        "body": get_extractor().__get_completion_request__([{"type": "text", "text": "Invoice 0"}], options)
+    })) + 1
+    extractor = get_extractor(max_bytes_per_job=3 * line_size)
+
+    batch_ids = extractor.submit(get_documents(), options)
+
+    assert get_input_request_counts(server, batch_ids) == [3, 2]
+    extractor.close()
+
+
+def test_submitted_jobs_are_cancelled_when_a_later_job_fails(server):
+    extractor = get_extractor(max_requests_per_job=2)
+
+    def documents():
+        yield from get_documents(3)
+        raise OSError("Failed to download the invoice")
+
+    with pytest.raises(OSError):
+        extractor.submit(documents(), get_options(server))
+
+    assert [batch["status"] for batch in server.batches.values()] == ["cancelled"]
+    extractor.close()
+
+
+def test_batch_results_are_stored_for_the_invoice_they_were_submitted_for(server, monkeypatch):
+    extractor = get_extractor(max_requests_per_job=2)
+    monkeypatch.setattr(extract_invoice_data, "batch_extractor", extractor)
+    monkeypatch.setattr(extract_invoice_data.app_config, "openai_endpoint", server.endpoint)
+
+    stored = {}
+
+    async def store_and_validate_async(container_name, blob_name, data, result, metadata=None):
+        stored[blob_name] = data.invoice_number
+        result.processed_count = 1
+
+    monkeypatch.setattr(validate_invoice_data, "store_and_validate_async", store_and_validate_async)
+
+    invoices = {f"folder/{i}.pdf": {} for i in range(invoice_count)}
+    batch_ids = extractor.submit(get_documents(), extract_invoice_data.get_extraction_options())
+    for batch_id in batch_ids:
+        extractor.get_status(batch_id, extract_invoice_data.get_extraction_options())
+
+    # The last job fails, so that its invoice has no result
+    server.batches[batch_ids[-1]]["output_file_id"] = None
+
+    invoice_results = asyncio.run(store_invoice_batch_results.run._function._func(
+        store_invoice_batch_results.Request("invoices", batch_ids, invoices)))
+
+    assert stored == {f"folder/{i}.pdf": f"INV-{i}" for i in range(invoice_count - 1)}
+    assert [result.name for result in invoice_results] == list(invoices)
+    assert [result.failed_count for result in invoice_results] == [0] * (invoice_count - 1) + [1]
+    extractor.close()
@@ -0,0 +1,86 @@
+"""Tests the number of Azure Storage requests made by the optimistic blob upload of the Azure Storage client factory.
+
+Requests are counted with a response hook on the shared session against a local Azurite instance, and the tests are skipped when Azurite is not running. Start Azurite with `docker compose up storage` from the root of the repository.
+
+Run from the root of the repository:
+
+    python -m pytest tests/Unit
+"""
+
+import os
+import socket
+import sys
+import uuid
+
+import pytest
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(os.path.dirname(root), "src", "AIDocumentPipeline"))
+
+from shared.storage.azure_storage_client_factory import AzureStorageClientFactory  # noqa: E402
+
+storage_account_name = "UseDevelopmentStorage=true"
+content = b"{}" * 512
+
+
+def is_azurite_running() -> bool:
+    try:
+        with socket.create_connection(("127.0.0.1", 10000), timeout=0.5):
+            return True
+    except OSError:
+        return False
+
+
+pytestmark = pytest.mark.skipif(not is_azurite_running(), reason="Azurite is not running on 127.0.0.1:10000")
+
+
+@pytest.fixture
+def factory():
+    factory = AzureStorageClientFactory(None)
+    yield factory
+    AzureStorageClientFactory.close()
+
+
+@pytest.fixture
+def container_name(factory: AzureStorageClientFactory):
+    container_name = f"tests-{uuid.uuid4().hex[:8]}"
+    yield container_name
+    factory.get_blob_service_client(storage_account_name).delete_container(container_name)
+
+
+def count_requests(factory: AzureStorageClientFactory, write) -> int:
+    """Returns the number of requests sent on the shared session while calling the write function."""
+
+    requests = []
+
+    def record(response, *args, **kwargs):
+        requests.append(response.request)
+
+    factory.get_blob_service_client(storage_account_name)
+    hooks = AzureStorageClientFactory._session.hooks["response"]
+    hooks.append(record)
+    try:
+        write()
+    finally:
+        hooks.remove(record)
+
+    return len(requests)
+
+
+def test_upload_to_existing_container_is_one_request(factory: AzureStorageClientFactory, container_name: str):
+    factory.get_blob_service_client(storage_account_name).create_container(container_name)
+
+    for i in range(3):
+        request_count = count_requests(factory, lambda: factory.upload_blob(
+            storage_account_name, container_name, f"invoice-{i}.pdf.Data.json", content))
+
+        assert request_count == 1
+
+
+def test_upload_to_missing_container_creates_it_once(factory: AzureStorageClientFactory, container_name: str):
+    # The failed upload, the container creation, and the retried upload
+    assert count_requests(factory, lambda: factory.upload_blob(
+        storage_account_name, container_name, "invoice-0.pdf.Data.json", content)) == 3
+
+    assert count_requests(factory, lambda: factory.upload_blob(
+        storage_account_name, container_name, "invoice-1.pdf.Data.json", content)) == 1
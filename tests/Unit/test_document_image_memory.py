@@ -0,0 +1,58 @@
+"""Tests the memory ceiling of converting a multi-page document to page image URIs.
+
+The poppler conversion is replaced with one that writes a page file of a fixed size per page, so that the test runs without poppler-utils installed, and allocations are traced with `tracemalloc`.
+
+Run from the root of the repository:
+
+    python -m pytest tests/Unit
+"""
+
+import os
+import sys
+import tracemalloc
+
+import pytest
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(os.path.dirname(root), "src", "AIDocumentPipeline"))
+
+from shared.documents import document_data_extractor  # noqa: E402
+from shared.documents.document_data_extractor import BaseDocumentDataExtractor  # noqa: E402
+from shared.documents.document_image_profile import DocumentImageProfile  # noqa: E402
+
+page_size = 1024 * 1024
+page_count = 32
+
+
+@pytest.fixture
+def extractor(monkeypatch):
+    def convert_from_bytes(document_bytes, output_folder, paths_only, **kwargs):
+        page_paths = []
+        for page_number in range(page_count):
+            page_path = os.path.join(output_folder, f"page-{page_number:02d}.png")
+            with open(page_path, "wb") as page_file:
+                page_file.write(os.urandom(page_size))
+            page_paths.append(page_path)
+
+        return page_paths
+
+    monkeypatch.setattr(document_data_extractor, "convert_from_bytes", convert_from_bytes)
+    return BaseDocumentDataExtractor(None)
+
+
+def get_peak_memory(consume) -> int:
+    tracemalloc.start()
+    try:
+        consume()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def test_page_images_are_loaded_one_at_a_time(extractor):
+    image_uris = extractor.__iter_document_image_uris__(b"", DocumentImageProfile.lossless())
+
+    peak = get_peak_memory(lambda: sum(len(image_uri) for image_uri in image_uris))
+
+    # The page being encoded, its base64 encoding as bytes and as a string, and the previous page's encoding, but never all of the pages
+    assert peak < 8 * page_size
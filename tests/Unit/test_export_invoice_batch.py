@@ -0,0 +1,66 @@
+"""Tests the flattening of invoice outputs into the rows of the batch export.
+
+Run from the root of the repository:
+
+    python -m pytest tests/Unit
+"""
+
+import os
+import sys
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(os.path.dirname(root), "src", "AIDocumentPipeline"))
+
+from invoices.activities import export_invoice_batch  # noqa: E402
+from invoices.activities.validate_invoice_data import ResultStatus  # noqa: E402
+from invoices.invoice_data import InvoiceData  # noqa: E402
+
+invoice = "folder/invoice.pdf"
+
+
+def get_invoice(products: list | None = None, returns: list | None = None) -> InvoiceData:
+    return InvoiceData.from_dict({
+        "invoice_number": "INV-001",
+        "customer_name": "Contoso",
+        "total_quantity": 3,
+        "total_price": 15.5,
+        "products": products,
+        "returns": returns
+    })
+
+
+def test_each_line_item_is_a_row_with_the_invoice_fields():
+    data = get_invoice(products=[{"id": "P1", "quantity": 1, "total": 10}, {"id": "P2", "quantity": 2, "total": 5.5}],
+                       returns=[{"id": "P1", "quantity": 1, "reason": "Damaged"}])
+
+    rows = list(export_invoice_batch.__get_rows__(invoice, data, ResultStatus.Success))
+
+    assert [(row["line_type"], row["line_index"], row["product_id"]) for row in rows] == [("product", 0, "P1"), ("product", 1, "P2"), ("return", 0, "P1")]
+    assert all(row["invoice"] == invoice and row["invoice_number"] == "INV-001" and row["total_price"] == 15.5 for row in rows)
+    assert rows[2]["reason"] == "Damaged"
+
+
+def test_invoice_without_line_items_is_a_single_row():
+    rows = list(export_invoice_batch.__get_rows__(invoice, get_invoice(), ResultStatus.Success))
+
+    assert len(rows) == 1
+    assert "line_type" not in rows[0]
+    assert rows[0]["customer_name"] == "Contoso"
+
+
+def test_status_is_flattened_into_flag_columns():
+    status = ResultStatus.ProductsTotalPriceInvalid | ResultStatus.ReturnReasonMissing
+
+    row = next(export_invoice_batch.__get_rows__(invoice, get_invoice(), status))
+
+    assert row["products_total_price_invalid"] is True
+    assert row["return_reason_missing"] is True
+    assert row["success"] is False
+    assert set(row) <= set(export_invoice_batch.columns)
+
+
+def test_invoice_without_validation_has_no_status():
+    row = next(export_invoice_batch.__get_rows__(invoice, get_invoice(), None))
+
+    assert "status" not in row
+    assert "success" not in row
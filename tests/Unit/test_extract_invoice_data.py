@@ -0,0 +1,27 @@
+"""Tests that extraction failures are returned to the workflow as a missing reference rather than failing the activity.
+
+Run from the root of the repository:
+
+    python -m pytest tests/Unit
+"""
+
+import asyncio
+import os
+import sys
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(os.path.dirname(root), "src", "AIDocumentPipeline"))
+
+from invoices.activities import extract_invoice_data  # noqa: E402
+
+
+def test_failed_extraction_returns_none(monkeypatch):
+    async def extract(container_name, blob_name):
+        raise RuntimeError("The document could not be converted to images")
+
+    monkeypatch.setattr(extract_invoice_data, "extract", extract)
+
+    reference = asyncio.run(extract_invoice_data.run._function._func(
+        extract_invoice_data.Request("invoices", "folder/invoice.pdf")))
+
+    assert reference is None
@@ -0,0 +1,37 @@
+"""Tests that extraction cache failures are treated as misses and skipped writes rather than failing the extraction.
+
+Run from the root of the repository:
+
+    python -m pytest tests/Unit
+"""
+
+import os
+import shutil
+import sys
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(os.path.dirname(root), "src", "AIDocumentPipeline"))
+
+from shared.documents.extraction_cache import DiskExtractionCache  # noqa: E402
+
+
+def test_corrupt_entry_is_a_miss(tmp_path):
+    cache = DiskExtractionCache(str(tmp_path))
+    with open(os.path.join(tmp_path, "key.json"), "wb") as file:
+        file.write(b"{\"customer_name\": ")
+
+    assert cache.get("key") is None
+
+    metrics = cache.get_metrics()
+    assert (metrics["misses"], metrics["errors"]) == (1, 1)
+
+
+def test_failed_write_is_skipped(tmp_path):
+    folder_path = os.path.join(tmp_path, "cache")
+    cache = DiskExtractionCache(folder_path)
+    shutil.rmtree(folder_path)
+
+    cache.set("key", {"customer_name": "Contoso"})
+
+    metrics = cache.get_metrics()
+    assert (metrics["writes"], metrics["errors"]) == (0, 1)
@@ -0,0 +1,78 @@
+"""Tests the resumption of the invoice folder listing between generations of the batch workflow.
+
+The blob listing is replaced with one that pages a fixed list of root level items, grouping them into folders as `AzureStorageClientFactory.iter_blob_folders_at_root` does, so that blobs at the root of the container are grouped under the container name.
+
+Run from the root of the repository:
+
+    python -m pytest tests/Unit
+"""
+
+import os
+import sys
+
+import pytest
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(os.path.dirname(root), "src", "AIDocumentPipeline"))
+
+from invoices.activities import get_invoice_folders  # noqa: E402
+from invoices.invoice_batch_request import InvoiceBatchRequest  # noqa: E402
+from shared.storage.blob_folder_page import BlobFolderPage  # noqa: E402
+
+container_name = "zeta"
+
+# Root level items in listing order. Folders end with a slash, and the others are blobs at the root of the container.
+root_items = ["a/", "b.pdf", "c/", "d/", "e.pdf", "f/"]
+
+
+def iter_blob_folders_at_root(storage_account_name, container_name, regex_filter=None, continuation_token=None, folders_per_page=None):
+    start = int(continuation_token or 0)
+    page_size = folders_per_page or len(root_items)
+    for page_start in range(start, len(root_items), page_size):
+        folders = {}
+        for item in root_items[page_start:page_start + page_size]:
+            if item.endswith("/"):
+                folders[item.rstrip("/")] = [f"{item}invoice.pdf"]
+            else:
+                folders.setdefault(container_name, []).append(f"{container_name}/{item}")
+
+        next_start = page_start + page_size
+        yield BlobFolderPage(folders, str(next_start) if next_start < len(root_items) else None)
+
+
+def run_generations(input: InvoiceBatchRequest) -> list[list]:
+    generations = []
+    while True:
+        result = get_invoice_folders.run._function._func(input)
+        generations.append(result.folders)
+        if not result.has_more:
+            return generations
+
+        input = InvoiceBatchRequest.from_json(InvoiceBatchRequest.to_json(InvoiceBatchRequest(
+            input.container_name, input.force, result.page_offset, result.continuation_token, input.generation + 1)))
+
+
+@pytest.fixture(autouse=True)
+def fake_listing(monkeypatch):
+    monkeypatch.setattr(get_invoice_folders.storage_factory, "iter_blob_folders_at_root", iter_blob_folders_at_root)
+
+
+@pytest.mark.parametrize("folders_per_generation", [1, 2, 3, 4, 6, 10])
+def test_every_folder_is_returned_once_with_root_blobs(monkeypatch, folders_per_generation: int):
+    monkeypatch.setattr(get_invoice_folders.app_config, "invoices_folders_per_generation", folders_per_generation)
+
+    generations = run_generations(InvoiceBatchRequest(container_name))
+
+    # Root blobs on the same page are grouped together, so every blob is compared rather than every folder
+    blob_names = [blob_name for generation in generations for folder in generation for blob_name in folder.invoice_file_names]
+    assert sorted(blob_names) == ["a/invoice.pdf", "c/invoice.pdf", "d/invoice.pdf", "f/invoice.pdf", "zeta/b.pdf", "zeta/e.pdf"]
+    assert all(len(generation) <= folders_per_generation for generation in generations)
+
+
+def test_folders_after_a_root_blob_group_are_not_skipped(monkeypatch):
+    # The container name sorts after every folder, so resuming by name would skip c and d
+    monkeypatch.setattr(get_invoice_folders.app_config, "invoices_folders_per_generation", 2)
+
+    generations = run_generations(InvoiceBatchRequest(container_name))
+
+    assert [[folder.name for folder in generation] for generation in generations] == [["a", container_name], ["c", "d"], [container_name, "f"]]
@@ -0,0 +1,59 @@
+"""Tests the messages of the declarative invoice validation rules.
+
+The sum rule messages must read as they did before the rules were declared as data, when the actual total was the built-in `sum` of the line items.
+
+Run from the root of the repository:
+
+    python -m pytest tests/Unit
+"""
+
+import os
+import sys
+
+import pytest
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(os.path.dirname(root), "src", "AIDocumentPipeline"))
+
+from invoices.activities.validate_invoice_data import ResultStatus  # noqa: E402
+from invoices.invoice_data import InvoiceData  # noqa: E402
+from invoices.invoice_validation_rules import ValidationRuleSet  # noqa: E402
+
+rules_path = os.path.join(os.path.dirname(root), "src", "AIDocumentPipeline", "invoices", "invoice_validation_rules.json")
+
+
+def get_invoice(quantities: list, totals: list, total_quantity, total_price) -> InvoiceData:
+    return InvoiceData.from_dict({
+        "customer_name": "Contoso",
+        "total_quantity": total_quantity,
+        "total_price": total_price,
+        "products": [{"id": str(i), "quantity": quantity, "total": total} for i, (quantity, total) in enumerate(zip(quantities, totals))]
+    })
+
+
+def get_baseline_messages(data: InvoiceData) -> list[str]:
+    total_quantity = sum([p.quantity or 0 for p in data.products])
+    total_price = sum([p.total or 0 for p in data.products])
+    return [f"products quantity total must match total_quantity. Expected: {data.total_quantity}, Actual: {total_quantity}",
+            f"products price total must match total_price. Expected: {data.total_price}, Actual: {total_price}"]
+
+
+invoices = [
+    get_invoice([3, 4], [10, 5], 8, 16),
+    get_invoice([3, None], [10.0, 2.5], 4, 13.0),
+    get_invoice([1.5, 2.5], [0.25, 0.5], 5, 1)
+]
+
+
+@pytest.mark.parametrize("exact", [False, True])
+@pytest.mark.parametrize("bulk", [False, True])
+def test_sum_messages_match_baseline(exact: bool, bulk: bool):
+    rule_set = ValidationRuleSet.from_file(rules_path, ResultStatus, exact=exact)
+
+    if bulk:
+        evaluations = rule_set.evaluate(invoices)
+    else:
+        evaluations = [rule_set.evaluate([data])[0] for data in invoices]
+
+    for data, (_, messages) in zip(invoices, evaluations):
+        assert [m for m in messages if " total must match " in m] == get_baseline_messages(data)
@@ -0,0 +1,233 @@
+"""Tests the capacity reservations and retries of the Azure OpenAI rate limiter.
+
+Requests are sent with a real Azure OpenAI client, with its own retries disabled as the document data extractors do, over a mock transport that fails before it succeeds. Where waits are asserted, the clock of the rate limiter is replaced with one that only advances when it sleeps.
+
+Run from the root of the repository:
+
+    python -m pytest tests/Unit
+"""
+
+import asyncio
+import os
+import sys
+
+import httpx
+import pytest
+from openai import AsyncAzureOpenAI, AzureOpenAI, BadRequestError, InternalServerError, RateLimitError
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(os.path.dirname(root), "src", "AIDocumentPipeline"))
+
+from shared.documents import openai_rate_limiter  # noqa: E402
+from shared.documents.openai_rate_limiter import AzureOpenAIRateLimiter, FileRateLimitState  # noqa: E402
+
+request = {"model": "gpt-4o", "messages": [{"role": "user", "content": "Extract the data."}]}
+
+completion = {
+    "id": "chatcmpl-0001",
+    "object": "chat.completion",
+    "created": 0,
+    "model": "gpt-4o",
+    "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": "{}"}}],
+    "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2}
+}
+
+
+class FakeClock:
+    """Replaces the `time` module of the rate limiter with a clock that only advances when it sleeps, recording each sleep."""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def time(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch) -> FakeClock:
+    clock = FakeClock()
+    monkeypatch.setattr(openai_rate_limiter, "time", clock)
+    return clock
+
+
+def get_handler(statuses: list[int], headers: dict | None = None):
+    """Returns a mock transport handler that answers with each of the statuses in turn, then with a completion, and the list of requests it received."""
+
+    requests = []
+
+    def handler(http_request: httpx.Request) -> httpx.Response:
+        requests.append(http_request)
+        if len(requests) <= len(statuses):
+            return httpx.Response(statuses[len(requests) - 1], headers=headers, json={"error": {"message": "failed"}})
+
+        return httpx.Response(200, json=completion)
+
+    return handler, requests
+
+
+def get_client(handler) -> AzureOpenAI:
+    return AzureOpenAI(azure_endpoint="https://example.openai.azure.com", api_key="key", api_version="2024-06-01",
+                       max_retries=0, http_client=httpx.Client(transport=httpx.MockTransport(handler)))
+
+
+def get_async_client(handler) -> AsyncAzureOpenAI:
+    return AsyncAzureOpenAI(azure_endpoint="https://example.openai.azure.com", api_key="key", api_version="2024-06-01",
+                            max_retries=0, http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+
+
+def test_server_error_then_success_is_retried():
+    handler, requests = get_handler([500])
+    client = get_client(handler)
+    rate_limiter = AzureOpenAIRateLimiter(0, 0, base_backoff=0.01)
+
+    response = rate_limiter.call(lambda: client.chat.completions.create(**request), 1)
+
+    assert response.choices[0].message.content == "{}"
+    assert len(requests) == 2
+    metrics = rate_limiter.get_metrics()
+    assert metrics["transient_errors"] == 1
+    assert metrics["retries"] == 1
+    assert metrics["rate_limited_responses"] == 0
+
+
+def test_connection_error_then_success_is_retried():
+    attempts = []
+
+    def handler(http_request: httpx.Request) -> httpx.Response:
+        attempts.append(http_request)
+        if len(attempts) == 1:
+            raise httpx.ConnectError("connection refused", request=http_request)
+
+        return httpx.Response(200, json=completion)
+
+    client = get_client(handler)
+    rate_limiter = AzureOpenAIRateLimiter(0, 0, base_backoff=0.01)
+
+    response = rate_limiter.call(lambda: client.chat.completions.create(**request), 1)
+
+    assert response.id == "chatcmpl-0001"
+    assert len(attempts) == 2
+    assert rate_limiter.get_metrics()["transient_errors"] == 1
+
+
+def test_async_server_error_then_success_is_retried():
+    handler, requests = get_handler([502, 503])
+    client = get_async_client(handler)
+    rate_limiter = AzureOpenAIRateLimiter(0, 0, base_backoff=0.01)
+
+    response = asyncio.run(rate_limiter.call_async(lambda: client.chat.completions.create(**request), 1))
+
+    assert response.choices[0].message.content == "{}"
+    assert len(requests) == 3
+    assert rate_limiter.get_metrics()["transient_errors"] == 2
+
+
+def test_server_errors_past_max_retries_are_raised():
+    handler, requests = get_handler([500] * 3)
+    client = get_client(handler)
+    rate_limiter = AzureOpenAIRateLimiter(0, 0, max_retries=2, base_backoff=0.01)
+
+    with pytest.raises(InternalServerError):
+        rate_limiter.call(lambda: client.chat.completions.create(**request), 1)
+
+    assert len(requests) == 3
+
+
+def test_client_errors_are_not_retried():
+    handler, requests = get_handler([400])
+    client = get_client(handler)
+    rate_limiter = AzureOpenAIRateLimiter(0, 0, base_backoff=0.01)
+
+    with pytest.raises(BadRequestError):
+        rate_limiter.call(lambda: client.chat.completions.create(**request), 1)
+
+    assert len(requests) == 1
+    assert rate_limiter.get_metrics()["retries"] == 0
+
+
+@pytest.mark.parametrize("headers, expected_wait", [
+    ({"retry-after": "2"}, 2.0),
+    ({"retry-after-ms": "1500"}, 1.5),
+    ({"retry-after-ms": "250", "retry-after": "1"}, 0.25),
+    ({"retry-after": "120"}, 60.0)
+])
+def test_throttled_request_waits_for_retry_after(clock: FakeClock, headers: dict, expected_wait: float):
+    handler, requests = get_handler([429], headers)
+    client = get_client(handler)
+    rate_limiter = AzureOpenAIRateLimiter(0, 0)
+
+    response = rate_limiter.call(lambda: client.chat.completions.create(**request), 1)
+
+    assert response.id == "chatcmpl-0001"
+    assert len(requests) == 2
+    assert clock.sleeps == [0.0, pytest.approx(expected_wait)]
+    metrics = rate_limiter.get_metrics()
+    assert metrics["rate_limited_responses"] == 1
+    assert metrics["throttled_requests"] == 1
+    assert metrics["throttle_wait_seconds"] == pytest.approx(expected_wait)
+
+
+def test_requests_are_spaced_under_requests_per_minute(clock: FakeClock):
+    rate_limiter = AzureOpenAIRateLimiter(2, 0)
+
+    for _ in range(4):
+        rate_limiter.call(lambda: None, 1)
+
+    # The first two requests are sent at once, and the rest one every 30 seconds
+    assert clock.sleeps == [0.0, 0.0, pytest.approx(30.0), pytest.approx(30.0)]
+    metrics = rate_limiter.get_metrics()
+    assert metrics["requests"] == 4
+    assert metrics["throttled_requests"] == 2
+    assert metrics["throttle_wait_seconds"] == pytest.approx(60.0)
+
+
+def test_requests_are_spaced_under_tokens_per_minute(clock: FakeClock):
+    rate_limiter = AzureOpenAIRateLimiter(0, 1000)
+
+    for _ in range(3):
+        rate_limiter.call(lambda: None, 600)
+
+    # 1000 tokens per minute refill at 1000/60 tokens per second
+    assert clock.sleeps == [0.0, pytest.approx(12.0), pytest.approx(36.0)]
+    assert rate_limiter.get_metrics()["throttle_wait_seconds"] == pytest.approx(48.0)
+
+
+def test_requests_larger_than_tokens_per_minute_are_not_blocked_forever(clock: FakeClock):
+    rate_limiter = AzureOpenAIRateLimiter(0, 1000)
+
+    rate_limiter.call(lambda: None, 5000)
+    rate_limiter.call(lambda: None, 5000)
+
+    assert clock.sleeps == [0.0, pytest.approx(60.0)]
+
+
+def test_file_state_is_shared_between_rate_limiters(clock: FakeClock, tmp_path):
+    state_path = os.path.join(tmp_path, "openai-rate-limit.json")
+    first = AzureOpenAIRateLimiter(2, 0, FileRateLimitState(state_path))
+    second = AzureOpenAIRateLimiter(2, 0, FileRateLimitState(state_path))
+
+    first.call(lambda: None, 1)
+    first.call(lambda: None, 1)
+    second.call(lambda: None, 1)
+
+    # The second rate limiter sees the capacity used by the first
+    assert clock.sleeps == [0.0, 0.0, pytest.approx(30.0)]
+    assert second.get_metrics()["throttled_requests"] == 1
+
+
+def test_file_state_shares_retry_after_between_rate_limiters(clock: FakeClock, tmp_path):
+    state_path = os.path.join(tmp_path, "openai-rate-limit.json")
+    first = AzureOpenAIRateLimiter(0, 0, FileRateLimitState(state_path))
+    second = AzureOpenAIRateLimiter(0, 0, FileRateLimitState(state_path))
+    response = httpx.Response(429, headers={"retry-after": "10"}, request=httpx.Request("POST", "https://example.openai.azure.com"))
+
+    first.__on_rate_limited__(RateLimitError("Too Many Requests", response=response, body=None), 1)
+    second.call(lambda: None, 1)
+
+    # The second rate limiter waits for the retry-after of a response to the first
+    assert clock.sleeps == [pytest.approx(10.0)]
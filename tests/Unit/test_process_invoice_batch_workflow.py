@@ -0,0 +1,89 @@
+"""Tests the windowed processing of invoice folders by the batch workflow.
+
+The orchestration context is replaced with one whose sub-orchestrations complete immediately, either with a result or, as in Durable Functions, with the exception of a failed sub-orchestration.
+
+Run from the root of the repository:
+
+    python -m pytest tests/Unit
+"""
+
+import os
+import sys
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(os.path.dirname(root), "src", "AIDocumentPipeline"))
+
+from invoices import process_invoice_batch_workflow  # noqa: E402
+from invoices.activities import export_invoice_batch  # noqa: E402
+from invoices.invoice_batch_request import InvoiceBatchRequest  # noqa: E402
+from invoices.invoice_folder import InvoiceFolder  # noqa: E402
+from shared.workflow_result import WorkflowResult  # noqa: E402
+
+
+class CompletedTask:
+    def __init__(self, result):
+        self.result = result
+
+
+class FakeContext:
+    instance_id = "instance"
+
+    def __init__(self, results: dict):
+        self.results = results
+        self.activities = []
+
+    def call_activity(self, name: str, input) -> CompletedTask:
+        self.activities.append((name, input))
+        return CompletedTask(self.results[name])
+
+    def call_sub_orchestrator(self, name: str, folder: InvoiceFolder) -> CompletedTask:
+        return CompletedTask(self.results[folder.name])
+
+    def task_any(self, tasks: list[CompletedTask]) -> list[CompletedTask]:
+        return tasks
+
+
+def run_generator(generator):
+    # Each `task_any` completes with the first of the tasks in flight, and each activity with its result
+    try:
+        yielded = next(generator)
+        while True:
+            yielded = generator.send(yielded[0] if isinstance(yielded, list) else yielded.result)
+    except StopIteration:
+        pass
+
+
+def get_folder_result(name: str, processed_count: int, processed_names: list[str] | None = None) -> dict:
+    result = WorkflowResult(name)
+    result.processed_count = processed_count
+    result.processed_names = processed_names or []
+    return result.to_dict()
+
+
+def test_failed_sub_orchestrations_are_counted_as_failed_folders():
+    folders = [InvoiceFolder("c", name, [f"{name}/{i}.pdf" for i in range(3)]) for name in ["a", "b", "c"]]
+    context = FakeContext({"a": get_folder_result("a", 3), "b": RuntimeError("Orchestrator function 'ExtractInvoiceDataWorkflow' failed"), "c": get_folder_result("c", 2)})
+    result = WorkflowResult("ProcessInvoiceBatchWorkflow")
+
+    run_generator(process_invoice_batch_workflow.__process_folders__(context, folders, result))
+
+    assert result.processed_count == 5
+    assert result.failed_count == 3
+    assert [r.name for r in result.activity_results] == ["a", "c"]
+    assert any("Failed to process invoice folder b" in message for message in result.messages)
+
+
+def test_generation_exports_only_the_invoices_it_processed(monkeypatch):
+    monkeypatch.setattr(process_invoice_batch_workflow.app_config, "invoices_batch_export_format", "jsonl")
+    folders = [InvoiceFolder("c", name, [f"{name}/{i}.pdf" for i in range(3)]) for name in ["a", "b"]]
+    context = FakeContext({"a": get_folder_result("a", 2, ["a/0.pdf", "a/2.pdf"]),
+                           "b": get_folder_result("b", 0),
+                           export_invoice_batch.name: export_invoice_batch.Result("c/instance/parts/00003.jsonl", 2, 2)})
+    result = WorkflowResult("ProcessInvoiceBatchWorkflow")
+
+    run_generator(process_invoice_batch_workflow.__process_folders__(context, folders, result))
+    run_generator(process_invoice_batch_workflow.__export_generation__(context, InvoiceBatchRequest("c", generation=3), result))
+
+    [(_, request)] = context.activities
+    assert request.invoices == ["a/0.pdf", "a/2.pdf"]
+    assert request.blob_name == "c/instance/parts/00003.jsonl"
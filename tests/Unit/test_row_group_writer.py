@@ -0,0 +1,106 @@
+"""Tests the row group writers of the batch export.
+
+Parquet tests are skipped when the optional pyarrow package is not installed.
+
+Run from the root of the repository:
+
+    python -m pytest tests/Unit
+"""
+
+import io
+import json
+import os
+import sys
+
+import pytest
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(os.path.dirname(root), "src", "AIDocumentPipeline"))
+
+from shared.row_group_writer import RowGroupFormat, RowGroupWriter  # noqa: E402
+
+columns = {"invoice": "string", "line_index": "int", "total": "float", "success": "bool"}
+
+
+def get_rows(start: int, count: int) -> list[dict]:
+    return [{"invoice": f"invoice-{i}", "line_index": i, "total": i * 1.5, "success": i % 2 == 0} for i in range(start, start + count)]
+
+
+def write(format: RowGroupFormat, rows: list[dict], row_group_size: int) -> tuple[RowGroupWriter, io.BytesIO]:
+    file = io.BytesIO()
+    writer = RowGroupWriter.create(format, file, columns, row_group_size)
+    for row in rows:
+        writer.write(row)
+    writer.close()
+    file.seek(0)
+    return writer, file
+
+
+def read_jsonl(file: io.BytesIO) -> list[dict]:
+    return [json.loads(line) for line in file.read().decode("utf-8").splitlines()]
+
+
+def read_parquet(file: io.BytesIO) -> list[dict]:
+    pyarrow_parquet = pytest.importorskip("pyarrow.parquet")
+    return pyarrow_parquet.read_table(file).to_pylist()
+
+
+def test_rows_are_written_in_groups():
+    writer, file = write(RowGroupFormat.JsonLines, get_rows(0, 25), row_group_size=10)
+
+    assert (writer.row_count, writer.row_group_count) == (25, 3)
+    assert read_jsonl(file) == get_rows(0, 25)
+
+
+def test_values_are_converted_to_their_column_types():
+    _, file = write(RowGroupFormat.JsonLines, [
+        {"invoice": 42, "line_index": "3", "total": "12.5", "success": 1},
+        {"invoice": None, "line_index": "three", "total": [], "unknown": "ignored"}
+    ], row_group_size=10)
+
+    assert read_jsonl(file) == [
+        {"invoice": "42", "line_index": 3, "total": 12.5, "success": True},
+        {"invoice": None, "line_index": None, "total": None, "success": None}
+    ]
+
+
+def test_jsonl_parts_are_appended():
+    _, first = write(RowGroupFormat.JsonLines, get_rows(0, 3), row_group_size=2)
+    _, second = write(RowGroupFormat.JsonLines, get_rows(3, 4), row_group_size=2)
+
+    merged_file = io.BytesIO()
+    writer = RowGroupWriter.create(RowGroupFormat.JsonLines, merged_file, columns)
+    writer.append(first)
+    writer.append(second)
+    writer.close()
+    merged_file.seek(0)
+
+    assert writer.row_count == 7
+    assert read_jsonl(merged_file) == get_rows(0, 7)
+
+
+def test_parquet_rows_are_written_in_groups():
+    pyarrow_parquet = pytest.importorskip("pyarrow.parquet")
+
+    writer, file = write(RowGroupFormat.Parquet, get_rows(0, 25), row_group_size=10)
+
+    assert (writer.row_count, writer.row_group_count) == (25, 3)
+    assert pyarrow_parquet.ParquetFile(file).num_row_groups == 3
+    file.seek(0)
+    assert read_parquet(file) == get_rows(0, 25)
+
+
+def test_parquet_parts_are_appended():
+    pytest.importorskip("pyarrow.parquet")
+    _, first = write(RowGroupFormat.Parquet, get_rows(0, 3), row_group_size=2)
+    _, second = write(RowGroupFormat.Parquet, get_rows(3, 4), row_group_size=2)
+
+    merged_file = io.BytesIO()
+    writer = RowGroupWriter.create(RowGroupFormat.Parquet, merged_file, columns)
+    writer.append(first)
+    writer.append(second)
+    writer.close()
+    merged_file.seek(0)
+
+    assert (writer.row_count, writer.row_group_count) == (7, 4)
+    assert read_parquet(merged_file) == get_rows(0, 7)
@@ -0,0 +1,64 @@
+"""Tests that blob content spilled to disk is rendered from its file rather than copied again.
+
+The poppler conversions are replaced with ones that record their input, so that the test runs without poppler-utils installed.
+
+Run from the root of the repository:
+
+    python -m pytest tests/Unit
+"""
+
+import os
+import sys
+import tempfile
+
+import pytest
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(os.path.dirname(root), "src", "AIDocumentPipeline"))
+
+from shared.documents import document_data_extractor  # noqa: E402
+from shared.documents.document_data_extractor import BaseDocumentDataExtractor  # noqa: E402
+from shared.documents.document_image_profile import DocumentImageProfile  # noqa: E402
+from shared.storage.spilled_blob_content import SpilledBlobContent  # noqa: E402
+
+document_content = b"%PDF-1.7 spilled"
+
+
+@pytest.fixture
+def spilled_content():
+    with tempfile.NamedTemporaryFile(delete=False) as file:
+        file.write(document_content)
+
+    content = SpilledBlobContent(file.name)
+    yield content
+    content.close()
+
+
+def test_file_is_deleted_when_closed(spilled_content):
+    assert spilled_content[:] == document_content
+    assert os.path.exists(spilled_content.path)
+
+    spilled_content.close()
+
+    assert not os.path.exists(spilled_content.path)
+
+
+def test_spilled_content_is_rendered_from_its_path(monkeypatch, spilled_content):
+    conversions = []
+
+    def convert_from_bytes(document_bytes, **kwargs):
+        conversions.append(("bytes", document_bytes))
+        return []
+
+    def convert_from_path(document_path, **kwargs):
+        conversions.append(("path", document_path))
+        return []
+
+    monkeypatch.setattr(document_data_extractor, "convert_from_bytes", convert_from_bytes)
+    monkeypatch.setattr(document_data_extractor, "convert_from_path", convert_from_path)
+    extractor = BaseDocumentDataExtractor(None)
+
+    list(extractor.__iter_document_image_uris__(spilled_content, DocumentImageProfile.lossless()))
+    list(extractor.__iter_document_image_uris__(document_content, DocumentImageProfile.lossless()))
+
+    assert conversions == [("path", spilled_content.path), ("bytes", document_content)]